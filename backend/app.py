@@ -1,24 +1,65 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 import numpy as np
-import joblib
+import io
 import os
 import json
+import time
 from functools import wraps
 from typing import Dict, List, Tuple
 import logging
-from database import db
+from database import db, DEFAULT_PAGE_SIZE
+from inference import class_labels, score_features
+from model_artifact import load_bundle, MANIFEST_NAME
+from model_registry import ModelRegistry, ModelValidationError
+from rules import rule_bundle
+from batching import MicroBatcher
+from prediction_cache import PredictionCache, parse_resolution
+from prediction_writer import start_writer
+from token_cache import TokenCache
+from startup import StartupTracker
+from metrics import metrics
+from profiling import PROFILES_ONE_THREAD, RequestProfiler
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+# Routes live on a blueprint; create_app() builds the Flask app around it
+api = Blueprint('api', __name__)
+
+# Phase timings and readiness for /ready
+startup = StartupTracker()
 
 # Disease mapping - will be loaded from the actual model
 DISEASES = {}
 
+# Upper bound on readings accepted by /predict/batch
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+
+# /predict/stream scores readings this many at a time; longer lines are rejected unread
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "500"))
+MAX_INGEST_LINE_BYTES = int(os.getenv("MAX_INGEST_LINE_BYTES", "65536"))
+
+# Cache of verified token claims, so repeat requests skip jwt.decode
+token_cache = None
+
+def init_token_cache():
+    global token_cache
+    if int(os.getenv("TOKEN_CACHE_SIZE", "10000")) > 0:
+        token_cache = TokenCache(
+            max_entries=int(os.getenv("TOKEN_CACHE_SIZE", "10000")),
+            ttl_seconds=float(os.getenv("TOKEN_CACHE_TTL", "300"))
+        )
+        db.add_revocation_listener(token_cache.revoke_user)
+
+def verify_token(token: str):
+    """Verified token claims, served from the token cache when enabled"""
+    if token_cache is None:
+        return db.verify_token(token)
+    # Hits are re-checked against the users table, so a logout in another worker applies here too
+    return token_cache.verify(token, db.verify_token, db.token_is_current)
+
 # Authentication decorator
 def require_auth(f):
     @wraps(f)
@@ -30,7 +71,7 @@ def require_auth(f):
         if token.startswith('Bearer '):
             token = token[7:]
         
-        user_data = db.verify_token(token)
+        user_data = verify_token(token)
         if not user_data:
             return jsonify({'error': 'Invalid token'}), 401
         
@@ -38,115 +79,102 @@ def require_auth(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# Load the ML model
+def require_admin(f):
+    """Restrict an endpoint to admins; stack below @require_auth"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if request.user.get('role') != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+def optional_user_id():
+    """User id from a valid bearer token, or None for anonymous requests"""
+    token = request.headers.get('Authorization')
+    if not token:
+        return None
+    if token.startswith('Bearer '):
+        token = token[7:]
+    user_data = verify_token(token)
+    return user_data['user_id'] if user_data else None
+
+# Model files; the artifact directory is used when present (see model_artifact.py)
+MODEL_PATH = os.getenv("MODEL_PATH", "models/water_disease_model.pkl")
+MODEL_ARTIFACT_PATH = os.getenv("MODEL_ARTIFACT_PATH", "models/water_disease_model.forest")
+
+def set_disease_mapping(model_data):
+    """Update the global disease mapping from the model being put into service"""
+    global DISEASES
+    if isinstance(model_data, dict):
+        DISEASES = {i: disease for i, disease in enumerate(model_data['disease_classes'])}
+    return model_data
+
+def load_model_bundle() -> Dict:
+    """Load the model files into a ready-to-serve bundle; raises if there is no usable model"""
+    return load_bundle(MODEL_PATH, MODEL_ARTIFACT_PATH)
+
 def load_model():
     """Load the pre-trained ML model"""
     try:
-        # Try to load the actual model file
-        model_path = "models/water_disease_model.pkl"
-        if os.path.exists(model_path):
-            model_data = joblib.load(model_path)
-            logger.info("Loaded pre-trained model from file")
-            
-            # Update global disease mapping
-            global DISEASES
-            DISEASES = {i: disease for i, disease in enumerate(model_data['disease_classes'])}
-            
-            return model_data
-        else:
-            # Return a mock model for development
-            logger.warning("Model file not found, using mock model")
-            return MockModel()
+        return load_model_bundle()
+    except FileNotFoundError:
+        # Degraded mode: deterministic rules until a trained model appears
+        logger.warning("Model file not found, serving the rule-based fallback")
+        return rule_bundle()
     except Exception as e:
-        logger.error(f"Error loading model: {e}")
-        return MockModel()
+        logger.error(f"Error loading model, serving the rule-based fallback: {e}")
+        return rule_bundle()
 
-class MockModel:
-    """Mock model for development/testing purposes"""
-    
-    def predict_proba(self, X):
-        """Mock prediction probabilities"""
-        # Generate realistic-looking probabilities based on input features
-        n_samples = X.shape[0]
-        n_classes = len(DISEASES)
-        
-        # Create probabilities that sum to 1
-        probs = np.random.dirichlet(np.ones(n_classes), n_samples)
-        
-        # Adjust probabilities based on input features for more realistic results
-        for i in range(n_samples):
-            sample = X[i]
-            
-            # Higher coliform count increases disease risk
-            if sample[6] > 5:  # coliform count
-                probs[i][0] *= 1.5  # Cholera
-                probs[i][3] *= 1.3  # Diarrhea
-                probs[i][4] *= 1.2  # Gastroenteritis
-            
-            # Higher turbidity increases risk
-            if sample[1] > 4:  # turbidity
-                probs[i][0] *= 1.2  # Cholera
-                probs[i][2] *= 1.3  # Hepatitis A
-            
-            # Extreme pH levels increase risk
-            if sample[0] < 6.5 or sample[0] > 8.5:  # pH
-                probs[i][1] *= 1.4  # Typhoid
-                probs[i][3] *= 1.2  # Diarrhea
-            
-            # High temperature increases bacterial growth
-            if sample[5] > 30:  # temperature
-                probs[i][0] *= 1.3  # Cholera
-                probs[i][4] *= 1.4  # Gastroenteritis
-            
-            # Normalize probabilities
-            probs[i] = probs[i] / np.sum(probs[i])
-        
-        return probs
-
-# Load model on startup
-model = load_model()
-
-def validate_sensor_data(data: Dict) -> Tuple[bool, str]:
-    """Validate sensor data input based on the actual model requirements"""
-    # Based on your training code, we need these 13 core sensor features
-    required_fields = [
-        'pH', 'turbidity', 'conductivity', 'water_temp', 'dissolved_oxygen', 
-        'orp', 'ecoli_cfu', 'rainfall_mm', 'water_level', 'ambient_temp', 
-        'ambient_humidity', 'gps_lat', 'gps_lon'
-    ]
+# Readings every candidate model must score sensibly before it may serve traffic
+PROBE_READINGS = [
+    {"pH": 7.2, "turbidity": 1.5, "conductivity": 350, "water_temp": 24, "dissolved_oxygen": 7.5,
+     "orp": 350, "ecoli_cfu": 0, "rainfall_mm": 2, "water_level": 1.2, "ambient_temp": 26,
+     "ambient_humidity": 60, "gps_lat": 26.1, "gps_lon": 91.7},
+    {"pH": 5.8, "turbidity": 25, "conductivity": 1200, "water_temp": 31, "dissolved_oxygen": 3.1,
+     "orp": 120, "ecoli_cfu": 900, "rainfall_mm": 80, "water_level": 3.4, "ambient_temp": 34,
+     "ambient_humidity": 90, "gps_lat": 26.1, "gps_lon": 91.7}
+]
+
+def validate_model(bundle):
+    """Reject a candidate bundle that cannot serve the current API"""
+    if not isinstance(bundle, dict) or not ('engine' in bundle or 'model' in bundle):
+        raise ModelValidationError("Not a model bundle")
+    if not bundle.get('version'):
+        raise ModelValidationError("Model bundle has no version")
     
-    for field in required_fields:
-        if field not in data:
-            return False, f"Missing required field: {field}"
-        
-        try:
-            float(data[field])
-        except (ValueError, TypeError):
-            return False, f"Invalid value for {field}: must be a number"
+    features, _, errors = bundle['feature_plan'].transform_many(PROBE_READINGS)
+    if errors:
+        raise ModelValidationError(f"Model rejects API readings: {errors}")
     
-    return True, ""
+    probabilities = score_features(features, bundle)
+    labels = class_labels(bundle)
+    if probabilities.shape != (len(PROBE_READINGS), len(labels)):
+        raise ModelValidationError(f"Expected {len(labels)} class probabilities, got shape {probabilities.shape}")
+    if not np.isfinite(probabilities).all() or not np.allclose(probabilities.sum(axis=1), 1.0, atol=1e-6):
+        raise ModelValidationError("Probabilities are not a finite distribution")
+    if set(map(str, labels)) != set(bundle['disease_classes']):
+        raise ModelValidationError(f"Model classes {list(labels)} do not match {bundle['disease_classes']}")
+
+# Serving model; later versions are validated and swapped in by the registry
+registry = None
+
+def init_model():
+    global registry
+    registry = ModelRegistry(
+        load_model_bundle,
+        validator=validate_model,
+        on_swap=set_disease_mapping,
+        watch_paths=[os.path.join(MODEL_ARTIFACT_PATH, MANIFEST_NAME), MODEL_PATH],
+        poll_interval=float(os.getenv("MODEL_WATCH_INTERVAL", "5")),
+        initial=load_model()
+    )
 
 def preprocess_data(data: Dict, model_data) -> np.ndarray:
-    """Preprocess sensor data for model prediction using the actual model structure"""
-    # Get the feature names from the model
-    feature_names = model_data['feature_names']
-    
-    # Create feature vector in the exact order expected by the model
-    features = []
-    for feature_name in feature_names:
-        if feature_name in data:
-            # Direct sensor value
-            features.append(float(data[feature_name]))
-        elif feature_name.startswith('has_'):
-            # Boolean feature indicating if sensor value exists
-            base_feature = feature_name[4:]  # Remove 'has_' prefix
-            has_value = base_feature in data and data[base_feature] is not None
-            features.append(1.0 if has_value else 0.0)
-        else:
-            # Default value for missing features
-            features.append(0.0)
-    
-    return np.array(features).reshape(1, -1)
+    """Preprocess sensor data for model prediction using the compiled feature plan"""
+    features, error_msg = model_data['feature_plan'].transform(data)
+    if features is None:
+        raise ValueError(error_msg)
+    return features
 
 def get_risk_level(probability: float) -> str:
     """Determine risk level based on probability"""
@@ -193,7 +221,7 @@ def get_hygiene_tips(disease: str) -> List[str]:
     }
     return tips.get(disease, ["Practice good hygiene", "Drink clean water", "Wash hands frequently"])
 
-@app.route('/health', methods=['GET'])
+@api.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
@@ -201,72 +229,473 @@ def health_check():
         "message": "Smart Health Surveillance API is running"
     })
 
-@app.route('/predict', methods=['POST'])
+@api.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint: 200 only once the model is loaded and warm-up has finished"""
+    snapshot = startup.snapshot()
+    snapshot['model_version'] = ModelRegistry.version_of(registry.current) if registry is not None else None
+    return jsonify(snapshot), 200 if snapshot['ready'] else 503
+
+@api.before_app_request
+def start_request_metrics():
+    # Label by URL rule, not path, so series stay bounded
+    g.metrics_route = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.metrics_started = time.perf_counter()
+    metrics.inc('http_requests_in_flight', route=g.metrics_route)
+
+@api.after_app_request
+def count_request(response):
+    route = g.get('metrics_route', 'unmatched')
+    metrics.inc('http_requests_total', route=route, method=request.method, status=response.status_code)
+    if response.status_code >= 500:
+        metrics.inc('http_request_errors_total', route=route)
+    return response
+
+@api.teardown_app_request
+def finish_request_metrics(exc):
+    # Runs after a streamed response has been fully sent
+    route = g.pop('metrics_route', None)
+    if route is None:
+        return
+    metrics.inc('http_requests_in_flight', -1, route=route)
+    metrics.observe('http_request_duration_seconds', time.perf_counter() - g.pop('metrics_started'), route=route)
+
+@api.before_app_request
+def start_request_profile():
+    if profiler is None:
+        return
+    trigger = profile_trigger()
+    started = profiler.start() if trigger else None
+    if started is not None:
+        g.profile_id, g.profile = started
+        g.profile_trigger = trigger
+        g.profile_started = time.perf_counter()
+
+@api.after_app_request
+def tag_profiled_response(response):
+    if profiler is not None and 'profile' in g:
+        response.headers['X-Profile-Id'] = str(g.profile_id)
+        g.profile_status = response.status_code
+    return response
+
+@api.teardown_app_request
+def finish_request_profile(exc):
+    profile = g.pop('profile', None) if profiler is not None else None
+    if profile is None:
+        return
+    profiler.finish(
+        g.profile_id, profile,
+        route=request.url_rule.rule if request.url_rule else None,
+        method=request.method,
+        path=request.path,
+        status=g.get('profile_status'),
+        trigger=g.profile_trigger,
+        duration_ms=round((time.perf_counter() - g.profile_started) * 1000, 3)
+    )
+
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus exposition of request counts and stage/database latency; ?format=json adds percentiles"""
+    if request.args.get('format') == 'json':
+        return jsonify(metrics.snapshot())
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def build_prediction(probabilities: np.ndarray, data: Dict, timestamp: str, model: Dict) -> Dict:
+    """Build the response payload for one row of class probabilities"""
+    labels = class_labels(model)
+    
+    # Get top 3 predictions; a stable sort keeps the top entry equal to argmax
+    top_indices = np.argsort(-probabilities, kind='stable')[:3]
+    
+    predictions = []
+    for idx in top_indices:
+        disease = str(labels[idx])
+        probability = float(probabilities[idx])
+        
+        predictions.append({
+            "disease": disease,
+            "probability": round(probability * 100, 2),
+            "risk_level": get_risk_level(probability),
+            "hygiene_tips": get_hygiene_tips(disease)
+        })
+    
+    # Determine overall status
+    max_prob = max(probabilities)
+    overall_status = get_risk_level(max_prob)
+    
+    return {
+        "overall_status": overall_status,
+        "predictions": predictions,
+        "timestamp": timestamp,
+        "sensor_data": data,
+        "model_version": model.get('version')
+    }
+
+# Optional micro-batching of concurrent /predict calls (needs a threaded worker, e.g. gunicorn --threads)
+batcher = None
+
+# Optional cache of model outputs keyed on quantized feature rows
+prediction_cache = None
+
+def init_scoring():
+    global batcher, prediction_cache
+    if os.getenv("PREDICT_BATCHING", "0") == "1":
+        batcher = MicroBatcher(
+            score_features,
+            window_ms=float(os.getenv("PREDICT_BATCH_WINDOW_MS", "3")),
+            max_rows=int(os.getenv("PREDICT_BATCH_MAX_ROWS", "64"))
+        )
+        logger.info(f"Micro-batching enabled: window={batcher.window * 1000:.1f}ms, max_rows={batcher.max_rows}")
+    
+    if int(os.getenv("PREDICTION_CACHE_SIZE", "0")) > 0:
+        prediction_cache = PredictionCache(
+            max_entries=int(os.getenv("PREDICTION_CACHE_SIZE")),
+            ttl_seconds=float(os.getenv("PREDICTION_CACHE_TTL", "300")),
+            resolution=parse_resolution(os.getenv("PREDICTION_CACHE_RESOLUTION", ""))
+        )
+        logger.info(f"Prediction cache enabled: {prediction_cache.max_entries} entries, ttl={prediction_cache.ttl_seconds}s")
+
+def is_warm_up() -> bool:
+    return bool(request.environ.get(WARMUP_ENVIRON_KEY))
+
+def serving_model() -> Dict:
+    """The model to pin for this request
+
+    Warm-up can run in the gunicorn master before it forks (preload_app), so it
+    must not start the model watcher; workers start it on their first request.
+    """
+    return registry.peek() if is_warm_up() else registry.current
+
+def predict_probabilities(features: np.ndarray, model: Dict, coalesce: bool = False) -> np.ndarray:
+    """Score feature rows on one model version, through the cache and micro-batcher when enabled"""
+    # Warm-up skips the batcher so its thread, too, starts in the worker
+    if coalesce and batcher is not None and not is_warm_up():
+        score = lambda rows: batcher.score(rows, context=model)
+    else:
+        score = lambda rows: score_features(rows, model)
+    if prediction_cache is None:
+        return score(features)
+    
+    version = model['version']
+    step = prediction_cache.steps(version, model['feature_names'])
+    quantized = prediction_cache.quantize(features, step)
+    keys = [prediction_cache.key(version, row) for row in quantized]
+    
+    cached = [prediction_cache.get(key) for key in keys]
+    misses = [i for i, probabilities in enumerate(cached) if probabilities is None]
+    if misses:
+        scored = score(quantized[misses])
+        for row, i in enumerate(misses):
+            cached[i] = scored[row]
+            prediction_cache.put(keys[i], scored[row])
+    
+    return np.vstack(cached)
+
+# Write-behind audit log of predictions; PREDICTION_LOG=0 disables it
+prediction_writer = None
+
+# On-demand request profiling; REQUEST_PROFILING=1 enables it
+profiler = None
+PROFILE_HEADER = 'X-Profile'
+
+def init_profiler():
+    global profiler
+    if os.getenv("REQUEST_PROFILING", "0") == "1":
+        threads = int(os.getenv("GUNICORN_THREADS", "1"))
+        if threads > 1 and not PROFILES_ONE_THREAD:
+            # cProfile would record, and slow down, every request thread in the worker
+            logger.warning(f"Request profiling disabled: Python 3.12+ profiles all {threads} worker threads")
+            return
+        profiler = RequestProfiler(
+            sample_every=int(os.getenv("PROFILE_SAMPLE_EVERY", "0")),
+            capacity=int(os.getenv("PROFILE_BUFFER_SIZE", "50")),
+            top_n=int(os.getenv("PROFILE_TOP_N", "25"))
+        )
+        logger.info(f"Request profiling enabled: header={PROFILE_HEADER}, sample_every={profiler.sample_every}")
+
+def profile_trigger():
+    """'header' for an admin's X-Profile request, 'sample' for every Nth request, else None"""
+    if request.headers.get(PROFILE_HEADER) == '1':
+        token = request.headers.get('Authorization', '')
+        user_data = verify_token(token[7:] if token.startswith('Bearer ') else token) if token else None
+        # Anyone else's header is ignored, so profiling can't be used to slow the service down
+        if user_data and user_data.get('role') == 'admin':
+            return 'header'
+    if profiler.should_sample():
+        return 'sample'
+    return None
+
+def init_prediction_log():
+    global prediction_writer
+    if os.getenv("PREDICTION_LOG", "1") == "1":
+        prediction_writer = start_writer(
+            db,
+            max_queue=int(os.getenv("PREDICTION_LOG_QUEUE_SIZE", "10000")),
+            batch_size=int(os.getenv("PREDICTION_LOG_BATCH_SIZE", "500")),
+            flush_interval=float(os.getenv("PREDICTION_LOG_FLUSH_INTERVAL", "1.0"))
+        )
+
+def record_prediction(user_id, data: Dict, response: Dict):
+    """Queue a served prediction for persistence without touching the database"""
+    # Warm-up traffic is synthetic and stays out of the audit log
+    if prediction_writer is None or is_warm_up():
+        return
+    top = response['predictions'][0]
+    prediction_writer.submit((
+        user_id,
+        json.dumps(data),
+        top['disease'],
+        round(top['probability'] / 100, 4),
+        response['overall_status'],
+        response['model_version']
+    ))
+
+@api.route('/predict', methods=['POST'])
 def predict_disease():
     """Main prediction endpoint"""
     try:
         # Get JSON data from request
-        data = request.get_json()
+        with metrics.stage('parse'):
+            data = request.get_json()
         
         if not data:
             return jsonify({
                 "error": "No JSON data provided"
             }), 400
         
-        # Validate input data
-        is_valid, error_msg = validate_sensor_data(data)
-        if not is_valid:
+        # Pin one model version for the whole request, even if a reload lands mid-flight
+        model = serving_model()
+        
+        # Validate and assemble the feature row in one pass
+        with metrics.stage('features'):
+            features, error_msg = model['feature_plan'].transform(data)
+        if features is None:
             return jsonify({
                 "error": error_msg
             }), 400
         
-        # Preprocess data using the actual model structure
-        features = preprocess_data(data, model)
+        # Make prediction using the actual model, coalesced with concurrent calls if enabled
+        probabilities = predict_probabilities(features, model, coalesce=True)[0]
+        with metrics.stage('build_response'):
+            response = build_prediction(probabilities, data, str(np.datetime64('now')), model)
+        with metrics.stage('log'):
+            record_prediction(optional_user_id(), data, response)
         
-        # Apply imputation if available
-        if 'imputer' in model:
-            features = model['imputer'].transform(features)
+        logger.info(f"Prediction completed for status: {response['overall_status']}")
+        with metrics.stage('serialize'):
+            return jsonify(response)
         
-        # Make prediction using the actual model
-        probabilities = model['model'].predict_proba(features)[0]
-        predicted_disease = model['model'].predict(features)[0]
+    except Exception as e:
+        logger.error(f"Error in prediction: {str(e)}")
+        return jsonify({
+            "error": f"Internal server error: {str(e)}"
+        }), 500
+
+@api.route('/predict/batch', methods=['POST'])
+def predict_disease_batch():
+    """Batch prediction endpoint scoring many readings in one forest pass"""
+    try:
+        with metrics.stage('parse'):
+            data = request.get_json()
         
-        # Get top 3 predictions
-        top_indices = np.argsort(probabilities)[::-1][:3]
+        # Accept either a bare list or {"readings": [...]}
+        readings = data.get('readings') if isinstance(data, dict) else data
+        if not isinstance(readings, list) or not readings:
+            return jsonify({
+                "error": "Expected a non-empty list of sensor readings"
+            }), 400
         
-        predictions = []
-        for idx in top_indices:
-            disease = model['disease_classes'][idx]
-            probability = float(probabilities[idx])
-            
-            predictions.append({
-                "disease": disease,
-                "probability": round(probability * 100, 2),
-                "risk_level": get_risk_level(probability),
-                "hygiene_tips": get_hygiene_tips(disease)
-            })
+        if len(readings) > MAX_BATCH_SIZE:
+            return jsonify({
+                "error": f"Batch too large: at most {MAX_BATCH_SIZE} readings allowed"
+            }), 413
         
-        # Determine overall status
-        max_prob = max(probabilities)
-        overall_status = get_risk_level(max_prob)
+        # Validate every reading into one matrix, keeping per-item errors
+        model = serving_model()
+        with metrics.stage('features'):
+            features, valid_indices, errors = model['feature_plan'].transform_many(readings)
+        results = [None] * len(readings)
+        for i, error_msg in errors.items():
+            results[i] = {"index": i, "error": error_msg}
         
-        response = {
-            "overall_status": overall_status,
-            "predictions": predictions,
-            "timestamp": str(np.datetime64('now')),
-            "sensor_data": data
-        }
+        # Score all valid readings as one 2-D matrix
+        if valid_indices:
+            probabilities = predict_probabilities(features, model)
+            timestamp = str(np.datetime64('now'))
+            user_id = optional_user_id()
+            with metrics.stage('build_response'):
+                for row, i in enumerate(valid_indices):
+                    results[i] = build_prediction(probabilities[row], readings[i], timestamp, model)
+            with metrics.stage('log'):
+                for i in valid_indices:
+                    record_prediction(user_id, readings[i], results[i])
         
-        logger.info(f"Prediction completed for status: {overall_status}")
-        return jsonify(response)
+        logger.info(f"Batch prediction completed: {len(valid_indices)}/{len(readings)} readings scored")
+        with metrics.stage('serialize'):
+            return jsonify({
+                "results": results,
+                "count": len(readings),
+                "errors": len(readings) - len(valid_indices),
+                "model_version": model.get('version')
+            })
         
     except Exception as e:
-        logger.error(f"Error in prediction: {str(e)}")
+        logger.error(f"Error in batch prediction: {str(e)}")
         return jsonify({
             "error": f"Internal server error: {str(e)}"
         }), 500
 
-@app.route('/hygiene-tips', methods=['GET'])
+def read_ndjson(stream, max_line_bytes: int = MAX_INGEST_LINE_BYTES):
+    """Yield (line number, parsed record or None, error) from an NDJSON stream, one line at a time"""
+    line_number = 0
+    while True:
+        # One byte over the limit, so a line of exactly max_line_bytes still fits with its newline
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        line_number += 1
+        if len(line.rstrip(b'\r\n')) > max_line_bytes:
+            # Skip the rest of an oversized line without buffering it
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(max_line_bytes + 1)
+            yield line_number, None, f"Line longer than {max_line_bytes} bytes"
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line), None
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+
+def score_chunk(chunk: List[Tuple[int, object]], model: Dict, user_id) -> List[Dict]:
+    """Validate and score one chunk of (line number, reading) pairs as a single matrix"""
+    readings = [reading for _, reading in chunk]
+    with metrics.stage('features'):
+        features, valid_indices, errors = model['feature_plan'].transform_many(readings)
+    results = [None] * len(chunk)
+    for i, error_msg in errors.items():
+        results[i] = {"line": chunk[i][0], "error": error_msg}
+    
+    if valid_indices:
+        probabilities = predict_probabilities(features, model)
+        timestamp = str(np.datetime64('now'))
+        with metrics.stage('build_response'):
+            for row, i in enumerate(valid_indices):
+                results[i] = {"line": chunk[i][0], **build_prediction(probabilities[row], readings[i], timestamp, model)}
+        with metrics.stage('log'):
+            for i in valid_indices:
+                record_prediction(user_id, readings[i], results[i])
+    return results
+
+@api.route('/predict/stream', methods=['POST'])
+def predict_disease_stream():
+    """Score an NDJSON upload of any size, streaming one NDJSON result per input line"""
+    # Pin one model version for the whole upload
+    model = serving_model()
+    user_id = optional_user_id()
+    
+    def generate():
+        chunk: List[Tuple[int, object]] = []
+        scored = failed = 0
+        
+        def flush():
+            nonlocal scored, failed
+            lines = []
+            for result in score_chunk(chunk, model, user_id):
+                failed += 'error' in result
+                scored += 'error' not in result
+                lines.append(json.dumps(result) + '\n')
+            chunk.clear()
+            return ''.join(lines)
+        
+        try:
+            # LimitedStream.readline reads byte by byte; buffering quadruples ingest throughput
+            body = io.BufferedReader(request.stream, buffer_size=1 << 16)
+            for line_number, reading, error_msg in read_ndjson(body, MAX_INGEST_LINE_BYTES):
+                if error_msg:
+                    failed += 1
+                    yield json.dumps({"line": line_number, "error": error_msg}) + '\n'
+                    continue
+                chunk.append((line_number, reading))
+                if len(chunk) >= INGEST_CHUNK_SIZE:
+                    yield flush()
+            if chunk:
+                yield flush()
+        except Exception as e:
+            # Headers are already sent; report the failure in-band and stop
+            logger.error(f"Error in streaming prediction: {str(e)}")
+            yield json.dumps({"error": f"Internal server error: {str(e)}"}) + '\n'
+            return
+        
+        logger.info(f"Streaming prediction completed: {scored}/{scored + failed} readings scored")
+        yield json.dumps({"summary": {"count": scored + failed, "errors": failed,
+                                      "model_version": model.get('version')}}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@api.route('/predict/batching', methods=['GET'])
+def get_batching_stats():
+    """Batch-size and queue-wait statistics for the micro-batching mode"""
+    if batcher is None:
+        return jsonify({"enabled": False})
+    
+    return jsonify({
+        "enabled": True,
+        "window_ms": batcher.window * 1000,
+        "max_rows": batcher.max_rows,
+        **batcher.stats.snapshot()
+    })
+
+@api.route('/predict/cache', methods=['GET'])
+def get_prediction_cache_stats():
+    """Hit, miss and eviction counters for the prediction cache"""
+    if prediction_cache is None:
+        return jsonify({"enabled": False})
+    
+    return jsonify({"enabled": True, **prediction_cache.stats()})
+
+@api.route('/predict/log', methods=['GET'])
+def get_prediction_log_stats():
+    """Queue depth, write and drop counters for the prediction audit log"""
+    if prediction_writer is None:
+        return jsonify({"enabled": False})
+    
+    return jsonify({"enabled": True, **prediction_writer.stats()})
+
+@api.route('/model', methods=['GET'])
+def get_model_status():
+    """Serving model version and reload history"""
+    return jsonify(registry.status())
+
+@api.route('/admin/model/reload', methods=['POST'])
+@require_auth
+@require_admin
+def reload_model():
+    """Load, validate and swap in the model files on disk for this worker"""
+    result = registry.reload(source=f"admin:{request.user.get('username')}")
+    status_code = 200 if 'error' not in result else 422
+    return jsonify(result), status_code
+
+@api.route('/admin/profiles', methods=['GET'])
+@require_auth
+@require_admin
+def get_request_profiles():
+    """Most recent request profiles, newest first; ?limit=N"""
+    if profiler is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **profiler.snapshot(request.args.get('limit', type=int))})
+
+@api.route('/admin/profiles/<int:profile_id>', methods=['GET'])
+@require_auth
+@require_admin
+def get_request_profile(profile_id: int):
+    """One request profile, by the id returned in its X-Profile-Id header"""
+    entry = profiler.get(profile_id) if profiler is not None else None
+    if entry is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return jsonify(entry)
+
+@api.route('/hygiene-tips', methods=['GET'])
 def get_all_hygiene_tips():
     """Get hygiene tips for all diseases"""
     tips = {}
@@ -284,7 +713,7 @@ def get_all_hygiene_tips():
         ]
     })
 
-@app.route('/diseases', methods=['GET'])
+@api.route('/diseases', methods=['GET'])
 def get_diseases():
     """Get list of supported diseases"""
     return jsonify({
@@ -293,7 +722,7 @@ def get_diseases():
     })
 
 # Authentication endpoints
-@app.route('/auth/login', methods=['POST'])
+@api.route('/auth/login', methods=['POST'])
 def login():
     """User login endpoint"""
     try:
@@ -324,7 +753,7 @@ def login():
         logger.error(f"Login error: {e}")
         return jsonify({'error': 'Login failed'}), 500
 
-@app.route('/auth/register', methods=['POST'])
+@api.route('/auth/register', methods=['POST'])
 def register():
     """User registration endpoint"""
     try:
@@ -349,8 +778,23 @@ def register():
         logger.error(f"Registration error: {e}")
         return jsonify({'error': 'Registration failed'}), 500
 
+@api.route('/auth/logout', methods=['POST'])
+@require_auth
+def logout():
+    """Revoke every token issued to the caller so far"""
+    db.revoke_user_tokens(request.user['user_id'])
+    return jsonify({'message': 'Logged out'})
+
+@api.route('/auth/cache', methods=['GET'])
+def get_token_cache_stats():
+    """Hit, miss and revocation counters for the verified-token cache"""
+    if token_cache is None:
+        return jsonify({"enabled": False})
+    
+    return jsonify({"enabled": True, **token_cache.stats()})
+
 # Survey endpoints
-@app.route('/surveys', methods=['POST'])
+@api.route('/surveys', methods=['POST'])
 @require_auth
 def create_survey():
     """Create a new survey"""
@@ -372,30 +816,52 @@ def create_survey():
         logger.error(f"Survey creation error: {e}")
         return jsonify({'error': 'Failed to create survey'}), 500
 
-@app.route('/surveys', methods=['GET'])
+@api.route('/surveys', methods=['GET'])
 @require_auth
 def get_surveys():
-    """Get user's surveys"""
+    """Get one page of the user's surveys, newest first"""
     try:
         user_id = request.user['user_id']
-        surveys = db.get_user_surveys(user_id)
-        return jsonify({'surveys': surveys})
+        surveys, next_cursor = db.get_user_surveys_page(
+            user_id,
+            limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+            cursor=request.args.get('cursor'),
+            status=request.args.get('status'),
+            location=request.args.get('location'),
+            water_quality=request.args.get('water_quality'),
+            created_after=request.args.get('created_after'),
+            created_before=request.args.get('created_before')
+        )
+        return jsonify({'surveys': surveys, 'next_cursor': next_cursor})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Get surveys error: {e}")
         return jsonify({'error': 'Failed to get surveys'}), 500
 
 # Alert endpoints
-@app.route('/alerts', methods=['GET'])
+@api.route('/alerts', methods=['GET'])
 def get_alerts():
-    """Get all health alerts"""
+    """Get one page of health alerts, newest first"""
     try:
-        alerts = db.get_all_alerts()
-        return jsonify({'alerts': alerts})
+        alerts, next_cursor = db.get_alerts_page(
+            limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+            cursor=request.args.get('cursor'),
+            severity=request.args.get('severity'),
+            status=request.args.get('status'),
+            location=request.args.get('location'),
+            disease_type=request.args.get('disease_type'),
+            created_after=request.args.get('created_after'),
+            created_before=request.args.get('created_before')
+        )
+        return jsonify({'alerts': alerts, 'next_cursor': next_cursor})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Get alerts error: {e}")
         return jsonify({'error': 'Failed to get alerts'}), 500
 
-@app.route('/alerts', methods=['POST'])
+@api.route('/alerts', methods=['POST'])
 @require_auth
 def create_alert():
     """Create a new health alert"""
@@ -419,7 +885,7 @@ def create_alert():
         return jsonify({'error': 'Failed to create alert'}), 500
 
 # System stats endpoint
-@app.route('/stats', methods=['GET'])
+@api.route('/stats', methods=['GET'])
 @require_auth
 def get_stats():
     """Get system statistics"""
@@ -430,6 +896,62 @@ def get_stats():
         logger.error(f"Get stats error: {e}")
         return jsonify({'error': 'Failed to get statistics'}), 500
 
+# Synthetic requests run through the full pipeline before the app reports ready
+WARMUP_ROUNDS = int(os.getenv("WARMUP_ROUNDS", "3"))
+WARMUP_ENVIRON_KEY = 'aqua_sentinel.warmup'
+
+def warm_up(flask_app: Flask, rounds: int = WARMUP_ROUNDS):
+    """Send probe readings through /predict and /predict/batch so the first real request is not cold"""
+    client = flask_app.test_client()
+    environ = {WARMUP_ENVIRON_KEY: True}
+    for _ in range(rounds):
+        for reading in PROBE_READINGS:
+            response = client.post('/predict', json=reading, environ_base=environ)
+            if response.status_code != 200:
+                raise RuntimeError(f"Warm-up /predict returned {response.status_code}: {response.get_json()}")
+        response = client.post('/predict/batch', json=PROBE_READINGS, environ_base=environ)
+        if response.status_code != 200:
+            raise RuntimeError(f"Warm-up /predict/batch returned {response.status_code}: {response.get_json()}")
+
+def create_app(warm: bool = None) -> Flask:
+    """Build the Flask app, running each startup phase once per process"""
+    flask_app = Flask(__name__)
+    CORS(flask_app)  # Enable CORS for all routes
+    flask_app.register_blueprint(api)
+    
+    if registry is None:
+        try:
+            with startup.phase('database'):
+                db.ensure_initialized()
+            with startup.phase('services'):
+                init_token_cache()
+                init_scoring()
+                init_prediction_log()
+                init_profiler()
+            with startup.phase('model'):
+                init_model()
+        except Exception as e:
+            logger.error(f"Startup failed: {e}")
+            raise
+    
+    if warm is None:
+        warm = os.getenv("WARMUP", "1") == "1"
+    if warm and not startup.ready:
+        # A failed warm-up leaves /ready at 503 but keeps /health and the process up
+        try:
+            with startup.phase('warm_up'):
+                warm_up(flask_app)
+        except Exception as e:
+            logger.error(f"Warm-up failed: {e}")
+        # Warm-up traffic is synthetic; /metrics starts from real requests
+        metrics.clear()
+    
+    startup.mark_ready()
+    logger.info(f"Startup phases (ms): {startup.phases}")
+    return flask_app
+
+app = create_app()
+
 if __name__ == '__main__':
     # Create models directory if it doesn't exist
     os.makedirs('models', exist_ok=True)
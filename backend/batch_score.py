@@ -0,0 +1,174 @@
+"""
+Offline batch scoring of sensor archives against the current model.
+
+Reads a CSV with the same columns as WATER_dATA.csv (extra columns such as a
+disease label are ignored) and writes one output row per input row:
+
+    row,error,p_Cholera,p_Diarrhea,...,top1,top2,top3
+
+`row` is the 0-based data row of the input. Scored rows carry the class
+probabilities and the three most likely diseases. Rows that fail the serving
+validation (a missing or non-numeric sensor) carry the same error message
+/predict would return, and the other columns stay empty.
+
+The model is loaded the way the API loads it (artifact first, then the
+pickle), and rows go through the serving FeaturePlan and score_features. The
+file is split into byte ranges at line boundaries, and each range is parsed,
+scored and formatted by a worker process. The main process only plans ranges
+and appends results in order, so memory stays at a few chunks per worker:
+
+    python batch_score.py archive.csv scores.csv --workers 8
+"""
+
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from inference import class_labels, score_features
+from model_artifact import load_bundle
+
+MODEL_PATH = 'models/water_disease_model.pkl'
+MODEL_ARTIFACT_PATH = 'models/water_disease_model.forest'
+DEFAULT_CHUNK_MB = 16
+
+# Set once per worker by _init_worker, so tasks only carry byte offsets
+_STATE = {}
+
+def _init_worker(data_path: str, columns: List[str], model_path: str, artifact_path: str):
+    model = load_bundle(model_path, artifact_path)
+    labels = [str(label) for label in class_labels(model)]
+    _STATE.update(
+        data_path=data_path,
+        columns=columns,
+        model=model,
+        labels=np.asarray(labels, dtype=object),
+        row_format=','.join(['%d', ''] + ['%.4f'] * len(labels) + ['%s'] * 3),
+        error_format='%d,%s' + ',' * (len(labels) + 3)
+    )
+
+def score_range(task: Tuple[int, int, int]) -> Tuple[str, int, int, int]:
+    """Score the input lines in one byte range; returns (output text, rows, errors, end offset)"""
+    start, end, first_row = task
+    with open(_STATE['data_path'], 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # Only an empty cell is missing; 'n/a' and friends are invalid values, as in /predict
+    chunk = pd.read_csv(io.BytesIO(data), header=None, names=_STATE['columns'], skip_blank_lines=False,
+                        keep_default_na=False, na_values=[''])
+    n_rows = len(chunk)
+
+    model = _STATE['model']
+    features, valid_indices, errors = model['feature_plan'].transform_columns(
+        {name: chunk[name].to_numpy() for name in chunk.columns}, n_rows
+    )
+
+    lines: List[str] = [''] * n_rows
+    if valid_indices:
+        probabilities = score_features(features, model)
+        top = _STATE['labels'][np.argsort(-probabilities, axis=1, kind='stable')[:, :3]]
+        row_format = _STATE['row_format']
+        for i, p, labels in zip(valid_indices, probabilities.tolist(), top.tolist()):
+            lines[i] = row_format % (first_row + i, *p, *labels)
+    for i, message in errors.items():
+        lines[i] = _STATE['error_format'] % (first_row + i, message)
+    return '\n'.join(lines) + '\n', n_rows, len(errors), end
+
+def plan_ranges(path: str, chunk_bytes: int) -> Iterator[Tuple[int, int, int]]:
+    """(start, end, first row) byte ranges of whole lines, after the header"""
+    with open(path, 'rb') as f:
+        f.readline()
+        start, row = f.tell(), 0
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                return
+            # Extend to the end of the line the block stops in
+            block += f.readline()
+            end = start + len(block)
+            yield start, end, row
+            row += block.count(b'\n') + (not block.endswith(b'\n'))
+            start = end
+
+def batch_score(data_path: str, output: str, model_path: str = MODEL_PATH,
+                artifact_path: Optional[str] = MODEL_ARTIFACT_PATH, workers: int = 1,
+                chunk_mb: float = DEFAULT_CHUNK_MB, progress_seconds: float = 2.0) -> Dict:
+    """Score every row of data_path into output; returns counts, timing and the model version"""
+    columns = pd.read_csv(data_path, nrows=0).columns.tolist()
+    # Load once here too: fail fast on a missing model or columns, and name the classes
+    model = load_bundle(model_path, artifact_path)
+    missing = [f for f in model['feature_plan'].required_fields if f not in columns]
+    if missing:
+        raise ValueError(f"{data_path} lacks required sensor columns: {missing}")
+    header = ','.join(['row', 'error'] + [f'p_{label}' for label in class_labels(model)] + ['top1', 'top2', 'top3'])
+
+    total_bytes = os.path.getsize(data_path)
+    ranges = plan_ranges(data_path, max(int(chunk_mb * (1 << 20)), 1))
+    init_args = (data_path, columns, model_path, artifact_path)
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=init_args)
+        results = pool.imap(score_range, ranges)
+    else:
+        pool = None
+        _init_worker(*init_args)
+        results = map(score_range, ranges)
+
+    started = last_report = time.perf_counter()
+    rows = errors = output_bytes = 0
+    tmp = f"{output}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    try:
+        with open(tmp, 'w') as f:
+            f.write(header + '\n')
+            for text, n_rows, n_errors, end in results:
+                f.write(text)
+                rows += n_rows
+                errors += n_errors
+                output_bytes = f.tell()
+                now = time.perf_counter()
+                if progress_seconds and now - last_report >= progress_seconds:
+                    last_report = now
+                    print(f"⏳ {end / total_bytes:.0%}: {rows:,} rows, {rows / (now - started):,.0f} rows/s",
+                          file=sys.stderr)
+        os.replace(tmp, output)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    seconds = time.perf_counter() - started
+    return {
+        'rows': rows,
+        'scored': rows - errors,
+        'errors': errors,
+        'seconds': round(seconds, 2),
+        'rows_per_second': round(rows / max(seconds, 1e-9)),
+        'input_mb': round(total_bytes / 1e6, 1),
+        'output_mb': round(output_bytes / 1e6, 1),
+        'model_version': model['version']
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a CSV sensor archive with the current model")
+    parser.add_argument("data", help="CSV with the WATER_dATA.csv sensor columns")
+    parser.add_argument("output", help="CSV to write probabilities and top-3 diseases to")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--artifact", default=MODEL_ARTIFACT_PATH, help="memory-mapped artifact; '' uses the pickle")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-mb", type=float, default=DEFAULT_CHUNK_MB, help="input bytes per task")
+    args = parser.parse_args()
+
+    print(f"🧮 Scoring {args.data} with {args.workers} worker(s)...")
+    stats = batch_score(args.data, args.output, args.model, args.artifact, args.workers, args.chunk_mb)
+    print(f"✅ {stats['rows']:,} rows ({stats['errors']:,} invalid) in {stats['seconds']}s "
+          f"({stats['rows_per_second']:,} rows/s) with model {stats['model_version']}")
+    print(f"💾 Results written to {args.output}")
@@ -0,0 +1,172 @@
+"""
+Dynamic request coalescing for concurrent single-reading predictions.
+
+Requests submit their feature rows to a MicroBatcher, which waits a short
+window (or until enough rows arrive), scores everything as one matrix and
+hands each caller its own slice of the result. Rows submitted with different
+contexts (e.g. model versions) are never scored in the same batch.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+QUEUE_WAIT_BUCKETS_MS = [0.5, 1, 2, 5, 10, 25, 50, 100]
+
+class _Pending:
+    """A caller's feature rows waiting to be scored"""
+
+    __slots__ = ('features', 'context', 'future', 'enqueued')
+
+    def __init__(self, features: np.ndarray, context=None):
+        self.features = features
+        self.context = context
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+class BatchingStats:
+    """Batch-size and queue-wait counters for tuning the coalescing window"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_rows = 0
+        self.queue_wait_sum_ms = 0.0
+        self.queue_wait_max_ms = 0.0
+        self.requests = 0
+        self.batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self.queue_wait_counts = [0] * (len(QUEUE_WAIT_BUCKETS_MS) + 1)
+
+    @staticmethod
+    def _bucket(bounds: List[float], value: float) -> int:
+        for i, bound in enumerate(bounds):
+            if value <= bound:
+                return i
+        return len(bounds)
+
+    def record(self, batch_rows: int, waits_ms: List[float]):
+        with self._lock:
+            self.batches += 1
+            self.rows += batch_rows
+            self.max_batch_rows = max(self.max_batch_rows, batch_rows)
+            self.batch_size_counts[self._bucket(BATCH_SIZE_BUCKETS, batch_rows)] += 1
+            for wait in waits_ms:
+                self.requests += 1
+                self.queue_wait_sum_ms += wait
+                self.queue_wait_max_ms = max(self.queue_wait_max_ms, wait)
+                self.queue_wait_counts[self._bucket(QUEUE_WAIT_BUCKETS_MS, wait)] += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            labels = [str(b) for b in BATCH_SIZE_BUCKETS] + ['+Inf']
+            wait_labels = [str(b) for b in QUEUE_WAIT_BUCKETS_MS] + ['+Inf']
+            return {
+                "batches": self.batches,
+                "rows": self.rows,
+                "requests": self.requests,
+                "mean_batch_rows": round(self.rows / self.batches, 2) if self.batches else 0.0,
+                "max_batch_rows": self.max_batch_rows,
+                "mean_queue_wait_ms": round(self.queue_wait_sum_ms / self.requests, 3) if self.requests else 0.0,
+                "max_queue_wait_ms": round(self.queue_wait_max_ms, 3),
+                "batch_size_histogram": dict(zip(labels, self.batch_size_counts)),
+                "queue_wait_ms_histogram": dict(zip(wait_labels, self.queue_wait_counts))
+            }
+
+class MicroBatcher:
+    """Coalesces concurrent scoring calls into one matrix per window"""
+
+    def __init__(self, score_fn: Callable[[np.ndarray], np.ndarray],
+                 window_ms: float = 3.0, max_rows: int = 64):
+        self.score_fn = score_fn
+        self.window = window_ms / 1000.0
+        self.max_rows = max_rows
+        self.stats = BatchingStats()
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_running(self):
+        # Threads do not survive a gunicorn fork, so start lazily per process
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="predict-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, features: np.ndarray, context=None) -> Future:
+        """Queue a (n, n_features) matrix; the future resolves to its probability rows
+
+        A non-None context is passed to score_fn as its second argument.
+        """
+        self._ensure_running()
+        pending = _Pending(features, context)
+        self._queue.put(pending)
+        return pending.future
+
+    def score(self, features: np.ndarray, timeout: float = 5.0, context=None) -> np.ndarray:
+        """Submit and wait for the result"""
+        return self.submit(features, context).result(timeout=timeout)
+
+    def _run(self):
+        carry = None
+        while True:
+            first = carry if carry is not None else self._queue.get()
+            carry = None
+            batch = [first]
+            rows = first.features.shape[0]
+            deadline = first.enqueued + self.window
+
+            # Collect until the window closes or the batch is full
+            while rows < self.max_rows:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if pending.context is not first.context:
+                    # Starts the next batch
+                    carry = pending
+                    break
+                batch.append(pending)
+                rows += pending.features.shape[0]
+
+            self._score_batch(batch, rows)
+
+    def _score_batch(self, batch: List[_Pending], rows: int):
+        started = time.perf_counter()
+        waits_ms = [(started - pending.enqueued) * 1000.0 for pending in batch]
+
+        try:
+            matrix = batch[0].features if len(batch) == 1 else np.vstack([p.features for p in batch])
+            context = batch[0].context
+            probabilities = self.score_fn(matrix) if context is None else self.score_fn(matrix, context)
+        except Exception as e:
+            logger.error(f"Batched scoring failed: {e}")
+            for pending in batch:
+                pending.future.set_exception(e)
+            return
+
+        offset = 0
+        for pending in batch:
+            n = pending.features.shape[0]
+            pending.future.set_result(probabilities[offset:offset + n])
+            offset += n
+
+        self.stats.record(rows, waits_ms)
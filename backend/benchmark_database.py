@@ -0,0 +1,74 @@
+"""
+Benchmark DatabaseManager's pooled connections against the old per-call connect pattern
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from database import DatabaseManager
+
+class PerCallConnectionManager(DatabaseManager):
+    """The previous behaviour: a fresh, untuned connection for every call"""
+
+    def get_connection(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+def seed(manager: DatabaseManager, n_alerts: int, n_surveys: int):
+    """Populate a fresh database with a volunteer, surveys and alerts"""
+    user_id = manager.create_user("bench", "bench@health.gov", "bench123", "volunteer", "Bench User")
+    conn = sqlite3.connect(manager.db_path)
+    conn.executemany(
+        "INSERT INTO alerts (title, description, severity, location, disease_type, cases_count) VALUES (?, ?, ?, ?, ?, ?)",
+        [(f"Alert {i}", "Synthetic alert", "medium", f"Village {i % 50}", "Cholera", i % 20) for i in range(n_alerts)]
+    )
+    conn.executemany(
+        "INSERT INTO surveys (user_id, location, water_quality) VALUES (?, ?, ?)",
+        [(user_id, f"Village {i % 50}", "fair") for i in range(n_surveys)]
+    )
+    conn.commit()
+    conn.close()
+    return user_id
+
+def time_call(fn, iterations: int) -> float:
+    """Mean microseconds per call"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def run_benchmark(iterations: int, n_alerts: int, n_surveys: int):
+    results = {}
+    for label, manager_cls in [("per-call connect", PerCallConnectionManager), ("pooled + WAL", DatabaseManager)]:
+        db_dir = tempfile.mkdtemp(prefix="db_bench_")
+        manager = manager_cls(os.path.join(db_dir, "bench.db"))
+        user_id = seed(manager, n_alerts, n_surveys)
+
+        results[label] = {
+            "authenticate_user": time_call(lambda: manager.authenticate_user("bench", "bench123"), iterations),
+            "get_alerts_page": time_call(manager.get_alerts_page, iterations),
+            "get_user_surveys_page": time_call(lambda: manager.get_user_surveys_page(user_id), iterations),
+            "get_system_stats": time_call(manager.get_system_stats, iterations),
+            "create_survey": time_call(lambda: manager.create_survey(user_id, "Bench Village", water_quality="good"), iterations)
+        }
+
+    baseline, pooled = results["per-call connect"], results["pooled + WAL"]
+    print(f"{'operation':<22} {'per-call (µs)':>14} {'pooled (µs)':>12} {'speedup':>8}")
+    for operation in baseline:
+        print(f"{operation:<22} {baseline[operation]:>14.1f} {pooled[operation]:>12.1f} "
+              f"{baseline[operation] / pooled[operation]:>7.1f}x")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--alerts", type=int, default=200)
+    parser.add_argument("--surveys", type=int, default=200)
+    args = parser.parse_args()
+
+    print("⏱️  DatabaseManager connection benchmark")
+    print("=" * 60)
+    run_benchmark(args.iterations, args.alerts, args.surveys)
@@ -0,0 +1,128 @@
+"""
+Parity and cost report for the float32 feature pipeline
+
+Parity, on the reference dataset (WATER_dATA.csv plus jittered copies with
+missing values):
+  - serving: the shipped model's float64 engine against its float32 copy
+    (same leaves reached, predicted classes, largest probability difference);
+  - training: models trained from float64 and float32 matrices, compared on
+    their predicted classes.
+Cost, on a dataset resampled to --rows rows: loaded DataFrame (float64 is the
+old loader: plain read_csv with object labels) and prepared matrix size,
+artifact size, and scoring throughput at each precision.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from inference import compile_model
+from model_artifact import export_artifact
+from train_model import WaterDiseasePredictor, load_dataset
+
+MODEL_PATH = 'models/water_disease_model.pkl'
+DATA_PATH = 'WATER_dATA.csv'
+
+def reference_features(sensor_features, rows: int = 2000, seed: int = 42) -> np.ndarray:
+    """Reference readings plus jittered copies with 5% missing values, with has_ indicators"""
+    sensors = pd.read_csv(DATA_PATH)[sensor_features].to_numpy(dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    jittered = sensors[rng.integers(0, len(sensors), rows)] * rng.uniform(0.7, 1.3, (rows, sensors.shape[1]))
+    jittered[rng.random(jittered.shape) < 0.05] = np.nan
+    raw = np.vstack([sensors, jittered])
+    return np.hstack([raw, (~np.isnan(raw)).astype(np.float64)])
+
+def serving_parity() -> dict:
+    model = compile_model(joblib.load(MODEL_PATH))
+    engine64, engine32 = model['engine'], model['engine'].to_float32()
+    X = reference_features(model['sensor_features'])
+    X64 = model['compiled_imputer'].transform(X)
+    X32 = model['compiled_imputer'].transform(X.astype(np.float32))
+
+    p64, p32 = engine64.predict_proba(X64), engine32.predict_proba(X32)
+    return {
+        'rows': len(X),
+        'same_leaves': bool((engine64._leaves(X64.astype(np.float32)) == engine32._leaves(X32)).all()),
+        'class_changes': int((engine64.predict(X64, p64) != engine32.predict(X32, p32)).sum()),
+        'max_abs_proba_diff': float(np.abs(p64 - p32).max())
+    }
+
+def training_parity(n_estimators: int) -> dict:
+    predictions = {}
+    for precision in ('float64', 'float32'):
+        predictor = WaterDiseasePredictor(precision)
+        X, y, names = predictor.prepared_matrix(predictor.prepare_dataframe(load_dataset(DATA_PATH, precision),
+                                                                           verbose=False))
+        with contextlib.redirect_stdout(io.StringIO()):
+            predictor.train_matrix(X, y, names, params={'n_estimators': n_estimators})
+        reference = pd.DataFrame(predictor.imputer.transform(pd.DataFrame(X, columns=names)), columns=names)
+        predictions[precision] = (predictor.model.predict(reference), predictor.imputer.statistics_)
+    (labels64, medians64), (labels32, medians32) = predictions['float64'], predictions['float32']
+    return {
+        'rows': len(labels64),
+        'class_changes': int((labels64 != labels32).sum()),
+        'max_median_diff': float(np.abs(medians64 - medians32.astype(np.float64)).max())
+    }
+
+def measure_costs(rows: int) -> dict:
+    rng = np.random.default_rng(0)
+    base = pd.read_csv(DATA_PATH)
+    path = os.path.join(tempfile.mkdtemp(prefix='float32_bench_'), 'data.csv')
+    base.iloc[rng.integers(0, len(base), rows)].to_csv(path, index=False)
+
+    model = compile_model(joblib.load(MODEL_PATH))
+    engines = {'float64': model['engine'], 'float32': model['engine'].to_float32()}
+    costs = {}
+    for precision, engine in engines.items():
+        predictor = WaterDiseasePredictor(precision)
+        loaded = load_dataset(path, precision)
+        # The float64 row stands for the previous loader: plain read_csv, object labels
+        loaded_mb = (pd.read_csv(path) if precision == 'float64' else loaded).memory_usage(deep=True).sum() / 1e6
+        df = predictor.prepare_dataframe(loaded, verbose=False)
+        X, _, _ = predictor.prepared_matrix(df)
+
+        artifact = os.path.join(os.path.dirname(path), f'{precision}.forest')
+        export_artifact(dict(model), artifact, precision=precision)
+        artifact_bytes = sum(os.path.getsize(os.path.join(artifact, f)) for f in os.listdir(artifact))
+
+        # Reorder to the model's feature layout, then score the whole matrix
+        features = pd.DataFrame(X, columns=predictor.create_missing_indicators(df.head(0)).columns.drop('disease'))
+        features = features[model['feature_names']].to_numpy()
+        started = time.perf_counter()
+        engine.predict_proba(model['compiled_imputer'].transform(features))
+        elapsed = time.perf_counter() - started
+
+        costs[precision] = {
+            'loaded_mb': loaded_mb,
+            'matrix_mb': X.nbytes / 1e6,
+            'artifact_kb': artifact_bytes / 1024,
+            'rows_per_second': rows / elapsed
+        }
+    return costs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000, help="rows in the resampled cost dataset")
+    parser.add_argument("--trees", type=int, default=100, help="trees per model in the training parity check")
+    args = parser.parse_args()
+
+    print("🧮 float32 pipeline parity report")
+    print("=" * 60)
+    serving = serving_parity()
+    print(f"Serving  ({serving['rows']:,} rows): same leaves={serving['same_leaves']}, "
+          f"class changes={serving['class_changes']}, max |Δp|={serving['max_abs_proba_diff']:.2e}")
+    training = training_parity(args.trees)
+    print(f"Training ({training['rows']:,} rows): class changes={training['class_changes']}, "
+          f"max median diff={training['max_median_diff']:.2e}")
+
+    print(f"\n{'precision':<10} {'loaded (MB)':>15} {'matrix (MB)':>12} {'artifact (KiB)':>15} {'rows/s':>10}")
+    for precision, cost in measure_costs(args.rows).items():
+        print(f"{precision:<10} {cost['loaded_mb']:>15.1f} {cost['matrix_mb']:>12.1f} "
+              f"{cost['artifact_kb']:>15.0f} {cost['rows_per_second']:>10,.0f}")
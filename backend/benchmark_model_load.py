@@ -0,0 +1,111 @@
+"""
+Benchmark model load time and per-worker memory: pickle vs memory-mapped artifact
+
+Each scenario forks a fresh parent that starts N workers the way gunicorn does,
+either loading the model in every worker or once in the parent before fork
+(--preload). Workers score a batch so every model page is touched, then report
+RSS, PSS (shared pages split between the processes that map them) and private
+memory from /proc/self/smaps_rollup while all of them are still alive.
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from model_artifact import is_artifact, load_artifact
+from model_report import memory_usage
+
+MODEL_PATH = "models/water_disease_model.pkl"
+ARTIFACT_PATH = "models/water_disease_model.forest"
+
+def load_pickle():
+    # Imported here so each scenario pays for sklearn only if it unpickles
+    import joblib
+    from inference import compile_model
+    return compile_model(joblib.load(MODEL_PATH))
+
+def score(bundle, X: np.ndarray):
+    return bundle["engine"].predict_proba(bundle["compiled_imputer"].transform(X))
+
+def worker(loader, preloaded, X, barrier, results):
+    start = time.perf_counter()
+    bundle = preloaded if preloaded is not None else loader()
+    load_ms = (time.perf_counter() - start) * 1000
+    score(bundle, X)
+
+    barrier.wait()
+    results.put({"load_ms": load_ms, **memory_usage()})
+    barrier.wait()
+
+def run_scenario(loader, preload: bool, workers: int, X: np.ndarray, summary):
+    ctx = multiprocessing.get_context("fork")
+    preloaded, preload_ms = None, 0.0
+    if preload:
+        start = time.perf_counter()
+        preloaded = loader()
+        preload_ms = (time.perf_counter() - start) * 1000
+
+    barrier = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(loader, preloaded, X, barrier, results)) for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+
+    barrier.wait()
+    rows = [results.get() for _ in procs]
+    barrier.wait()
+    for proc in procs:
+        proc.join()
+
+    summary.put({
+        "load_ms": preload_ms if preload else float(np.mean([row["load_ms"] for row in rows])),
+        **{key: float(np.mean([row[key] for row in rows])) for key in ("rss_mb", "pss_mb", "private_mb")}
+    })
+
+def run_benchmark(workers: int, rows: int, artifact_path: str):
+    if not is_artifact(artifact_path):
+        from model_artifact import export_artifact
+        artifact_path = os.path.join(tempfile.mkdtemp(prefix="artifact_bench_"), "model.forest")
+        export_artifact(load_pickle(), artifact_path)
+
+    n_features = load_artifact(artifact_path)["engine"].n_features_in_
+    X = np.random.default_rng(0).normal(size=(rows, n_features))
+
+    scenarios = [
+        ("pickle, load per worker", load_pickle, False),
+        ("pickle, --preload", load_pickle, True),
+        ("artifact, load per worker", lambda: load_artifact(artifact_path), False),
+        ("artifact, --preload", lambda: load_artifact(artifact_path), True)
+    ]
+
+    ctx = multiprocessing.get_context("fork")
+    results = {}
+    print(f"{'scenario':<28} {'load (ms)':>10} {'RSS (MB)':>9} {'PSS (MB)':>9} {'private (MB)':>13}")
+    for label, loader, preload in scenarios:
+        summary = ctx.Queue()
+        # A fresh parent per scenario so earlier imports and loads do not leak into it
+        parent = ctx.Process(target=run_scenario, args=(loader, preload, workers, X, summary))
+        parent.start()
+        results[label] = summary.get()
+        parent.join()
+
+        row = results[label]
+        print(f"{label:<28} {row['load_ms']:>10.1f} {row['rss_mb']:>9.1f} {row['pss_mb']:>9.1f} {row['private_mb']:>13.1f}")
+
+    print("\nload (ms) is per worker, or once in the parent with --preload; memory columns are per worker")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=1000, help="rows scored by each worker to touch the model")
+    parser.add_argument("--artifact", default=ARTIFACT_PATH)
+    args = parser.parse_args()
+
+    print("⏱️  Model load and per-worker memory benchmark")
+    print("=" * 60)
+    run_benchmark(args.workers, args.rows, args.artifact)
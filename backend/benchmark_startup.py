@@ -0,0 +1,72 @@
+"""
+Benchmark application startup: time to ready and first-request latency
+
+Every run starts a fresh interpreter, imports app (which runs create_app and
+its phases), then times the first and second /predict through the test client.
+Comparing configurations shows what the artifact path and warm-up buy.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SNIPPET = r"""
+import json, time
+t0 = time.perf_counter()
+import app as app_module
+ready_ms = (time.perf_counter() - t0) * 1000
+
+client = app_module.app.test_client()
+reading = app_module.PROBE_READINGS[0]
+latencies = []
+for _ in range(2):
+    start = time.perf_counter()
+    assert client.post('/predict', json=reading).status_code == 200
+    latencies.append((time.perf_counter() - start) * 1000)
+
+print(json.dumps({
+    "ready_ms": ready_ms,
+    "phases_ms": app_module.startup.snapshot()["phases_ms"],
+    "first_ms": latencies[0],
+    "second_ms": latencies[1]
+}))
+"""
+
+CONFIGURATIONS = [
+    ("pickle, no warm-up", {"MODEL_ARTIFACT_PATH": "/nonexistent", "WARMUP": "0"}),
+    ("artifact, no warm-up", {"WARMUP": "0"}),
+    ("artifact, warm-up", {"WARMUP": "1"})
+]
+
+def run_once(overrides: dict) -> dict:
+    env = dict(os.environ)
+    env.update(overrides)
+    env.setdefault("DATABASE_PATH", os.path.join(tempfile.mkdtemp(prefix="startup_bench_"), "health.db"))
+    env["PREDICTION_LOG"] = "0"
+    result = subprocess.run([sys.executable, "-c", SNIPPET], env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run_benchmark(runs: int):
+    results = {}
+    print(f"{'configuration':<22} {'ready (ms)':>11} {'1st /predict':>13} {'2nd /predict':>13}  phases (ms)")
+    for label, overrides in CONFIGURATIONS:
+        samples = [run_once(overrides) for _ in range(runs)]
+        median = {key: statistics.median(s[key] for s in samples) for key in ("ready_ms", "first_ms", "second_ms")}
+        phases = {name: statistics.median(s["phases_ms"].get(name, 0.0) for s in samples)
+                  for name in samples[0]["phases_ms"]}
+        results[label] = {**median, "phases_ms": phases}
+        print(f"{label:<22} {median['ready_ms']:>11.1f} {median['first_ms']:>13.2f} {median['second_ms']:>13.2f}  {phases}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per configuration (median reported)")
+    args = parser.parse_args()
+
+    print("⏱️  Application startup benchmark")
+    print("=" * 60)
+    run_benchmark(args.runs)
@@ -0,0 +1,10 @@
+"""
+Shared test setup: keep test runs away from the checked-in database
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault(
+    "DATABASE_PATH", os.path.join(tempfile.mkdtemp(prefix="health_test_"), "health_surveillance.db")
+)
@@ -3,90 +3,333 @@ Database models and setup for Smart Health Surveillance System
 """
 import sqlite3
 import hashlib
+import base64
+import json
+import threading
+import time
 import jwt
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, Callable
 import os
+import logging
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
 
 # Database configuration
-DATABASE_PATH = "health_surveillance.db"
+DATABASE_PATH = os.getenv("DATABASE_PATH", "health_surveillance.db")
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 
+# Connection tuning applied to every long-lived connection
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+CONNECTION_PRAGMAS = {
+    "journal_mode": "WAL",      # readers never block the writer
+    "synchronous": "NORMAL",    # durable with WAL, without an fsync per commit
+    "cache_size": -16000,       # 16 MB page cache per connection
+    "mmap_size": 268435456,     # 256 MB memory-mapped reads
+    "temp_store": "MEMORY",
+    "busy_timeout": BUSY_TIMEOUT_MS
+}
+# Prepared statements kept per connection
+STATEMENT_CACHE_SIZE = 128
+
+# Recompute the statistics tables from scratch (migration 5 and rebuild_stats)
+STATS_SEED_STATEMENTS = [
+    '''
+    INSERT INTO system_counters (name, value)
+        SELECT 'total_users', COUNT(*) FROM users WHERE is_active = 1
+        UNION ALL SELECT 'pending_approvals', COUNT(*) FROM surveys WHERE status = 'pending'
+        UNION ALL SELECT 'total_submissions', COUNT(*) FROM surveys
+    ''',
+    '''
+    INSERT INTO login_hour_counts (hour, users)
+        SELECT strftime('%Y-%m-%d %H', last_login), COUNT(*) FROM users
+        WHERE last_login IS NOT NULL GROUP BY 1
+    '''
+]
+COUNTER_NAMES = ('total_users', 'pending_approvals', 'total_submissions')
+
+# Schema migrations, applied in order. PRAGMA user_version records the last
+# one applied; add new entries at the end instead of editing earlier ones.
+MIGRATIONS = [
+    (1, "Create core tables", [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            role TEXT NOT NULL CHECK (role IN ('volunteer', 'official', 'admin')),
+            full_name TEXT NOT NULL,
+            phone TEXT,
+            location TEXT,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS surveys (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            location TEXT NOT NULL,
+            latitude REAL,
+            longitude REAL,
+            water_quality TEXT CHECK (water_quality IN ('good', 'fair', 'poor')),
+            status TEXT DEFAULT 'pending' CHECK (status IN ('pending', 'approved', 'rejected')),
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS predictions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            sensor_data TEXT NOT NULL, -- JSON string
+            predicted_disease TEXT,
+            confidence REAL,
+            risk_level TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT,
+            severity TEXT NOT NULL CHECK (severity IN ('low', 'medium', 'high', 'critical')),
+            location TEXT NOT NULL,
+            disease_type TEXT,
+            cases_count INTEGER DEFAULT 0,
+            status TEXT DEFAULT 'active' CHECK (status IN ('active', 'investigating', 'resolved')),
+            created_by INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (created_by) REFERENCES users (id)
+        )
+        '''
+    ]),
+    (2, "Indexes for hot queries", [
+        # get_user_surveys_page: filter on user_id, newest first
+        'CREATE INDEX IF NOT EXISTS idx_surveys_user_created ON surveys (user_id, created_at)',
+        # get_system_stats: pending approvals
+        'CREATE INDEX IF NOT EXISTS idx_surveys_status ON surveys (status)',
+        # get_alerts_page: newest first (the rowid tiebreak comes with the index)
+        'CREATE INDEX IF NOT EXISTS idx_alerts_created ON alerts (created_at)',
+        # get_system_stats: active and recently logged-in users
+        'CREATE INDEX IF NOT EXISTS idx_users_is_active ON users (is_active)',
+        'CREATE INDEX IF NOT EXISTS idx_users_last_login ON users (last_login)'
+    ]),
+    (3, "Indexes for filtered alert listings", [
+        'CREATE INDEX IF NOT EXISTS idx_alerts_status_created ON alerts (status, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_alerts_severity_created ON alerts (severity, created_at)'
+    ]),
+    (4, "Allow anonymous predictions and record the model version", [
+        '''
+        CREATE TABLE predictions_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            sensor_data TEXT NOT NULL, -- JSON string
+            predicted_disease TEXT,
+            confidence REAL,
+            risk_level TEXT,
+            model_version TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        ''',
+        '''
+        INSERT INTO predictions_new (id, user_id, sensor_data, predicted_disease, confidence, risk_level, created_at)
+        SELECT id, user_id, sensor_data, predicted_disease, confidence, risk_level, created_at FROM predictions
+        ''',
+        'DROP TABLE predictions',
+        'ALTER TABLE predictions_new RENAME TO predictions',
+        'CREATE INDEX IF NOT EXISTS idx_predictions_created ON predictions (created_at)'
+    ]),
+    (5, "Incrementally maintained system statistics", [
+        'CREATE TABLE IF NOT EXISTS system_counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0)',
+        # Users bucketed by the hour of their most recent login
+        'CREATE TABLE IF NOT EXISTS login_hour_counts (hour TEXT PRIMARY KEY, users INTEGER NOT NULL DEFAULT 0)',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_users_stats_insert AFTER INSERT ON users BEGIN
+            UPDATE system_counters SET value = value + (NEW.is_active = 1) WHERE name = 'total_users';
+            INSERT INTO login_hour_counts (hour, users)
+                SELECT strftime('%Y-%m-%d %H', NEW.last_login), 1 WHERE NEW.last_login IS NOT NULL
+                ON CONFLICT (hour) DO UPDATE SET users = users + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_users_stats_active AFTER UPDATE OF is_active ON users BEGIN
+            UPDATE system_counters SET value = value + (NEW.is_active = 1) - (OLD.is_active = 1)
+                WHERE name = 'total_users';
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_users_stats_login AFTER UPDATE OF last_login ON users BEGIN
+            UPDATE login_hour_counts SET users = users - 1
+                WHERE OLD.last_login IS NOT NULL AND hour = strftime('%Y-%m-%d %H', OLD.last_login);
+            INSERT INTO login_hour_counts (hour, users)
+                SELECT strftime('%Y-%m-%d %H', NEW.last_login), 1 WHERE NEW.last_login IS NOT NULL
+                ON CONFLICT (hour) DO UPDATE SET users = users + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_users_stats_delete AFTER DELETE ON users BEGIN
+            UPDATE system_counters SET value = value - (OLD.is_active = 1) WHERE name = 'total_users';
+            UPDATE login_hour_counts SET users = users - 1
+                WHERE OLD.last_login IS NOT NULL AND hour = strftime('%Y-%m-%d %H', OLD.last_login);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_surveys_stats_insert AFTER INSERT ON surveys BEGIN
+            UPDATE system_counters SET value = value + 1 WHERE name = 'total_submissions';
+            UPDATE system_counters SET value = value + (NEW.status = 'pending') WHERE name = 'pending_approvals';
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_surveys_stats_status AFTER UPDATE OF status ON surveys BEGIN
+            UPDATE system_counters SET value = value + (NEW.status = 'pending') - (OLD.status = 'pending')
+                WHERE name = 'pending_approvals';
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_surveys_stats_delete AFTER DELETE ON surveys BEGIN
+            UPDATE system_counters SET value = value - 1 WHERE name = 'total_submissions';
+            UPDATE system_counters SET value = value - (OLD.status = 'pending') WHERE name = 'pending_approvals';
+        END
+        '''
+    ] + STATS_SEED_STATEMENTS),
+    (6, "Per-user token revocation", [
+        # Tokens issued (iat) before this Unix time are rejected: set on logout and deactivation
+        'ALTER TABLE users ADD COLUMN tokens_valid_after REAL NOT NULL DEFAULT 0'
+    ])
+]
+
+# Keyset pagination for list endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+ALERT_COLUMNS = ['id', 'title', 'description', 'severity', 'location', 'disease_type',
+                 'cases_count', 'status', 'created_at']
+SURVEY_COLUMNS = ['id', 'location', 'latitude', 'longitude', 'water_quality', 'status',
+                  'notes', 'created_at']
+
+def encode_cursor(created_at: str, row_id: int) -> str:
+    """Opaque next-page token for the (created_at, id) sort key"""
+    return base64.urlsafe_b64encode(json.dumps([created_at, row_id]).encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Inverse of encode_cursor; raises ValueError for malformed tokens"""
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor") from None
+
+def normalize_timestamp(value: str) -> str:
+    """Convert an ISO date or datetime to the 'YYYY-MM-DD HH:MM:SS' form stored by SQLite"""
+    try:
+        return datetime.fromisoformat(value).strftime('%Y-%m-%d %H:%M:%S')
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid date: {value}") from None
+
 class DatabaseManager:
-    def __init__(self, db_path: str = DATABASE_PATH):
+    def __init__(self, db_path: str = DATABASE_PATH, lazy: bool = False):
         self.db_path = db_path
-        self.init_database()
+        self._local = threading.local()
+        # Called with a user id whenever that user's tokens must stop being trusted
+        self._revocation_listeners: List[Callable[[int], Any]] = []
+        self._init_lock = threading.RLock()
+        self._initialized = False
+        self._initializing = False
+        # Lazy managers open SQLite and migrate on first use instead of at construction
+        if not lazy:
+            self.ensure_initialized()
+    
+    def ensure_initialized(self):
+        """Run init_database once; other threads wait until it has finished"""
+        if self._initialized:
+            return
+        with self._init_lock:
+            # init_database itself calls get_connection on this thread
+            if self._initialized or self._initializing:
+                return
+            self._initializing = True
+            try:
+                self.init_database()
+                self._initialized = True
+            finally:
+                self._initializing = False
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a tuned connection"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        for pragma, value in CONNECTION_PRAGMAS.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        return conn
+    
+    def get_connection(self) -> sqlite3.Connection:
+        """Return this thread's long-lived connection, opening it on first use"""
+        if not self._initialized:
+            self.ensure_initialized()
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited across fork() must not be shared with the parent
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+    
+    def schema_version(self) -> int:
+        """Return the last migration applied to this database"""
+        return self.get_connection().execute('PRAGMA user_version').fetchone()[0]
+    
+    @metrics.timed('database_call_seconds')
+    def migrate(self) -> int:
+        """Apply pending schema migrations, each in its own transaction"""
+        conn = self.get_connection()
+        
+        for version, description, statements in MIGRATIONS:
+            if version <= self.schema_version():
+                continue
+            
+            # IMMEDIATE takes the write lock so concurrent workers migrate one at a time
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if conn.execute('PRAGMA user_version').fetchone()[0] >= version:
+                    conn.rollback()
+                    continue
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {version}')
+                conn.commit()
+                logger.info(f"Applied schema migration {version}: {description}")
+            except Exception:
+                conn.rollback()
+                raise
+        
+        return self.schema_version()
     
     def init_database(self):
         """Initialize database with required tables"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
-        # Users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                role TEXT NOT NULL CHECK (role IN ('volunteer', 'official', 'admin')),
-                full_name TEXT NOT NULL,
-                phone TEXT,
-                location TEXT,
-                is_active BOOLEAN DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_login TIMESTAMP
-            )
-        ''')
-        
-        # Surveys table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS surveys (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                location TEXT NOT NULL,
-                latitude REAL,
-                longitude REAL,
-                water_quality TEXT CHECK (water_quality IN ('good', 'fair', 'poor')),
-                status TEXT DEFAULT 'pending' CHECK (status IN ('pending', 'approved', 'rejected')),
-                notes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # Predictions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS predictions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                sensor_data TEXT NOT NULL, -- JSON string
-                predicted_disease TEXT,
-                confidence REAL,
-                risk_level TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # Alerts table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS alerts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT,
-                severity TEXT NOT NULL CHECK (severity IN ('low', 'medium', 'high', 'critical')),
-                location TEXT NOT NULL,
-                disease_type TEXT,
-                cases_count INTEGER DEFAULT 0,
-                status TEXT DEFAULT 'active' CHECK (status IN ('active', 'investigating', 'resolved')),
-                created_by INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (created_by) REFERENCES users (id)
-            )
-        ''')
+        # Create or upgrade the schema
+        self.migrate()
         
         # Create default admin user
         cursor.execute('SELECT COUNT(*) FROM users WHERE role = "admin"')
@@ -98,7 +341,6 @@ class DatabaseManager:
             ''', ("admin", "admin@health.gov", admin_password, "admin", "System Administrator"))
         
         conn.commit()
-        conn.close()
     
     def hash_password(self, password: str) -> str:
         """Hash password using SHA-256"""
@@ -108,30 +350,29 @@ class DatabaseManager:
         """Verify password against hash"""
         return self.hash_password(password) == hashed
     
+    @metrics.timed('database_call_seconds')
     def create_user(self, username: str, email: str, password: str, role: str, full_name: str, phone: str = None, location: str = None) -> int:
         """Create a new user"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         password_hash = self.hash_password(password)
         
         try:
-            cursor.execute('''
-                INSERT INTO users (username, email, password_hash, role, full_name, phone, location)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (username, email, password_hash, role, full_name, phone, location))
+            with conn:
+                cursor.execute('''
+                    INSERT INTO users (username, email, password_hash, role, full_name, phone, location)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (username, email, password_hash, role, full_name, phone, location))
             
-            user_id = cursor.lastrowid
-            conn.commit()
-            return user_id
+            return cursor.lastrowid
         except sqlite3.IntegrityError:
             return None
-        finally:
-            conn.close()
     
+    @metrics.timed('database_call_seconds')
     def authenticate_user(self, username: str, password: str) -> Optional[Dict[str, Any]]:
         """Authenticate user and return user data"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -140,9 +381,12 @@ class DatabaseManager:
         ''', (username,))
         
         user = cursor.fetchone()
-        conn.close()
         
         if user and self.verify_password(password, user[3]):
+            # Feeds the active-user rollup
+            with conn:
+                cursor.execute('UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?', (user[0],))
+            
             return {
                 "id": user[0],
                 "username": user[1],
@@ -161,148 +405,229 @@ class DatabaseManager:
             "user_id": user_id,
             "username": username,
             "role": role,
+            # Sub-second, so a login right after a logout is not caught by the revocation
+            "iat": time.time(),
             "exp": datetime.utcnow() + timedelta(hours=24)
         }
         return jwt.encode(payload, SECRET_KEY, algorithm="HS256")
     
     def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
-        """Verify JWT token and return user data"""
+        """Verify JWT token and return user data, or None if it is invalid, expired or revoked"""
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            return payload
         except jwt.ExpiredSignatureError:
             return None
         except jwt.InvalidTokenError:
             return None
+        
+        # The signature alone would keep accepting tokens of logged-out or deactivated users
+        return payload if self.token_is_current(payload) else None
+    
+    def token_is_current(self, claims: Dict[str, Any]) -> bool:
+        """Whether the token's user is active and the token was issued after their last revocation"""
+        row = self.get_connection().execute(
+            'SELECT is_active, tokens_valid_after FROM users WHERE id = ?', (claims.get('user_id'),)
+        ).fetchone()
+        return row is not None and bool(row[0]) and claims.get('iat', 0) >= row[1]
+    
+    def add_revocation_listener(self, listener: Callable[[int], Any]):
+        """Register a callback run when a user logs out or is deactivated"""
+        self._revocation_listeners.append(listener)
     
+    @metrics.timed('database_call_seconds')
+    def revoke_user_tokens(self, user_id: int):
+        """Reject every token issued to this user so far, and tell listeners (e.g. token caches) to forget them"""
+        conn = self.get_connection()
+        with conn:
+            conn.execute('UPDATE users SET tokens_valid_after = ? WHERE id = ?', (time.time(), user_id))
+        for listener in self._revocation_listeners:
+            try:
+                listener(user_id)
+            except Exception as e:
+                logger.error(f"Token revocation listener failed for user {user_id}: {e}")
+    
+    @metrics.timed('database_call_seconds')
+    def set_user_active(self, user_id: int, is_active: bool) -> bool:
+        """Activate or deactivate a user; deactivation revokes their tokens"""
+        conn = self.get_connection()
+        with conn:
+            cursor = conn.execute('UPDATE users SET is_active = ? WHERE id = ?', (1 if is_active else 0, user_id))
+        if not is_active:
+            self.revoke_user_tokens(user_id)
+        return cursor.rowcount > 0
+    
+    @metrics.timed('database_call_seconds')
     def create_survey(self, user_id: int, location: str, latitude: float = None, longitude: float = None, 
                      water_quality: str = None, notes: str = None) -> int:
         """Create a new survey"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            INSERT INTO surveys (user_id, location, latitude, longitude, water_quality, notes)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (user_id, location, latitude, longitude, water_quality, notes))
+        with conn:
+            cursor.execute('''
+                INSERT INTO surveys (user_id, location, latitude, longitude, water_quality, notes)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (user_id, location, latitude, longitude, water_quality, notes))
         
         survey_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
         
         return survey_id
     
+    @metrics.timed('database_call_seconds')
     def create_prediction(self, user_id: int, sensor_data: str, predicted_disease: str, 
-                        confidence: float, risk_level: str) -> int:
+                        confidence: float, risk_level: str, model_version: str = None) -> int:
         """Create a new prediction record"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            INSERT INTO predictions (user_id, sensor_data, predicted_disease, confidence, risk_level)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user_id, sensor_data, predicted_disease, confidence, risk_level))
+        with conn:
+            cursor.execute('''
+                INSERT INTO predictions (user_id, sensor_data, predicted_disease, confidence, risk_level, model_version)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (user_id, sensor_data, predicted_disease, confidence, risk_level, model_version))
         
         prediction_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
         
         return prediction_id
     
+    @metrics.timed('database_call_seconds')
+    def create_predictions(self, records: List[Tuple]) -> int:
+        """Insert many prediction records in one transaction"""
+        conn = self.get_connection()
+        
+        with conn:
+            conn.executemany('''
+                INSERT INTO predictions (user_id, sensor_data, predicted_disease, confidence, risk_level, model_version)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', records)
+        
+        return len(records)
+    
+    @metrics.timed('database_call_seconds')
     def create_alert(self, title: str, description: str, severity: str, location: str, 
                     disease_type: str = None, cases_count: int = 0, created_by: int = None) -> int:
         """Create a new health alert"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            INSERT INTO alerts (title, description, severity, location, disease_type, cases_count, created_by)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (title, description, severity, location, disease_type, cases_count, created_by))
+        with conn:
+            cursor.execute('''
+                INSERT INTO alerts (title, description, severity, location, disease_type, cases_count, created_by)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (title, description, severity, location, disease_type, cases_count, created_by))
         
         alert_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
         
         return alert_id
     
-    def get_user_surveys(self, user_id: int) -> list:
-        """Get surveys for a specific user"""
-        conn = sqlite3.connect(self.db_path)
+    def _keyset_page(self, table: str, columns: List[str], conditions: List[str], params: List[Any],
+                     limit: int, cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Fetch one page ordered newest first, keyed on (created_at, id)"""
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        
+        conditions = list(conditions)
+        params = list(params)
+        if cursor:
+            conditions.append('(created_at, id) < (?, ?)')
+            params.extend(decode_cursor(cursor))
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        conn = self.get_connection()
+        rows = conn.execute(f'''
+            SELECT {', '.join(columns)}
+            FROM {table} {where}
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        ''', params + [limit + 1]).fetchall()
+        
+        # The extra row only tells us whether another page exists
+        items = [dict(zip(columns, row)) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(items[-1]['created_at'], items[-1]['id'])
+        return items, next_cursor
+    
+    @metrics.timed('database_call_seconds')
+    def get_alerts_page(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                        severity: str = None, status: str = None, location: str = None,
+                        disease_type: str = None, created_after: str = None,
+                        created_before: str = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of health alerts, newest first, with optional filters"""
+        conditions, params = [], []
+        for column, value in (('severity', severity), ('status', status),
+                              ('location', location), ('disease_type', disease_type)):
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        self._add_date_range(conditions, params, created_after, created_before)
+        
+        return self._keyset_page('alerts', ALERT_COLUMNS, conditions, params, limit, cursor)
+    
+    @metrics.timed('database_call_seconds')
+    def get_user_surveys_page(self, user_id: int, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                              status: str = None, location: str = None, water_quality: str = None,
+                              created_after: str = None, created_before: str = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of a user's surveys, newest first, with optional filters"""
+        conditions, params = ['user_id = ?'], [user_id]
+        for column, value in (('status', status), ('location', location), ('water_quality', water_quality)):
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        self._add_date_range(conditions, params, created_after, created_before)
+        
+        return self._keyset_page('surveys', SURVEY_COLUMNS, conditions, params, limit, cursor)
+    
+    @staticmethod
+    def _add_date_range(conditions: List[str], params: List[Any], created_after: str, created_before: str):
+        """Append created_at bounds, normalized to SQLite's CURRENT_TIMESTAMP format"""
+        if created_after:
+            conditions.append('created_at >= ?')
+            params.append(normalize_timestamp(created_after))
+        if created_before:
+            conditions.append('created_at < ?')
+            params.append(normalize_timestamp(created_before))
+
+    @metrics.timed('database_call_seconds')
+    def get_system_stats(self) -> Dict[str, Any]:
+        """Get system statistics from the trigger-maintained counters"""
+        conn = self.get_connection()
         cursor = conn.cursor()
         
+        # Total users, pending approvals and total submissions
         cursor.execute('''
-            SELECT id, location, latitude, longitude, water_quality, status, notes, created_at
-            FROM surveys WHERE user_id = ? ORDER BY created_at DESC
-        ''', (user_id,))
-        
-        surveys = cursor.fetchall()
-        conn.close()
-        
-        return [
-            {
-                "id": survey[0],
-                "location": survey[1],
-                "latitude": survey[2],
-                "longitude": survey[3],
-                "water_quality": survey[4],
-                "status": survey[5],
-                "notes": survey[6],
-                "created_at": survey[7]
-            }
-            for survey in surveys
-        ]
-    
-    def get_all_alerts(self) -> list:
-        """Get all health alerts"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+            SELECT name, value FROM system_counters WHERE name IN (?, ?, ?)
+        ''', COUNTER_NAMES)
+        counters = dict(cursor.fetchall())
         
+        # Active users (logged in within last 7 days), summed over at most 168 hourly buckets
         cursor.execute('''
-            SELECT id, title, description, severity, location, disease_type, cases_count, status, created_at
-            FROM alerts ORDER BY created_at DESC
+            SELECT COALESCE(SUM(users), 0) FROM login_hour_counts
+            WHERE hour >= strftime('%Y-%m-%d %H', 'now', '-7 days')
         ''')
+        active_users = cursor.fetchone()[0]
         
-        alerts = cursor.fetchall()
-        conn.close()
-        
-        return [
-            {
-                "id": alert[0],
-                "title": alert[1],
-                "description": alert[2],
-                "severity": alert[3],
-                "location": alert[4],
-                "disease_type": alert[5],
-                "cases_count": alert[6],
-                "status": alert[7],
-                "created_at": alert[8]
-            }
-            for alert in alerts
-        ]
+        return {
+            "total_users": counters.get("total_users", 0),
+            "active_users": active_users,
+            "pending_approvals": counters.get("pending_approvals", 0),
+            "total_submissions": counters.get("total_submissions", 0)
+        }
     
-    def get_system_stats(self) -> Dict[str, Any]:
-        """Get system statistics"""
-        conn = sqlite3.connect(self.db_path)
+    @metrics.timed('database_call_seconds')
+    def count_system_stats(self) -> Dict[str, Any]:
+        """Compute system statistics with full COUNT(*) scans (slow; for verification)"""
+        conn = self.get_connection()
         cursor = conn.cursor()
         
-        # Total users
-        cursor.execute('SELECT COUNT(*) FROM users WHERE is_active = 1')
-        total_users = cursor.fetchone()[0]
-        
-        # Active users (logged in within last 7 days)
-        cursor.execute('SELECT COUNT(*) FROM users WHERE last_login > datetime("now", "-7 days")')
-        active_users = cursor.fetchone()[0]
-        
-        # Pending approvals
-        cursor.execute('SELECT COUNT(*) FROM surveys WHERE status = "pending"')
-        pending_approvals = cursor.fetchone()[0]
-        
-        # Total submissions
-        cursor.execute('SELECT COUNT(*) FROM surveys')
-        total_submissions = cursor.fetchone()[0]
-        
-        conn.close()
+        cursor.execute('''
+            SELECT
+                (SELECT COUNT(*) FROM users WHERE is_active = 1),
+                (SELECT COUNT(*) FROM users WHERE last_login >= datetime(strftime('%Y-%m-%d %H:00:00', 'now', '-7 days'))),
+                (SELECT COUNT(*) FROM surveys WHERE status = 'pending'),
+                (SELECT COUNT(*) FROM surveys)
+        ''')
+        total_users, active_users, pending_approvals, total_submissions = cursor.fetchone()
         
         return {
             "total_users": total_users,
@@ -310,6 +635,49 @@ class DatabaseManager:
             "pending_approvals": pending_approvals,
             "total_submissions": total_submissions
         }
+    
+    @metrics.timed('database_call_seconds')
+    def rebuild_stats(self) -> Dict[str, Any]:
+        """Recompute the statistics tables from scratch and report any drift"""
+        conn = self.get_connection()
+        before = self.get_system_stats()
+        
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM system_counters')
+            conn.execute('DELETE FROM login_hour_counts')
+            for statement in STATS_SEED_STATEMENTS:
+                conn.execute(statement)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        
+        after = self.get_system_stats()
+        expected = self.count_system_stats()
+        return {
+            "before": before,
+            "after": after,
+            "drift": {name: after[name] - before[name] for name in after if after[name] != before[name]},
+            "consistent": after == expected
+        }
+
+# Global database instance; the schema is checked on first use, not at import
+db = DatabaseManager(lazy=True)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Database administration")
+    parser.add_argument("command", choices=["migrate", "rebuild-stats"])
+    args = parser.parse_args()
 
-# Global database instance
-db = DatabaseManager()
+    if args.command == "migrate":
+        print(f"✅ Schema at version {db.migrate()}")
+    elif args.command == "rebuild-stats":
+        report = db.rebuild_stats()
+        print(f"📊 Counters: {report['after']}")
+        if report["drift"]:
+            print(f"⚠️  Corrected drift: {report['drift']}")
+        print("✅ Counters match a full recount" if report["consistent"] else "❌ Counters do not match a full recount")
+        raise SystemExit(0 if report["consistent"] else 1)
@@ -0,0 +1,181 @@
+"""
+Feature assembly for the water disease model.
+
+A FeaturePlan is compiled once from the model's feature_names when the model
+is loaded. It maps every output column to its source sensor field or to the
+field's has_ indicator, so a request is validated and written into a float
+row buffer in a single pass.
+"""
+
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# The 13 core sensor features every reading must provide
+SENSOR_FIELDS = [
+    'pH', 'turbidity', 'conductivity', 'water_temp', 'dissolved_oxygen',
+    'orp', 'ecoli_cfu', 'rainfall_mm', 'water_level', 'ambient_temp',
+    'ambient_humidity', 'gps_lat', 'gps_lon'
+]
+
+INDICATOR_PREFIX = 'has_'
+
+# The forest compares features as float32 (like sklearn), so rows are built in it
+FEATURE_DTYPE = np.float32
+
+_MISSING = object()
+
+# How a field's value reads; fill_row and transform_columns both go through these
+_OK, _ABSENT, _NULL, _INVALID = range(4)
+
+_INVALID_MESSAGE = "Invalid value for {field}: must be a number"
+
+# Error for each non-OK outcome as (required field, optional field); None skips the field
+_ERRORS = {
+    _ABSENT: ("Missing required field: {field}", None),
+    _NULL: (_INVALID_MESSAGE, None),
+    _INVALID: (_INVALID_MESSAGE, _INVALID_MESSAGE)
+}
+
+def _read_value(value) -> Tuple[int, float]:
+    """Outcome and number for one field value; a NaN reading counts as an absent sensor"""
+    if value is _MISSING:
+        return _ABSENT, np.nan
+    if value is None:
+        return _NULL, np.nan
+    try:
+        number = float(value)
+    except (ValueError, TypeError):
+        return _INVALID, np.nan
+    if number != number:
+        return _ABSENT, np.nan
+    return _OK, number
+
+class FeaturePlan:
+    """Precompiled mapping from sensor readings to model feature rows"""
+
+    def __init__(self, feature_names: Sequence[str], required_fields: Sequence[str] = SENSOR_FIELDS):
+        self.feature_names = list(feature_names)
+        self.required_fields = list(required_fields)
+        self.n_features = len(self.feature_names)
+
+        columns = {name: i for i, name in enumerate(self.feature_names)}
+        sources = [name for name in self.feature_names if not name.startswith(INDICATOR_PREFIX)]
+
+        # (field, value column or -1, indicator column or -1, required)
+        fields = list(self.required_fields) + [f for f in sources if f not in self.required_fields]
+        for name in self.feature_names:
+            base = name[len(INDICATOR_PREFIX):] if name.startswith(INDICATOR_PREFIX) else None
+            if base is not None and base not in fields:
+                fields.append(base)
+
+        required = set(self.required_fields)
+        self._fields: List[Tuple[str, int, int, bool]] = [
+            (field, columns.get(field, -1), columns.get(INDICATOR_PREFIX + field, -1), field in required)
+            for field in fields
+        ]
+
+        # Template row: value columns start as missing, anything unmapped stays 0.0
+        self._template = np.zeros(self.n_features, dtype=FEATURE_DTYPE)
+        for field, value_col, _, _ in self._fields:
+            if value_col >= 0:
+                self._template[value_col] = np.nan
+
+    @classmethod
+    def from_model(cls, model_data: Dict) -> "FeaturePlan":
+        """Compile the plan for a loaded model bundle"""
+        return cls(model_data['feature_names'], model_data.get('sensor_features') or SENSOR_FIELDS)
+
+    def fill_row(self, data: Dict, row: np.ndarray) -> str:
+        """Validate a reading and write its features into row; returns an error message or ''"""
+        row[:] = self._template
+        for field, value_col, indicator_col, required in self._fields:
+            outcome, number = _read_value(data.get(field, _MISSING))
+            if outcome != _OK:
+                message = _ERRORS[outcome][0 if required else 1]
+                if message is not None:
+                    return message.format(field=field)
+                continue
+
+            if value_col >= 0:
+                row[value_col] = number
+            if indicator_col >= 0:
+                row[indicator_col] = 1.0
+
+        return ""
+
+    def transform(self, data: Dict) -> Tuple[Optional[np.ndarray], str]:
+        """Build a (1, n_features) matrix for one reading"""
+        if not isinstance(data, dict):
+            return None, "Reading must be a JSON object"
+
+        features = np.empty((1, self.n_features), dtype=FEATURE_DTYPE)
+        error_msg = self.fill_row(data, features[0])
+        if error_msg:
+            return None, error_msg
+        return features, ""
+
+    def transform_many(self, readings: Iterable[Dict]) -> Tuple[np.ndarray, List[int], Dict[int, str]]:
+        """Build one matrix for many readings, returning valid row indices and per-item errors"""
+        readings = list(readings)
+        features = np.empty((len(readings), self.n_features), dtype=FEATURE_DTYPE)
+        valid_indices: List[int] = []
+        errors: Dict[int, str] = {}
+
+        for i, data in enumerate(readings):
+            if not isinstance(data, dict):
+                errors[i] = "Reading must be a JSON object"
+                continue
+
+            # Valid rows are packed to the front of the buffer
+            error_msg = self.fill_row(data, features[len(valid_indices)])
+            if error_msg:
+                errors[i] = error_msg
+            else:
+                valid_indices.append(i)
+
+        return features[:len(valid_indices)], valid_indices, errors
+
+    def transform_columns(self, columns: Dict[str, np.ndarray],
+                          n_rows: int) -> Tuple[np.ndarray, List[int], Dict[int, str]]:
+        """transform_many for column arrays (e.g. a CSV chunk), validated a column at a time
+
+        Cells follow the same rules and messages as fill_row: a NaN cell or a
+        missing column reads as an absent field. Numeric columns are checked
+        in one step; object columns go through fill_row's per-value check.
+        Each invalid row reports the first failing field, as fill_row would.
+        """
+        features = np.tile(self._template, (n_rows, 1))
+        # Per row: index into messages of its first error, or -1
+        first_error = np.full(n_rows, -1)
+        messages: List[str] = []
+
+        for field, value_col, indicator_col, required in self._fields:
+            column = columns.get(field)
+            if column is None:
+                values = np.full(n_rows, np.nan)
+                outcomes = np.full(n_rows, _ABSENT)
+            elif column.dtype.kind in 'fiub':
+                values = column.astype(np.float64, copy=False)
+                outcomes = np.where(np.isnan(values), _ABSENT, _OK)
+            else:
+                values = np.empty(n_rows)
+                outcomes = np.empty(n_rows, dtype=int)
+                for i, value in enumerate(column):
+                    outcomes[i], values[i] = _read_value(value)
+
+            present = outcomes == _OK
+            for outcome, errors in _ERRORS.items():
+                message = errors[0 if required else 1]
+                failed = outcomes == outcome
+                if message is not None and failed.any():
+                    first_error[failed & (first_error < 0)] = len(messages)
+                    messages.append(message.format(field=field))
+
+            if value_col >= 0:
+                features[:, value_col] = np.where(present, values, np.nan)
+            if indicator_col >= 0:
+                features[:, indicator_col] = present
+
+        valid = first_error < 0
+        errors = {int(i): messages[first_error[i]] for i in np.flatnonzero(~valid)}
+        return features[valid], np.flatnonzero(valid).tolist(), errors
@@ -0,0 +1,16 @@
+"""
+Gunicorn settings, picked up automatically by `gunicorn app:app` from this directory.
+
+With preload_app the master imports app.py (and maps the model artifact) once
+before forking, so workers start without loading anything and share the
+model's pages. Background threads (model watcher, micro-batcher, prediction
+writer) and SQLite connections are created lazily per process on its first real
+request, and warm-up in the master starts none of them, so they are safe to fork.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "1"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
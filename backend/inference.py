@@ -0,0 +1,249 @@
+"""
+Compiled, array-backed inference for the trained water disease model.
+
+The pickled RandomForestClassifier is flattened into contiguous NumPy node
+arrays once at load time, so a prediction is a handful of vectorized
+gathers per tree level instead of sklearn's per-tree Python dispatch.
+"""
+
+import numpy as np
+from typing import Optional
+
+from metrics import metrics
+
+# Rows scored per traversal pass; bounds the (rows x trees x classes) gather
+CHUNK_ROWS = 2048
+
+class CompiledForest:
+    """RandomForestClassifier flattened into contiguous node arrays"""
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children_left: np.ndarray,
+                 children_right: np.ndarray, missing_go_to_left: np.ndarray, value: np.ndarray,
+                 roots: np.ndarray, classes: np.ndarray, max_depth: int, n_features: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.missing_go_to_left = missing_go_to_left
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = max_depth
+        self.n_features_in_ = n_features
+
+    @classmethod
+    def from_sklearn(cls, forest) -> "CompiledForest":
+        """Flatten a fitted RandomForestClassifier into node arrays"""
+        if getattr(forest, 'n_outputs_', 1) != 1:
+            raise ValueError("Only single-output forests can be compiled")
+
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        n_nodes = int(offsets[-1])
+        n_classes = len(forest.classes_)
+
+        feature = np.zeros(n_nodes, dtype=np.intp)
+        threshold = np.zeros(n_nodes, dtype=np.float64)
+        children_left = np.zeros(n_nodes, dtype=np.intp)
+        children_right = np.zeros(n_nodes, dtype=np.intp)
+        missing_go_to_left = np.zeros(n_nodes, dtype=bool)
+        value = np.zeros((n_nodes, n_classes), dtype=np.float64)
+
+        for tree, start in zip(trees, offsets[:-1]):
+            stop = start + tree.node_count
+            node_ids = np.arange(start, stop)
+            is_leaf = tree.children_left == -1
+
+            # Leaves loop back onto themselves so every row can take max_depth steps
+            feature[start:stop] = np.where(is_leaf, 0, tree.feature)
+            threshold[start:stop] = tree.threshold
+            children_left[start:stop] = np.where(is_leaf, node_ids, tree.children_left + start)
+            children_right[start:stop] = np.where(is_leaf, node_ids, tree.children_right + start)
+            if hasattr(tree, 'missing_go_to_left'):
+                missing_go_to_left[start:stop] = tree.missing_go_to_left.astype(bool)
+
+            # Per-node class distribution, normalized like DecisionTreeClassifier.predict_proba
+            counts = tree.value[:, 0, :n_classes]
+            totals = counts.sum(axis=1, keepdims=True)
+            totals[totals == 0.0] = 1.0
+            value[start:stop] = counts / totals
+
+        return cls(
+            feature=feature,
+            threshold=threshold,
+            children_left=children_left,
+            children_right=children_right,
+            missing_go_to_left=missing_go_to_left,
+            value=value,
+            roots=offsets[:-1].astype(np.intp),
+            classes=np.asarray(forest.classes_),
+            max_depth=max(tree.max_depth for tree in trees),
+            n_features=int(forest.n_features_in_)
+        )
+
+    @classmethod
+    def merge(cls, forests) -> "CompiledForest":
+        """Concatenate forests trained on different data into one, aligning class columns
+
+        Each tree keeps its own leaf distributions; a forest that never saw a class
+        contributes zero probability for it, exactly as its trees would predict.
+        """
+        forests = list(forests)
+        if not forests:
+            raise ValueError("Nothing to merge")
+        n_features = forests[0].n_features_in_
+        if any(forest.n_features_in_ != n_features for forest in forests):
+            raise ValueError("Forests were trained on different feature layouts")
+
+        classes = np.array(sorted(set().union(*(map(str, forest.classes_) for forest in forests))), dtype=object)
+        column = {label: i for i, label in enumerate(classes)}
+
+        parts = {name: [] for name in ('feature', 'threshold', 'children_left', 'children_right',
+                                       'missing_go_to_left', 'value', 'roots')}
+        offset = 0
+        for forest in forests:
+            n_nodes = len(forest.feature)
+            value = np.zeros((n_nodes, len(classes)), dtype=forest.value.dtype)
+            value[:, [column[str(label)] for label in forest.classes_]] = forest.value
+
+            parts['feature'].append(forest.feature)
+            parts['threshold'].append(forest.threshold)
+            parts['children_left'].append(forest.children_left + offset)
+            parts['children_right'].append(forest.children_right + offset)
+            parts['missing_go_to_left'].append(forest.missing_go_to_left)
+            parts['value'].append(value)
+            parts['roots'].append(forest.roots + offset)
+            offset += n_nodes
+
+        return cls(
+            classes=classes,
+            max_depth=max(forest.max_depth for forest in forests),
+            n_features=n_features,
+            **{name: np.concatenate(arrays) for name, arrays in parts.items()}
+        )
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    @property
+    def precision(self) -> str:
+        return 'float32' if self.value.dtype == np.float32 else 'float64'
+
+    def to_float32(self) -> "CompiledForest":
+        """Copy with float32 thresholds and leaf values
+
+        Features are compared as float32, so rounding each threshold down to the
+        largest float32 not above it sends every row down exactly the same path.
+        Only the leaf distributions lose precision (about 1e-7 relative). Node
+        indices stay intp: NumPy converts narrower index arrays on every gather,
+        which costs about a third of the scoring throughput.
+        """
+        threshold = self.threshold.astype(np.float32)
+        rounded_up = threshold.astype(np.float64) > self.threshold
+        threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+
+        return CompiledForest(
+            feature=self.feature,
+            threshold=threshold,
+            children_left=self.children_left,
+            children_right=self.children_right,
+            missing_go_to_left=self.missing_go_to_left,
+            value=self.value.astype(np.float32),
+            roots=self.roots,
+            classes=self.classes_,
+            max_depth=self.max_depth,
+            n_features=self.n_features_in_
+        )
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Return the leaf node index reached in every tree, shape (rows, trees)"""
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[nodes]]
+            go_left = x <= self.threshold[nodes]
+            go_left |= np.isnan(x) & self.missing_go_to_left[nodes]
+            nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+
+        return nodes
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Mean of per-tree leaf class distributions, matching sklearn's predict_proba"""
+        # sklearn compares float32-cast features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected input of shape (n, {self.n_features_in_}), got {X.shape}")
+
+        proba = np.empty((X.shape[0], len(self.classes_)), dtype=np.float64)
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            chunk = X[start:start + CHUNK_ROWS]
+            # Accumulate in float64 whatever the stored precision
+            proba[start:start + CHUNK_ROWS] = self.value[self._leaves(chunk)].mean(axis=1, dtype=np.float64)
+
+        return proba
+
+    def predict(self, X, proba: Optional[np.ndarray] = None) -> np.ndarray:
+        """Class labels from the argmax of the same probability vector"""
+        if proba is None:
+            proba = self.predict_proba(X)
+        return self.classes_[np.argmax(proba, axis=1)]
+
+class CompiledImputer:
+    """Median imputation from a fitted SimpleImputer without sklearn's input checks"""
+
+    def __init__(self, statistics: np.ndarray):
+        self.statistics_ = statistics
+        self._statistics32 = np.asarray(statistics, dtype=np.float32)
+
+    @classmethod
+    def from_sklearn(cls, imputer) -> Optional["CompiledImputer"]:
+        """Compile a SimpleImputer, or return None if it needs sklearn's full transform"""
+        statistics = np.asarray(imputer.statistics_, dtype=np.float64)
+        missing_values = getattr(imputer, 'missing_values', np.nan)
+        if not (isinstance(missing_values, float) and np.isnan(missing_values)):
+            return None
+        # Indicator columns or dropped all-missing features change the output layout
+        if getattr(imputer, 'add_indicator', False) or np.isnan(statistics).any():
+            return None
+        return cls(statistics)
+
+    def transform(self, X) -> np.ndarray:
+        """Fill NaNs, keeping float32 input in float32 (the forest compares in float32 anyway)"""
+        X = np.asarray(X)
+        if X.dtype != np.float32:
+            X = X.astype(np.float64, copy=False)
+        missing = np.isnan(X)
+        if missing.any():
+            statistics = self._statistics32 if X.dtype == np.float32 else self.statistics_
+            X = np.where(missing, statistics, X)
+        return X
+
+def compile_model(model_data: dict) -> dict:
+    """Attach compiled engine components to a loaded model bundle"""
+    model_data['engine'] = CompiledForest.from_sklearn(model_data['model'])
+    if model_data.get('imputer') is not None:
+        compiled_imputer = CompiledImputer.from_sklearn(model_data['imputer'])
+        if compiled_imputer is not None:
+            model_data['compiled_imputer'] = compiled_imputer
+    return model_data
+
+def score_features(features: np.ndarray, model: dict) -> np.ndarray:
+    """Run the imputer and the forest once over a 2-D feature matrix"""
+    # Apply imputation if available
+    with metrics.stage('impute'):
+        if 'compiled_imputer' in model:
+            features = model['compiled_imputer'].transform(features)
+        elif 'imputer' in model:
+            features = model['imputer'].transform(features)
+
+    # Prefer the compiled engine; sklearn remains the fallback
+    with metrics.stage('predict_proba'):
+        if 'engine' in model:
+            return model['engine'].predict_proba(features)
+        return model['model'].predict_proba(features)
+
+def class_labels(model: dict) -> np.ndarray:
+    """Labels of the probability columns, in the forest's own class order"""
+    return model['engine'].classes_ if 'engine' in model else model['model'].classes_
@@ -0,0 +1,254 @@
+"""
+Memory-mappable model artifact.
+
+The compiled forest and imputer are plain NumPy arrays, so instead of a pickle
+they are written as a directory of .npy files plus a JSON manifest. Loading
+maps the arrays read-only (np.load mmap_mode='r'), so every gunicorn worker on
+a host shares one page-cache copy instead of holding its own unpickled forest,
+and a load costs a few small file opens no matter how large the forest is.
+
+    models/water_disease_model.forest/
+        manifest.json        format, version, labels, shapes and dtypes
+        feature.npy, threshold.npy, children_left.npy, children_right.npy,
+        missing_go_to_left.npy, value.npy, roots.npy, imputer_statistics.npy
+
+Convert an existing pickle with:
+
+    python model_artifact.py models/water_disease_model.pkl models/water_disease_model.forest [--float32]
+
+--float32 stores thresholds and leaf values as float32; rows take exactly the
+same paths (see CompiledForest.to_float32).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Dict
+
+import numpy as np
+
+from features import FeaturePlan
+from inference import CompiledForest, CompiledImputer, compile_model
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+
+PRECISIONS = ('float64', 'float32')
+
+FOREST_ARRAYS = ('feature', 'threshold', 'children_left', 'children_right',
+                 'missing_go_to_left', 'value', 'roots')
+
+def file_version(path: str) -> str:
+    """Short content hash identifying a model file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+def is_artifact(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+def export_artifact(model_data: Dict, path: str, precision: str = 'float64') -> Dict:
+    """Write a loaded model bundle as a memory-mappable artifact; returns the manifest"""
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of {PRECISIONS}")
+    if 'engine' not in model_data:
+        compile_model(model_data)
+    engine = model_data['engine']
+    if precision == 'float32' and engine.precision != 'float32':
+        engine = engine.to_float32()
+    compiled_imputer = model_data.get('compiled_imputer')
+    if model_data.get('imputer') is not None and compiled_imputer is None:
+        raise ValueError("Imputer cannot be compiled; keep serving this model from its pickle")
+
+    arrays = {name: np.ascontiguousarray(getattr(engine, name)) for name in FOREST_ARRAYS}
+    if compiled_imputer is not None:
+        arrays['imputer_statistics'] = np.ascontiguousarray(compiled_imputer.statistics_, dtype=precision)
+
+    version = model_data.get('version')
+    if version is not None and precision == 'float32':
+        # Leaf probabilities differ in the last bits, so cached scores must not be shared
+        version = f"{version}-f32"
+    if version is None:
+        digest = hashlib.sha256()
+        for name in sorted(arrays):
+            digest.update(name.encode())
+            digest.update(arrays[name].tobytes())
+        version = digest.hexdigest()[:12]
+
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "version": version,
+        "classes": [str(label) for label in engine.classes_],
+        "feature_names": list(model_data['feature_names']),
+        "disease_classes": list(model_data.get('disease_classes') or []),
+        "sensor_features": list(model_data.get('sensor_features') or []),
+        "precision": engine.precision,
+        "max_depth": int(engine.max_depth),
+        "n_features": int(engine.n_features_in_),
+        "arrays": {name: {"dtype": array.dtype.str, "shape": list(array.shape)} for name, array in arrays.items()}
+    }
+
+    # Build next to the target and swap it in, so readers never see a half-written artifact
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".artifact-", dir=parent)
+    try:
+        # mkdtemp creates 0700; workers may run as another user
+        os.chmod(staging, 0o755)
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f"{name}.npy"), array, allow_pickle=False)
+        with open(os.path.join(staging, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        replace_directory(staging, path)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    return manifest
+
+def replace_directory(staging: str, path: str):
+    """Move a fully written directory onto path, replacing whatever was there"""
+    previous = None
+    if os.path.exists(path):
+        previous = tempfile.mkdtemp(prefix=".artifact-old-", dir=os.path.dirname(os.path.abspath(path)))
+        os.rmdir(previous)
+        os.rename(path, previous)
+    os.rename(staging, path)
+    if previous is not None:
+        shutil.rmtree(previous, ignore_errors=True)
+
+def copy_artifact(source: str, path: str):
+    """Install a copy of an existing artifact at path with the same atomic swap as export_artifact"""
+    if not is_artifact(source):
+        raise FileNotFoundError(f"No model artifact at {source}")
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".artifact-", dir=parent)
+    try:
+        os.rmdir(staging)
+        shutil.copytree(source, staging)
+        os.chmod(staging, 0o755)
+        replace_directory(staging, path)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+def load_artifact(path: str, mmap: bool = True) -> Dict:
+    """Load an artifact into a model bundle backed by read-only memory maps"""
+    with open(os.path.join(path, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"Unsupported model artifact format: {manifest.get('format')}")
+
+    arrays = {}
+    for name, spec in manifest["arrays"].items():
+        array = np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None, allow_pickle=False)
+        if array.dtype.str != spec["dtype"] or list(array.shape) != spec["shape"]:
+            raise ValueError(f"Model artifact array {name} does not match its manifest")
+        # Plain ndarray views over the mapping; indexing results are ordinary arrays
+        arrays[name] = np.asarray(array)
+
+    engine = CompiledForest(
+        feature=arrays['feature'],
+        threshold=arrays['threshold'],
+        children_left=arrays['children_left'],
+        children_right=arrays['children_right'],
+        missing_go_to_left=arrays['missing_go_to_left'],
+        value=arrays['value'],
+        roots=arrays['roots'],
+        classes=np.asarray(manifest["classes"], dtype=object),
+        max_depth=manifest["max_depth"],
+        n_features=manifest["n_features"]
+    )
+
+    model_data = {
+        'engine': engine,
+        'feature_names': manifest["feature_names"],
+        'disease_classes': manifest["disease_classes"],
+        'sensor_features': manifest["sensor_features"] or None,
+        'version': manifest["version"],
+        'artifact_path': path
+    }
+    if 'imputer_statistics' in arrays:
+        model_data['compiled_imputer'] = CompiledImputer(arrays['imputer_statistics'])
+    return model_data
+
+def artifact_is_current(artifact_path: str, model_path: str) -> bool:
+    """Whether the artifact should be served rather than the pickle next to it
+
+    True when there is no pickle, when the artifact was exported from this very
+    pickle (its version is the pickle's hash), or when it was written after the
+    pickle, as train_streaming does. A pickle copied over an older artifact wins.
+    """
+    if not os.path.exists(model_path):
+        return True
+    manifest_path = os.path.join(artifact_path, MANIFEST_NAME)
+    with open(manifest_path) as f:
+        version = json.load(f).get("version") or ""
+    if version.partition("-")[0] == file_version(model_path):
+        return True
+    return os.path.getmtime(manifest_path) > os.path.getmtime(model_path)
+
+def load_bundle(model_path: str, artifact_path: str) -> Dict:
+    """Load the model files into a ready-to-serve bundle; raises if there is no usable model"""
+    # Prefer the memory-mapped artifact: workers share its pages instead of unpickling
+    if artifact_path and is_artifact(artifact_path) and not artifact_is_current(artifact_path, model_path):
+        logger.warning(f"{model_path} was replaced after {artifact_path} was exported; loading the pickle")
+    elif artifact_path and is_artifact(artifact_path):
+        try:
+            model_data = load_artifact(artifact_path)
+            model_data['feature_plan'] = FeaturePlan.from_model(model_data)
+            logger.info(f"Mapped {model_data['engine'].n_estimators}-tree model artifact {model_data['version']}")
+            return model_data
+        except Exception as e:
+            if not os.path.exists(model_path):
+                raise
+            logger.warning(f"Could not load model artifact, falling back to the pickle: {e}")
+
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"No model found at {artifact_path} or {model_path}")
+
+    # Only the pickle path needs joblib (and, through it, sklearn)
+    import joblib
+    model_data = joblib.load(model_path)
+    logger.info("Loaded pre-trained model from file")
+
+    # Content hash identifies the loaded model for caches and responses
+    model_data['version'] = file_version(model_path)
+
+    # Compile the request-to-feature-row mapping once
+    model_data['feature_plan'] = FeaturePlan.from_model(model_data)
+
+    # Flatten the forest into array-backed form for fast inference
+    try:
+        compile_model(model_data)
+        logger.info(f"Compiled {model_data['engine'].n_estimators}-tree forest for inference")
+    except Exception as e:
+        logger.warning(f"Could not compile model, falling back to sklearn: {e}")
+
+    return model_data
+
+if __name__ == "__main__":
+    import argparse
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Convert a pickled model bundle into a memory-mappable artifact")
+    parser.add_argument("source", help="pickled model bundle, e.g. models/water_disease_model.pkl")
+    parser.add_argument("target", help="artifact directory, e.g. models/water_disease_model.forest")
+    parser.add_argument("--float32", action="store_true", help="float32 thresholds and leaf values")
+    args = parser.parse_args()
+
+    bundle = joblib.load(args.source)
+    # Keep the pickle's version so caches and prediction logs agree across formats
+    bundle['version'] = file_version(args.source)
+    manifest = export_artifact(bundle, args.target, precision='float32' if args.float32 else 'float64')
+    size = sum(os.path.getsize(os.path.join(args.target, name)) for name in os.listdir(args.target))
+    print(f"✅ Wrote {args.target} (version {manifest['version']}, {manifest['precision']}, "
+          f"{len(manifest['arrays'])} arrays, {size / 1024:.0f} KiB)")
@@ -0,0 +1,164 @@
+"""
+Versioned model registry with validated, atomic hot reload.
+
+The active model bundle lives behind one attribute. A reload loads and
+validates a candidate off to the side and publishes it with a single
+reference assignment, so a request that has already read `current` keeps
+scoring on the version it started with, and a candidate that fails to load or
+validate never replaces the working model.
+
+Reloads are triggered explicitly (`reload()`, e.g. from an admin endpoint) or
+by a per-process watcher thread that polls the model files and reloads once a
+change has been stable for one poll, so half-written files are not picked up.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Reload outcomes kept for the status endpoint
+HISTORY_SIZE = 20
+
+class ModelValidationError(Exception):
+    """A candidate model bundle is unfit to serve"""
+
+def file_signature(paths: List[str]) -> Tuple:
+    """(path, mtime_ns, size) of each watched file that exists"""
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        signature.append((path, st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+class ModelRegistry:
+    """Holds the serving model and swaps in validated replacements"""
+
+    def __init__(self, loader: Callable[[], Any], validator: Optional[Callable[[Any], None]] = None,
+                 on_swap: Optional[Callable[[Any], None]] = None, watch_paths: Optional[List[str]] = None,
+                 poll_interval: float = 0.0, initial: Any = None):
+        self.loader = loader
+        self.validator = validator
+        self.on_swap = on_swap
+        self.watch_paths = list(watch_paths or [])
+        self.poll_interval = poll_interval
+
+        self._reload_lock = threading.Lock()
+        self._watch_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._seen_signature = file_signature(self.watch_paths)
+        self._pending_signature = None
+
+        self.history: "deque[Dict]" = deque(maxlen=HISTORY_SIZE)
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+
+        self._current = None
+        self.loaded_at = None
+        self._publish(initial if initial is not None else loader(), "startup")
+
+    @property
+    def current(self) -> Any:
+        """The serving bundle; read it once per request and use that reference throughout"""
+        if self.poll_interval > 0:
+            self._ensure_watching()
+        return self._current
+
+    def peek(self) -> Any:
+        """The serving bundle without starting the watcher, for code that may run before a fork"""
+        return self._current
+
+    @staticmethod
+    def version_of(bundle: Any) -> Optional[str]:
+        return bundle.get('version') if isinstance(bundle, dict) else None
+
+    def _publish(self, bundle: Any, source: str):
+        if self.on_swap is not None:
+            self.on_swap(bundle)
+        # A single reference assignment: readers see the old bundle or the new one, never a mix
+        self._current = bundle
+        self.loaded_at = time.time()
+        self.history.append({"version": self.version_of(bundle), "source": source,
+                             "status": "loaded", "at": self.loaded_at})
+
+    def reload(self, source: str = "manual") -> Dict:
+        """Load, validate and publish a candidate; the current model stays on any failure"""
+        with self._reload_lock:
+            started = time.perf_counter()
+            previous = self.version_of(self._current)
+            try:
+                candidate = self.loader()
+                if self.validator is not None:
+                    self.validator(candidate)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                self.history.append({"version": None, "source": source, "status": "rejected",
+                                     "error": self.last_error, "at": time.time()})
+                logger.error(f"Model reload rejected, keeping version {previous}: {self.last_error}")
+                return {"reloaded": False, "version": previous, "error": self.last_error}
+
+            version = self.version_of(candidate)
+            if version is not None and version == previous:
+                return {"reloaded": False, "version": previous, "unchanged": True}
+
+            self._publish(candidate, source)
+            self.reloads += 1
+            self.last_error = None
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            logger.info(f"Model hot-reloaded {previous} -> {version} in {elapsed_ms} ms ({source})")
+            return {"reloaded": True, "version": version, "previous_version": previous, "load_ms": elapsed_ms}
+
+    def check_for_changes(self) -> Optional[Dict]:
+        """Reload when the watched files changed and then held still for one poll"""
+        signature = file_signature(self.watch_paths)
+        if signature == self._seen_signature:
+            self._pending_signature = None
+            return None
+        if signature != self._pending_signature:
+            # Still being written, or just changed: wait for it to settle
+            self._pending_signature = signature
+            return None
+
+        self._seen_signature = signature
+        self._pending_signature = None
+        return self.reload(source="watcher")
+
+    def _ensure_watching(self):
+        # The watcher belongs to the process that started it; restart after fork
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._watch_lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+                self._thread.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.check_for_changes()
+            except Exception as e:
+                logger.error(f"Model watcher error: {e}")
+
+    def status(self) -> Dict:
+        return {
+            "version": self.version_of(self._current),
+            "loaded_at": self.loaded_at,
+            "watching": self.watch_paths if self.poll_interval > 0 else [],
+            "poll_interval": self.poll_interval,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "history": list(self.history)
+        }
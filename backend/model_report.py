@@ -0,0 +1,308 @@
+"""
+Memory footprint, load time and latency report for a model, with budgets.
+
+Reports what a serving worker pays for one model file (a pickle or a
+memory-mapped artifact):
+
+- trees, nodes per tree, leaves and depth of the forest
+- bytes held by each component: the compiled forest, the sklearn forest (pickle
+  only, kept next to the compiled one) and the imputer, plus bytes on disk
+- each load step timed in a fresh process, with the RSS it added: importing
+  Flask, importing sklearn and unpickling (pickle only), compiling or mapping,
+  and a first batch that touches every page of the model
+- single-row p50/p99 and batch latency through score_features
+
+A budget caps any of these and makes the check fail, so CI or train_model.py
+--budget can stop an oversized model before it replaces the serving one:
+
+    python model_report.py models/water_disease_model.forest --budget default
+    python model_report.py models/water_disease_model.pkl --budget '{"max_load_ms": 500}' --json report.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from features import FeaturePlan
+from inference import compile_model, score_features
+from model_artifact import file_version, is_artifact, load_artifact
+
+ARTIFACT_PATH = "models/water_disease_model.forest"
+
+# Limits for `--budget default`; a JSON budget overrides individual keys
+DEFAULT_BUDGET = {
+    'max_file_mb': 50,             # model files on disk
+    'max_memory_mb': 200,          # bytes held by all components
+    'max_nodes': 2_000_000,        # nodes across all trees
+    'max_load_ms': 2000,           # from first import to a scoring-ready bundle
+    'max_rss_mb': 400,             # RSS the model adds to a worker, first batch included
+    'max_single_row_p99_ms': 10,
+    'max_batch_ms': 250            # one batch of `batch_rows` rows
+}
+
+# Budget key -> the report value it caps
+BUDGET_VALUES = {
+    'max_file_mb': lambda report: report['files_bytes'] / 1e6,
+    'max_memory_mb': lambda report: sum(report['components'].values()) / 1e6,
+    'max_nodes': lambda report: report['trees']['nodes'],
+    'max_load_ms': lambda report: report['load']['load_ms'],
+    'max_rss_mb': lambda report: report['load']['model_rss_mb'],
+    'max_single_row_p99_ms': lambda report: report['latency']['single_row_p99_ms'],
+    'max_batch_ms': lambda report: report['latency']['batch_ms']
+}
+
+class BudgetExceeded(Exception):
+    """A model is over one or more of its budget limits"""
+
+    def __init__(self, violations: List[str]):
+        super().__init__("; ".join(violations))
+        self.violations = violations
+
+def load_budget(spec: str) -> Dict[str, float]:
+    """Budget from 'default', a JSON file path, or an inline JSON object, over DEFAULT_BUDGET"""
+    if spec == 'default':
+        return dict(DEFAULT_BUDGET)
+    if os.path.exists(spec):
+        with open(spec) as f:
+            overrides = json.load(f)
+    else:
+        overrides = json.loads(spec)
+    unknown = sorted(set(overrides) - set(DEFAULT_BUDGET))
+    if unknown:
+        raise ValueError(f"Unknown budget keys {unknown}; expected some of {sorted(DEFAULT_BUDGET)}")
+    return {**DEFAULT_BUDGET, **overrides}
+
+def check_budget(report: Dict, budget: Dict[str, float]) -> List[str]:
+    """One message per exceeded limit; empty when the model is within budget"""
+    violations = []
+    for key, limit in budget.items():
+        if limit is None:
+            continue
+        value = BUDGET_VALUES[key](report)
+        if value > limit:
+            violations.append(f"{key[4:]} is {round(value, 1):,}, over the budget of {limit:,}")
+    return violations
+
+def memory_usage() -> dict:
+    """RSS, PSS and private memory of this process in MB"""
+    try:
+        fields = {}
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if rest.strip().endswith("kB"):
+                    fields[key] = int(rest.split()[0])
+        return {
+            "rss_mb": fields["Rss"] / 1024,
+            "pss_mb": fields["Pss"] / 1024,
+            "private_mb": (fields["Private_Clean"] + fields["Private_Dirty"]) / 1024
+        }
+    except (OSError, KeyError):
+        # Peak RSS only (kilobytes on Linux)
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return {"rss_mb": rss, "pss_mb": float("nan"), "private_mb": float("nan")}
+
+def files_bytes(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+def tree_stats(engine) -> Dict:
+    """Node and leaf counts per tree from the compiled forest's node arrays"""
+    n_nodes = len(engine.feature)
+    roots = np.sort(np.asarray(engine.roots))
+    node_counts = np.diff(np.append(roots, n_nodes))
+    # Compiled leaves loop back onto themselves
+    is_leaf = np.asarray(engine.children_left) == np.arange(n_nodes)
+    return {
+        'count': engine.n_estimators,
+        'nodes': n_nodes,
+        'leaves': int(is_leaf.sum()),
+        'max_depth': engine.max_depth,
+        'nodes_per_tree': {'min': int(node_counts.min()), 'median': float(np.median(node_counts)),
+                           'max': int(node_counts.max())},
+        'node_counts': node_counts.tolist()
+    }
+
+def component_bytes(model: Dict) -> Dict[str, int]:
+    """Bytes of array data held by each part of a loaded bundle"""
+    sizes = {}
+    engine = model.get('engine')
+    if engine is not None:
+        sizes['compiled_forest'] = sum(np.asarray(getattr(engine, name)).nbytes for name in
+                                       ('feature', 'threshold', 'children_left', 'children_right',
+                                        'missing_go_to_left', 'value', 'roots'))
+    if model.get('model') is not None:
+        sizes['sklearn_forest'] = sum(
+            state['nodes'].nbytes + state['values'].nbytes
+            for state in (estimator.tree_.__getstate__() for estimator in model['model'].estimators_)
+        )
+    if 'compiled_imputer' in model:
+        imputer = model['compiled_imputer']
+        sizes['imputer'] = imputer.statistics_.nbytes + imputer._statistics32.nbytes
+    elif model.get('imputer') is not None:
+        sizes['imputer'] = np.asarray(model['imputer'].statistics_).nbytes
+    return sizes
+
+def probe_rows(model: Dict, rows: int, seed: int = 0) -> np.ndarray:
+    """Feature rows scattered around the imputer's medians"""
+    n_features = len(model['feature_names'])
+    if 'compiled_imputer' in model:
+        center = np.asarray(model['compiled_imputer'].statistics_)
+    elif model.get('imputer') is not None:
+        center = np.asarray(model['imputer'].statistics_)
+    else:
+        center = np.zeros(n_features)
+    rng = np.random.default_rng(seed)
+    return (center * (1 + 0.25 * rng.standard_normal((rows, n_features))) + rng.standard_normal((rows, n_features)))
+
+def measure_latency(model: Dict, single_rows: int = 200, batch_rows: int = 1000, batch_repeats: int = 5) -> Dict:
+    X = probe_rows(model, max(single_rows, batch_rows))
+    for i in range(10):
+        score_features(X[i:i + 1], model)
+
+    single = []
+    for i in range(single_rows):
+        started = time.perf_counter()
+        score_features(X[i:i + 1], model)
+        single.append((time.perf_counter() - started) * 1000)
+
+    batch = []
+    for _ in range(batch_repeats):
+        started = time.perf_counter()
+        score_features(X[:batch_rows], model)
+        batch.append((time.perf_counter() - started) * 1000)
+    batch_ms = float(np.median(batch))
+
+    return {
+        'single_row_p50_ms': round(float(np.percentile(single, 50)), 3),
+        'single_row_p99_ms': round(float(np.percentile(single, 99)), 3),
+        'batch_rows': batch_rows,
+        'batch_ms': round(batch_ms, 2),
+        'batch_rows_per_second': round(batch_rows / batch_ms * 1000)
+    }
+
+def _report(path: str, batch_rows: int) -> Dict:
+    """Load path step by step, then measure it; run in a fresh process for meaningful RSS and import times"""
+    steps = []
+    baseline = last = memory_usage()['rss_mb']
+
+    def step(name: str, started: float):
+        nonlocal last
+        rss = memory_usage()['rss_mb']
+        steps.append({'step': name, 'ms': round((time.perf_counter() - started) * 1000, 1),
+                      'rss_mb': round(rss - last, 1)})
+        last = rss
+
+    started = time.perf_counter()
+    import flask  # noqa: F401
+    step('import flask', started)
+
+    if is_artifact(path):
+        started = time.perf_counter()
+        model = load_artifact(path)
+        model['feature_plan'] = FeaturePlan.from_model(model)
+        step('map artifact', started)
+        version, file_format = model['version'], 'artifact'
+    else:
+        # The same steps as load_bundle's pickle path, timed separately
+        started = time.perf_counter()
+        import joblib
+        import sklearn.ensemble  # noqa: F401
+        step('import sklearn', started)
+
+        started = time.perf_counter()
+        model = joblib.load(path)
+        step('unpickle', started)
+
+        started = time.perf_counter()
+        compile_model(model)
+        model['feature_plan'] = FeaturePlan.from_model(model)
+        step('compile', started)
+        version, file_format = file_version(path), 'pickle'
+
+    # Memory-mapped pages only count towards RSS once a batch has touched them
+    started = time.perf_counter()
+    score_features(probe_rows(model, batch_rows, seed=1), model)
+    step('first batch', started)
+
+    model_steps = steps[1:]
+    return {
+        'path': path,
+        'format': file_format,
+        'version': version,
+        'files_bytes': files_bytes(path),
+        'trees': tree_stats(model['engine']),
+        'components': component_bytes(model),
+        'load': {
+            'baseline_rss_mb': round(baseline, 1),
+            'steps': steps,
+            'load_ms': round(sum(s['ms'] for s in model_steps[:-1]), 1),
+            'flask_rss_mb': steps[0]['rss_mb'],
+            'model_rss_mb': round(sum(s['rss_mb'] for s in model_steps), 1)
+        },
+        'latency': measure_latency(model, batch_rows=batch_rows)
+    }
+
+def model_report(path: str, batch_rows: int = 1000, isolated: bool = True) -> Dict:
+    """Footprint, load and latency report for a pickle or artifact
+
+    With isolated=False the report runs in this process, where anything already
+    imported or loaded makes the load steps look cheaper than in a new worker.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No model found at {path}")
+    if not isolated:
+        return _report(path, batch_rows)
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_report, (path, batch_rows))
+
+def print_report(report: Dict, budget: Optional[Dict] = None):
+    trees, load, latency = report['trees'], report['load'], report['latency']
+    print(f"📦 {report['path']} ({report['format']}, version {report['version']}, "
+          f"{report['files_bytes'] / 1e6:.2f} MB on disk)")
+    print(f"🌲 {trees['count']} trees, {trees['nodes']:,} nodes ({trees['leaves']:,} leaves), max depth {trees['max_depth']}; "
+          f"nodes per tree min {trees['nodes_per_tree']['min']:,} / median {trees['nodes_per_tree']['median']:,.0f} "
+          f"/ max {trees['nodes_per_tree']['max']:,}")
+    print("🧠 Memory by component:")
+    for name, size in report['components'].items():
+        print(f"   {name:<16} {size / 1e6:>9.2f} MB")
+    print(f"⏱️  Load steps (baseline RSS {load['baseline_rss_mb']:.1f} MB):")
+    for s in load['steps']:
+        print(f"   {s['step']:<16} {s['ms']:>9.1f} ms {s['rss_mb']:>+9.1f} MB RSS")
+    print(f"   load {load['load_ms']:.1f} ms; the model adds {load['model_rss_mb']:.1f} MB RSS, "
+          f"Flask {load['flask_rss_mb']:.1f} MB")
+    print(f"🚀 Single row p50 {latency['single_row_p50_ms']:.3f} ms, p99 {latency['single_row_p99_ms']:.3f} ms; "
+          f"{latency['batch_rows']:,} rows in {latency['batch_ms']:.1f} ms ({latency['batch_rows_per_second']:,} rows/s)")
+
+    if budget is not None:
+        violations = check_budget(report, budget)
+        for message in violations:
+            print(f"❌ Over budget: {message}")
+        if not violations:
+            print("✅ Within budget")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report a model's memory footprint, load time and latency")
+    parser.add_argument("model", nargs="?", default=ARTIFACT_PATH, help="pickled bundle or artifact directory")
+    parser.add_argument("--budget", help="'default', a JSON file, or inline JSON of limits; exit 1 when exceeded")
+    parser.add_argument("--batch-rows", type=int, default=1000, help="rows in the batch latency measurement")
+    parser.add_argument("--json", help="write the full report (with node counts per tree) as JSON")
+    args = parser.parse_args()
+
+    budget = load_budget(args.budget) if args.budget else None
+    report = model_report(args.model, batch_rows=args.batch_rows)
+    print_report(report, budget)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({**report, 'budget': budget}, f, indent=2)
+        print(f"📝 Report saved as {args.json}")
+    if budget is not None and check_budget(report, budget):
+        sys.exit(1)
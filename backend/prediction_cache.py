@@ -0,0 +1,136 @@
+"""
+In-process LRU + TTL cache of model outputs.
+
+Fixed stations report near-identical readings, so feature rows are quantized
+to each sensor's measurement resolution and the quantized row is both the
+cache key and what gets scored. Cached answers are therefore identical to a
+fresh prediction on the same quantized reading. Entries are keyed by
+(model version, quantized row), so requests still pinned to the old model
+during a hot reload neither see nor evict the new model's answers; the old
+version's entries age out through the LRU and TTL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Measurement resolution per sensor field (units as in WATER_dATA.csv)
+SENSOR_RESOLUTION = {
+    'pH': 0.01,
+    'turbidity': 0.1,
+    'conductivity': 1.0,
+    'water_temp': 0.1,
+    'dissolved_oxygen': 0.1,
+    'orp': 1.0,
+    'ecoli_cfu': 1.0,
+    'rainfall_mm': 0.1,
+    'water_level': 0.01,
+    'ambient_temp': 0.1,
+    'ambient_humidity': 1.0,
+    'gps_lat': 0.0001,
+    'gps_lon': 0.0001
+}
+
+# Step tables kept for recently seen model versions
+MAX_MODEL_VERSIONS = 4
+
+def parse_resolution(spec: str) -> Dict[str, float]:
+    """Parse 'pH=0.01,turbidity=0.1' into a resolution mapping"""
+    resolution = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        field, _, value = item.partition('=')
+        resolution[field.strip()] = float(value)
+    return resolution
+
+class PredictionCache:
+    """Bounded LRU cache with per-entry TTL keyed on quantized feature rows"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300.0,
+                 resolution: Optional[Dict[str, float]] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.field_resolution = dict(SENSOR_RESOLUTION)
+        self.field_resolution.update(resolution or {})
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._steps: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def steps(self, version: str, feature_names: List[str]) -> np.ndarray:
+        """Per-column quantization steps for a model version, built once per version"""
+        with self._lock:
+            step = self._steps.get(version)
+            if step is None:
+                # Indicator and unknown columns are keyed exactly (step 0)
+                step = np.array([self.field_resolution.get(name, 0.0) for name in feature_names])
+                step.flags.writeable = False
+                self._steps[version] = step
+                while len(self._steps) > MAX_MODEL_VERSIONS:
+                    self._steps.popitem(last=False)
+            else:
+                self._steps.move_to_end(version)
+            return step
+
+    @staticmethod
+    def quantize(features: np.ndarray, step: np.ndarray) -> np.ndarray:
+        """Snap feature values to their sensor resolution"""
+        safe_step = np.where(step > 0, step, 1.0)
+        quantized = np.where(step > 0, np.round(features / safe_step) * safe_step, features)
+        return quantized.astype(features.dtype, copy=False)
+
+    @staticmethod
+    def key(version: str, row: np.ndarray) -> tuple:
+        # Rows equal in float32 score identically, so they share an entry
+        return version, np.ascontiguousarray(row, dtype=np.float32).tobytes()
+
+    def get(self, key: tuple) -> Optional[np.ndarray]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: tuple, value: np.ndarray):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "model_versions": list(self._steps),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
@@ -0,0 +1,128 @@
+"""
+Write-behind persistence of prediction records.
+
+Request handlers push records onto a bounded in-memory queue and return
+immediately. A background thread drains the queue and writes each batch
+with one executemany in a single transaction. When the queue is full,
+records are dropped and counted instead of stalling the request path.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (user_id, sensor_data JSON, predicted_disease, confidence, risk_level, model_version)
+PredictionRecord = Tuple[Optional[int], str, str, float, str, Optional[str]]
+
+_STOP = object()
+
+class PredictionWriter:
+    """Bounded queue drained into the predictions table by a background thread"""
+
+    def __init__(self, db, max_queue: int = 10000, batch_size: int = 500, flush_interval: float = 1.0):
+        self.db = db
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._count_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def _ensure_running(self):
+        # The writer thread belongs to the process that started it; restart after fork
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="prediction-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, record: PredictionRecord) -> bool:
+        """Queue a record without blocking; returns False if it was dropped"""
+        self._ensure_running()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._count_lock:
+                self.dropped += 1
+            return False
+        with self._count_lock:
+            self.enqueued += 1
+        return True
+
+    def _run(self):
+        batch: List[PredictionRecord] = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._flush(batch)
+                return
+            if item is not None:
+                batch.append(item)
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, batch: List[PredictionRecord]):
+        if not batch:
+            return
+        try:
+            self.db.create_predictions(batch)
+            self.written += len(batch)
+            self.flushes += 1
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Failed to persist {len(batch)} predictions: {e}")
+
+    def close(self, timeout: float = 5.0):
+        """Flush everything queued so far and stop the writer thread"""
+        if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+            return
+        # Blocking put: shutdown must not lose the stop marker to backpressure
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "flushes": self.flushes
+        }
+
+def start_writer(db, max_queue: int, batch_size: int, flush_interval: float) -> PredictionWriter:
+    """Create a writer that flushes cleanly at interpreter shutdown"""
+    writer = PredictionWriter(db, max_queue=max_queue, batch_size=batch_size, flush_interval=flush_interval)
+    atexit.register(writer.close)
+    return writer
@@ -0,0 +1,116 @@
+"""
+On-demand profiling of individual requests.
+
+A RequestProfiler runs cProfile around one request at a time, either when an
+admin asks for it (an `X-Profile: 1` header on a request that also carries an
+admin bearer token) or for every Nth request when sampling is on. When the
+request finishes, the top functions by cumulative time are kept in a bounded
+ring buffer that admins fetch from /admin/profiles.
+
+Profiling is off unless REQUEST_PROFILING=1. When it is off, the request hooks
+return on a single `is None` check. Only one request is profiled at a time.
+
+Up to Python 3.11, cProfile only records the thread that enabled it, so other
+requests on a threaded worker are neither slowed down nor mixed into the
+profile. From 3.12 cProfile is built on sys.monitoring and records every
+thread in the process. The app therefore leaves profiling off on 3.12+ when
+gunicorn runs more than one thread per worker (GUNICORN_THREADS > 1). Even
+with one thread, calls made by the background threads (micro-batcher, model
+watcher, prediction writer) during a profiled request show up in it.
+"""
+
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+# Whether cProfile records only the thread that enabled it
+PROFILES_ONE_THREAD = sys.version_info < (3, 12)
+
+class RequestProfiler:
+    """Ring buffer of per-request cProfile summaries"""
+
+    def __init__(self, sample_every: int = 0, capacity: int = 50, top_n: int = 25):
+        self.sample_every = sample_every
+        self.top_n = top_n
+        self.profiles: deque = deque(maxlen=capacity)
+        self.skipped_busy = 0
+        self._ids = itertools.count(1)
+        self._requests = itertools.count(1)
+        # Held while a request is being profiled
+        self._active = threading.Lock()
+        self._lock = threading.Lock()
+
+    def should_sample(self) -> bool:
+        return self.sample_every > 0 and next(self._requests) % self.sample_every == 0
+
+    def start(self) -> Optional[Tuple[int, cProfile.Profile]]:
+        """(profile id, running profiler), or None if another request is being profiled"""
+        if not self._active.acquire(blocking=False):
+            with self._lock:
+                self.skipped_busy += 1
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except Exception:
+            self._active.release()
+            raise
+        return next(self._ids), profile
+
+    def finish(self, profile_id: int, profile: cProfile.Profile, **request_info) -> Dict:
+        """Stop a profiler started by start() and store its summary"""
+        profile.disable()
+        try:
+            entry = {
+                'id': profile_id,
+                'captured_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'pid': os.getpid(),
+                **request_info,
+                'functions': self.top_functions(profile)
+            }
+        finally:
+            self._active.release()
+        with self._lock:
+            self.profiles.append(entry)
+        return entry
+
+    def top_functions(self, profile: cProfile.Profile) -> List[Dict]:
+        stats = pstats.Stats(profile, stream=io.StringIO())
+        rows = []
+        for (filename, line, name), (primitive, calls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({
+                'function': f"{os.path.basename(filename)}:{line}({name})",
+                'calls': calls,
+                'primitive_calls': primitive,
+                'tottime_ms': round(tottime * 1000, 3),
+                'cumtime_ms': round(cumtime * 1000, 3)
+            })
+        rows.sort(key=lambda row: row['cumtime_ms'], reverse=True)
+        return rows[:self.top_n]
+
+    def get(self, profile_id: int) -> Optional[Dict]:
+        with self._lock:
+            return next((entry for entry in self.profiles if entry['id'] == profile_id), None)
+
+    def snapshot(self, limit: Optional[int] = None) -> Dict:
+        with self._lock:
+            profiles = list(self.profiles)
+        # Newest first
+        profiles.reverse()
+        return {
+            'sample_every': self.sample_every,
+            'capacity': self.profiles.maxlen,
+            'skipped_busy': self.skipped_busy,
+            'profiles': profiles[:limit] if limit else profiles
+        }
+
+    def clear(self):
+        with self._lock:
+            self.profiles.clear()
@@ -0,0 +1,140 @@
+"""
+Rule-based fallback scorer, served when no trained model is available.
+
+Scores come from a declarative table: each rule names a sensor feature, a
+comparison and a threshold, plus the evidence it adds to each disease when it
+fires. Class scores are a per-class prior plus the evidence of every firing
+rule, turned into probabilities with a softmax. Rules are evaluated for a
+whole batch at once as boolean masks (one comparison per operator), so
+degraded mode is deterministic and costs a few array operations per batch.
+
+A missing value (NaN) never fires a rule. The bundle built by rule_bundle()
+has the same shape as a trained model's, so the API serves it unchanged.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from features import FEATURE_DTYPE, SENSOR_FIELDS, FeaturePlan
+
+FALLBACK_CLASSES = ['Cholera', 'Typhoid', 'Diarrhea', 'HepatitisA', 'Safe']
+
+# Log-odds before any rule fires; Typhoid shares HepatitisA's bands but is far rarer
+FALLBACK_PRIOR = {'Typhoid': -0.25}
+
+# Evidence a sensor adds for the band it reads in
+_VOTE = 0.5
+
+# (feature, comparison, threshold, evidence added per class). 'between' takes (low, high]
+# and the other comparisons a single value. Each water-quality sensor votes for the class
+# whose band it reads in; band edges sit between the per-class medians of the reference
+# dataset, where severity runs Safe < Diarrhea < HepatitisA/Typhoid < Cholera.
+FALLBACK_RULES: List[Tuple[str, str, Any, Dict[str, float]]] = [
+    ('ecoli_cfu', '<=', 50, {'Safe': _VOTE}),
+    ('ecoli_cfu', 'between', (50, 300), {'Diarrhea': _VOTE}),
+    ('ecoli_cfu', 'between', (300, 800), {'HepatitisA': _VOTE, 'Typhoid': _VOTE}),
+    ('ecoli_cfu', '>', 800, {'Cholera': _VOTE}),
+    ('turbidity', '<=', 5, {'Safe': _VOTE}),
+    ('turbidity', 'between', (5, 15), {'Diarrhea': _VOTE}),
+    ('turbidity', 'between', (15, 27), {'HepatitisA': _VOTE, 'Typhoid': _VOTE}),
+    ('turbidity', '>', 27, {'Cholera': _VOTE}),
+    ('dissolved_oxygen', '>=', 7.5, {'Safe': _VOTE}),
+    ('dissolved_oxygen', 'between', (5, 7.5), {'Diarrhea': _VOTE}),
+    ('dissolved_oxygen', 'between', (3.5, 5), {'HepatitisA': _VOTE, 'Typhoid': _VOTE}),
+    ('dissolved_oxygen', '<=', 3.5, {'Cholera': _VOTE}),
+    ('orp', '>=', 300, {'Safe': _VOTE}),
+    ('orp', 'between', (240, 300), {'Diarrhea': _VOTE}),
+    ('orp', 'between', (180, 240), {'HepatitisA': _VOTE, 'Typhoid': _VOTE}),
+    ('orp', '<=', 180, {'Cholera': _VOTE}),
+    ('conductivity', '<=', 550, {'Safe': _VOTE}),
+    ('conductivity', 'between', (550, 800), {'Diarrhea': _VOTE}),
+    ('conductivity', 'between', (800, 1150), {'HepatitisA': _VOTE, 'Typhoid': _VOTE}),
+    ('conductivity', '>', 1150, {'Cholera': _VOTE}),
+    ('pH', 'between', (7.2, 8.5), {'Safe': _VOTE}),
+    ('pH', 'between', (6.6, 7.2), {'Diarrhea': _VOTE}),
+    ('pH', '>', 8.5, {'Diarrhea': _VOTE}),
+    ('pH', 'between', (6.0, 6.6), {'HepatitisA': _VOTE, 'Typhoid': _VOTE}),
+    ('pH', '<=', 6.0, {'Cholera': _VOTE}),
+]
+
+COMPARISONS = {'<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal,
+               'between': lambda x, bounds: (x > bounds[0]) & (x <= bounds[1])}
+
+class RuleModel:
+    """A rule table compiled against a feature layout; scores batches like CompiledForest"""
+
+    def __init__(self, rules: Sequence[Tuple[str, str, Any, Dict[str, float]]], feature_names: Sequence[str],
+                 classes: Sequence[str] = FALLBACK_CLASSES, prior: Optional[Dict[str, float]] = None):
+        columns = {name: i for i, name in enumerate(feature_names)}
+        class_index = {label: i for i, label in enumerate(classes)}
+        prior = prior or {}
+
+        self.classes_ = np.array(list(classes), dtype=object)
+        self.n_features_in_ = len(feature_names)
+        self.prior = np.array([prior.get(label, 0.0) for label in classes], dtype=np.float64)
+        self.evidence = np.zeros((len(rules), len(classes)), dtype=np.float64)
+
+        # Rules grouped by comparison: (comparison, rule rows, feature columns, thresholds)
+        groups: Dict[str, Tuple[List[int], List[int], List[Any]]] = {}
+        for i, (feature, op, threshold, evidence) in enumerate(rules):
+            if feature not in columns:
+                raise ValueError(f"Rule {i} references unknown feature {feature!r}")
+            if op not in COMPARISONS:
+                raise ValueError(f"Rule {i} has unknown comparison {op!r}")
+            if (op == 'between') != (np.ndim(threshold) == 1 and len(threshold) == 2):
+                raise ValueError(f"Rule {i}: 'between' takes (low, high), other comparisons one value")
+            for label, weight in evidence.items():
+                if label not in class_index:
+                    raise ValueError(f"Rule {i} adds evidence to unknown class {label!r}")
+                self.evidence[i, class_index[label]] = weight
+            rows, cols, thresholds = groups.setdefault(op, ([], [], []))
+            rows.append(i)
+            cols.append(columns[feature])
+            thresholds.append(threshold)
+
+        # 'between' thresholds become a (low, high) pair of row vectors
+        self._groups = [(COMPARISONS[op], np.array(rows), np.array(cols), np.array(thresholds, dtype=FEATURE_DTYPE).T)
+                        for op, (rows, cols, thresholds) in groups.items()]
+        self.n_rules = len(rules)
+
+    def fired(self, X) -> np.ndarray:
+        """Boolean (rows, rules) matrix of which rules fire for each row"""
+        X = np.asarray(X, dtype=FEATURE_DTYPE)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected input of shape (n, {self.n_features_in_}), got {X.shape}")
+        fired = np.zeros((X.shape[0], self.n_rules), dtype=bool)
+        for compare, rows, cols, thresholds in self._groups:
+            # NaN compares False, so missing readings never fire a rule
+            fired[:, rows] = compare(X[:, cols], thresholds)
+        return fired
+
+    def predict_proba(self, X) -> np.ndarray:
+        scores = self.prior + self.fired(X) @ self.evidence
+        scores -= scores.max(axis=1, keepdims=True)
+        proba = np.exp(scores)
+        return proba / proba.sum(axis=1, keepdims=True)
+
+    def predict(self, X, proba: Optional[np.ndarray] = None) -> np.ndarray:
+        if proba is None:
+            proba = self.predict_proba(X)
+        return self.classes_[np.argmax(proba, axis=1)]
+
+def rules_version(rules, prior) -> str:
+    """Content hash of the table, so caches and logs tell rule revisions apart"""
+    payload = json.dumps([rules, prior], sort_keys=True).encode()
+    return 'rules-' + hashlib.sha256(payload).hexdigest()[:12]
+
+def rule_bundle(rules=FALLBACK_RULES, prior=FALLBACK_PRIOR, classes=FALLBACK_CLASSES) -> Dict:
+    """A servable model bundle backed by the rule table"""
+    bundle = {
+        'engine': RuleModel(rules, SENSOR_FIELDS, classes, prior),
+        'feature_names': list(SENSOR_FIELDS),
+        'sensor_features': list(SENSOR_FIELDS),
+        'disease_classes': list(classes),
+        'version': rules_version(rules, prior)
+    }
+    bundle['feature_plan'] = FeaturePlan.from_model(bundle)
+    return bundle
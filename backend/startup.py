@@ -0,0 +1,53 @@
+"""
+Startup phase timing and readiness state.
+
+create_app() runs its phases (database, services, model, warm-up) inside
+`tracker.phase(...)`, which records how long each took and the first failure.
+`/ready` reports the snapshot and only succeeds once every phase has finished,
+while `/health` keeps answering as soon as the process serves requests.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+class StartupTracker:
+    """Per-phase startup timings and the ready flag"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.ready = False
+        self.ready_after_ms = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            with self._lock:
+                if self.error is None:
+                    self.error = f"{name}: {type(e).__name__}: {e}"
+            raise
+        finally:
+            with self._lock:
+                self.phases[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    def mark_ready(self):
+        with self._lock:
+            if self.error is None:
+                self.ready = True
+                self.ready_after_ms = round((time.perf_counter() - self.started) * 1000, 1)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "ready_after_ms": self.ready_after_ms,
+                "phases_ms": dict(self.phases),
+                "error": self.error
+            }
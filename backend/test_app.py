@@ -0,0 +1,502 @@
+"""
+API tests for the prediction endpoints using Flask's test client
+"""
+
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+
+import app as app_module
+from app import app
+from batch_score import batch_score
+from batching import MicroBatcher
+from metrics import Histogram, metrics
+from model_artifact import file_version, load_bundle
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache
+from prediction_writer import PredictionWriter
+from profiling import PROFILES_ONE_THREAD, RequestProfiler
+from rules import rule_bundle
+from token_cache import TokenCache
+from test_database import make_manager
+
+def load_sample_readings(limit: int = 5):
+    """Read a few labelled rows from the bundled dataset"""
+    with open('WATER_dATA.csv', newline='') as f:
+        rows = list(csv.DictReader(f))[:limit]
+    for row in rows:
+        row.pop('disease')
+    return rows
+
+def test_batch_matches_single_predictions():
+    """Batch results must equal what /predict returns for each reading"""
+    client = app.test_client()
+    readings = load_sample_readings()
+    
+    batch = client.post('/predict/batch', json={'readings': readings})
+    assert batch.status_code == 200
+    results = batch.get_json()['results']
+    assert len(results) == len(readings)
+    
+    for reading, result in zip(readings, results):
+        single = client.post('/predict', json=reading).get_json()
+        assert result['overall_status'] == single['overall_status']
+        assert result['predictions'] == single['predictions']
+
+def test_batch_reports_invalid_rows_individually():
+    """One bad reading must not fail the rest of the batch"""
+    client = app.test_client()
+    readings = load_sample_readings(2)
+    bad = dict(readings[0], pH='not-a-number')
+    
+    response = client.post('/predict/batch', json=[readings[0], bad, 'junk', readings[1]])
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['errors'] == 2
+    assert 'predictions' in body['results'][0]
+    assert body['results'][1] == {'index': 1, 'error': 'Invalid value for pH: must be a number'}
+    assert body['results'][2]['index'] == 2
+    assert 'predictions' in body['results'][3]
+
+def test_batch_rejects_empty_payload():
+    """An empty batch is a client error"""
+    client = app.test_client()
+    assert client.post('/predict/batch', json=[]).status_code == 400
+
+def test_micro_batcher_coalesces_concurrent_requests():
+    """Concurrent submissions are scored together and each caller gets its own rows"""
+    model = app_module.registry.current
+    rows = [model['feature_plan'].transform(reading)[0] for reading in load_sample_readings(16)]
+    expected = app_module.score_features(np.vstack(rows), model)
+    
+    batcher = MicroBatcher(app_module.score_features, window_ms=50, max_rows=16)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda row: batcher.score(row, context=model), rows))
+    
+    np.testing.assert_allclose(np.vstack(results), expected)
+    stats = batcher.stats.snapshot()
+    assert stats['requests'] == 16
+    assert stats['batches'] < 16
+
+def test_prediction_cache_hits_and_versions():
+    """Readings within sensor resolution share an entry; model versions never share or evict each other's entries"""
+    cache = PredictionCache(max_entries=3, ttl_seconds=60)
+    names = ['pH', 'turbidity', 'has_pH']
+    step = cache.steps('v1', names)
+    assert cache.steps('v1', names) is step
+    
+    first = cache.quantize(np.array([[7.201, 2.04, 1.0]]), step)[0]
+    second = cache.quantize(np.array([[7.199, 1.96, 1.0]]), step)[0]
+    assert cache.key('v1', first) == cache.key('v1', second)
+    
+    cache.put(cache.key('v1', first), np.array([0.1, 0.9]))
+    assert cache.get(cache.key('v1', second)) is not None
+    
+    # Requests pinned to the old and new model during a hot reload interleave
+    cache.put(cache.key('v2', first), np.array([0.8, 0.2]))
+    assert cache.get(cache.key('v1', first))[1] == 0.9
+    assert cache.get(cache.key('v2', first))[1] == 0.2
+    
+    cache.put(('v1', b'a'), np.zeros(2))
+    cache.put(('v1', b'b'), np.zeros(2))
+    stats = cache.stats()
+    assert (stats['hits'], stats['evictions'], stats['entries']) == (3, 1, 3)
+    assert cache.get(cache.key('v2', first)) is not None
+
+def test_prediction_writer_batches_and_counts_drops():
+    """Records are flushed in batches, on close, and dropped (and counted) when the queue is full"""
+    manager = make_manager()
+    released = threading.Event()
+    
+    class SlowDatabase:
+        """Stalls the first flush so the queue backs up"""
+        def create_predictions(self, records):
+            released.wait(5)
+            return manager.create_predictions(records)
+    
+    writer = PredictionWriter(SlowDatabase(), max_queue=3, batch_size=2, flush_interval=60)
+    record = (None, '{"pH": 7.0}', 'Safe', 0.9, 'danger', 'test')
+    accepted = [writer.submit(record) for _ in range(50)]
+    released.set()
+    writer.close()
+    
+    stats = writer.stats()
+    assert stats['dropped'] == accepted.count(False) > 0
+    assert stats['written'] == stats['enqueued'] == accepted.count(True)
+    count = manager.get_connection().execute('SELECT COUNT(*) FROM predictions').fetchone()[0]
+    assert count == stats['written']
+
+def test_token_cache_verifies_once_and_revokes_users():
+    """A token is decoded once, expires with its exp claim, and deactivation drops it"""
+    manager = make_manager()
+    cache = TokenCache(max_entries=10, ttl_seconds=60)
+    manager.add_revocation_listener(cache.revoke_user)
+    user_id = manager.create_user("tokens", "tokens@health.gov", "pw", "volunteer", "Tokens")
+    token = manager.generate_token(user_id, "tokens", "volunteer")
+    
+    decodes = []
+    def counting_verify(candidate):
+        decodes.append(candidate)
+        return manager.verify_token(candidate)
+    
+    for _ in range(5):
+        assert cache.verify(token, counting_verify)['user_id'] == user_id
+    assert len(decodes) == 1
+    assert cache.verify("not-a-token", counting_verify) is None
+    
+    # Entries never outlive the token itself
+    cache.put(b'expired', {"user_id": 99, "exp": 0})
+    assert cache.get(b'expired') is None
+    
+    manager.set_user_active(user_id, False)
+    stats = cache.stats()
+    assert (stats['hits'], stats['revocations'], stats['expirations'], stats['entries']) == (4, 1, 1, 0)
+
+def test_revocation_reaches_caches_that_missed_the_callback():
+    """A token cached by two workers is rejected by both, though only one received the logout"""
+    manager = make_manager()
+    user_id = manager.create_user("workers", "workers@health.gov", "pw", "volunteer", "Workers")
+    token = manager.generate_token(user_id, "workers", "volunteer")
+    notified, other = TokenCache(), TokenCache()
+    manager.add_revocation_listener(notified.revoke_user)
+    
+    for cache in (notified, other):
+        assert cache.verify(token, manager.verify_token, manager.token_is_current)['user_id'] == user_id
+        assert cache.verify(token, manager.verify_token, manager.token_is_current) is not None
+    
+    manager.revoke_user_tokens(user_id)
+    assert TokenCache.key(token) in other._entries
+    for cache in (notified, other):
+        assert cache.verify(token, manager.verify_token, manager.token_is_current) is None
+    assert TokenCache.key(token) not in other._entries and other.stats()['revocations'] == 1
+
+def test_logout_revokes_token():
+    """After POST /auth/logout the token is rejected, cached or not; a fresh login still works"""
+    user_id = app_module.db.create_user("logout", "logout@health.gov", "pw", "volunteer", "Logout")
+    token = app_module.db.generate_token(user_id, "logout", "volunteer")
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    client = app.test_client()
+    assert client.get('/surveys', headers=headers).status_code == 200
+    assert client.post('/auth/logout', headers=headers).status_code == 200
+    assert app_module.token_cache.stats()['revocations'] >= 1
+    assert TokenCache.key(token) not in app_module.token_cache._entries
+    
+    assert client.get('/surveys', headers=headers).status_code == 401
+    # A worker whose cache never held the token checks revocation on its first miss
+    assert TokenCache().verify(token, app_module.db.verify_token) is None
+    
+    fresh = app_module.db.generate_token(user_id, "logout", "volunteer")
+    assert client.get('/surveys', headers={"Authorization": f"Bearer {fresh}"}).status_code == 200
+    app_module.db.set_user_active(user_id, False)
+    assert client.get('/surveys', headers={"Authorization": f"Bearer {fresh}"}).status_code == 401
+
+def test_registry_swaps_valid_models_and_keeps_serving_on_bad_ones():
+    """A reload publishes a validated candidate; a broken one leaves the working model in place"""
+    working = app_module.registry.current
+    candidates = [dict(working, version='v2'), None]
+    
+    def loader():
+        candidate = candidates.pop(0)
+        if candidate is None:
+            raise ValueError("truncated artifact")
+        return candidate
+    
+    registry = ModelRegistry(loader, validator=app_module.validate_model, initial=working)
+    pinned = registry.current
+    
+    assert registry.reload()['version'] == 'v2'
+    # A request that read the registry before the swap still holds its own version
+    assert pinned is working and registry.current['version'] == 'v2'
+    
+    result = registry.reload()
+    assert 'error' in result and registry.current['version'] == 'v2'
+    
+    # Passes loading but fails validation: wrong class set
+    mislabeled = dict(working, version='v3', disease_classes=['Cholera'])
+    registry.loader = lambda: mislabeled
+    assert 'error' in registry.reload() and registry.current['version'] == 'v2'
+    assert registry.status()['failures'] == 2
+
+def test_replacing_only_the_pickle_reloads_it_over_a_stale_artifact():
+    """A new pickle copied over the served one is picked up even though the old artifact is still there"""
+    directory = tempfile.mkdtemp(prefix='reload_test_')
+    model_path = os.path.join(directory, 'model.pkl')
+    artifact_path = os.path.join(directory, 'model.forest')
+    shutil.copy(app_module.MODEL_PATH, model_path)
+    shutil.copytree(app_module.MODEL_ARTIFACT_PATH, artifact_path)
+    
+    registry = ModelRegistry(lambda: load_bundle(model_path, artifact_path), validator=app_module.validate_model)
+    assert 'artifact_path' in registry.current
+    before = registry.current['version']
+    
+    # A "retrained" pickle: same forest, different bytes
+    retrained = joblib.load(model_path)
+    retrained['trained_at'] = 'later'
+    joblib.dump(retrained, model_path)
+    
+    result = registry.reload()
+    assert result['reloaded'] and registry.current['version'] == file_version(model_path) != before
+    assert 'artifact_path' not in registry.current
+
+def test_batcher_never_mixes_model_versions():
+    """Rows pinned to different models are scored in separate batches"""
+    mixed = []
+    def score(matrix, context):
+        # Each row carries the id of the model it was pinned to
+        mixed.append(not (matrix == context).all())
+        return np.zeros((matrix.shape[0], 2))
+    
+    batcher = MicroBatcher(score, window_ms=50, max_rows=64)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: batcher.score(np.full((1, 3), i % 2), context=i % 2), range(16)))
+    assert mixed and not any(mixed)
+
+def test_predict_reports_model_version():
+    """Every /predict response names the model version that served it"""
+    client = app.test_client()
+    response = client.post('/predict', json=load_sample_readings(1)[0])
+    assert response.get_json()['model_version'] == app_module.registry.current['version']
+
+def test_rule_fallback_scores_batches_deterministically():
+    """Without a model file the API serves the rule table: vectorized, stable, NaN-safe"""
+    bundle = rule_bundle()
+    app_module.validate_model(bundle)
+    
+    features, _, errors = bundle['feature_plan'].transform_many(load_sample_readings(20) + app_module.PROBE_READINGS)
+    assert not errors
+    batch = app_module.score_features(features, bundle)
+    one_by_one = np.vstack([app_module.score_features(features[i:i + 1], bundle) for i in range(len(features))])
+    np.testing.assert_array_equal(batch, one_by_one)
+    np.testing.assert_array_equal(batch, app_module.score_features(features, bundle))
+    
+    clean, contaminated = bundle['engine'].predict(features[-2:])
+    assert clean == 'Safe' and contaminated != 'Safe'
+    assert not bundle['engine'].fired(np.full((1, len(bundle['feature_names'])), np.nan)).any()
+    
+    try:
+        rule_bundle(rules=[('coliform', '>', 5, {'Cholera': 1.0})])
+        assert False, "unknown feature accepted"
+    except ValueError:
+        pass
+    
+    serving = app_module.registry
+    app_module.registry = ModelRegistry(lambda: bundle, initial=bundle)
+    try:
+        response = app.test_client().post('/predict', json=app_module.PROBE_READINGS[1])
+        assert response.status_code == 200 and response.get_json()['model_version'] == bundle['version']
+    finally:
+        app_module.registry = serving
+
+def test_ready_reports_phases_after_warm_up():
+    """/ready succeeds once every startup phase ran, and warm-up traffic is not logged"""
+    client = app.test_client()
+    body = client.get('/ready').get_json()
+    assert body['ready'] and body['model_version'] == app_module.registry.current['version']
+    assert {'database', 'services', 'model', 'warm_up'} <= set(body['phases_ms'])
+    
+    enqueued = app_module.prediction_writer.stats()['enqueued']
+    app_module.warm_up(app, rounds=1)
+    assert app_module.prediction_writer.stats()['enqueued'] == enqueued
+
+def test_warm_up_starts_no_background_threads():
+    """Warm-up may run in the gunicorn master, so the watcher and batcher wait for a worker's first request"""
+    registry, batcher = app_module.registry, app_module.batcher
+    app_module.registry = ModelRegistry(app_module.load_model_bundle, poll_interval=60, initial=registry.peek())
+    app_module.batcher = MicroBatcher(app_module.score_features, window_ms=1, max_rows=8)
+    try:
+        app_module.warm_up(app, rounds=1)
+        assert app_module.registry._thread is None and app_module.batcher._thread is None
+        
+        assert app.test_client().post('/predict', json=load_sample_readings(1)[0]).status_code == 200
+        assert app_module.registry._thread.is_alive() and app_module.batcher._thread.is_alive()
+    finally:
+        app_module.registry, app_module.batcher = registry, batcher
+
+def test_stream_scores_ndjson_in_chunks():
+    """/predict/stream answers every line in order, across chunk boundaries, like /predict/batch"""
+    readings = load_sample_readings(7)
+    lines = [json.dumps(r) for r in readings[:3]] + ['{"pH": 7', '', json.dumps(dict(readings[3], orp='x')),
+                                                     json.dumps(readings[4]), 'x' * 3000] + [json.dumps(r) for r in readings[5:]]
+    chunk_size, line_bytes = app_module.INGEST_CHUNK_SIZE, app_module.MAX_INGEST_LINE_BYTES
+    app_module.INGEST_CHUNK_SIZE, app_module.MAX_INGEST_LINE_BYTES = 2, 1024
+    try:
+        response = app.test_client().post('/predict/stream', data='\n'.join(lines) + '\n',
+                                          content_type='application/x-ndjson')
+        body = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    finally:
+        app_module.INGEST_CHUNK_SIZE, app_module.MAX_INGEST_LINE_BYTES = chunk_size, line_bytes
+    
+    assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+    results, summary = body[:-1], body[-1]['summary']
+    assert summary['count'] == 9 and summary['errors'] == 3
+    assert sorted(r['line'] for r in results) == [1, 2, 3, 4, 6, 7, 8, 9, 10]
+    errors = {r['line']: r['error'] for r in results if 'error' in r}
+    assert errors[4].startswith('Invalid JSON') and errors[8].startswith('Line longer than')
+    assert errors[6] == 'Invalid value for orp: must be a number'
+    
+    batch = app.test_client().post('/predict/batch', json=readings).get_json()['results']
+    streamed = [r for r in sorted(results, key=lambda r: r['line']) if 'error' not in r]
+    valid = readings[:3] + readings[4:]
+    assert [r['predictions'] for r in streamed] == [batch[readings.index(r)]['predictions'] for r in valid]
+
+def test_ndjson_line_limit_ignores_the_newline():
+    """A line of exactly the limit is read whether or not it ends in a newline; one byte more is rejected"""
+    record = json.dumps({'pad': ''})
+    fits = json.dumps({'pad': 'x' * (64 - len(record))}).encode()
+    too_long = json.dumps({'pad': 'x' * (65 - len(record))}).encode()
+    assert len(fits) == 64 and len(too_long) == 65
+    
+    def read(body):
+        return [(line, error) for line, _, error in app_module.read_ndjson(io.BytesIO(body), 64)]
+    
+    assert read(fits + b'\n') == read(fits) == read(fits + b'\r\n') == [(1, None)]
+    rejected = [(1, "Line longer than 64 bytes")]
+    assert read(too_long + b'\n') == read(too_long) == rejected
+    assert read(too_long + b'\n' + fits + b'\n') == rejected + [(2, None)]
+
+def test_batch_score_cli_matches_batch_endpoint():
+    """The offline scorer splits a CSV across workers and agrees with /predict/batch row by row"""
+    readings = load_sample_readings(40)
+    readings[7] = dict(readings[7], pH='')
+    readings[12] = dict(readings[12], orp='n/a')
+    workdir = tempfile.mkdtemp(prefix="batch_score_test_")
+    with open(f'{workdir}/archive.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(readings[0]))
+        writer.writeheader()
+        writer.writerows(readings)
+    
+    # ~1 KiB ranges force several tasks per worker
+    stats = batch_score(f'{workdir}/archive.csv', f'{workdir}/scores.csv', workers=2, chunk_mb=0.001,
+                        progress_seconds=0)
+    assert (stats['rows'], stats['errors']) == (40, 2)
+    
+    with open(f'{workdir}/scores.csv', newline='') as f:
+        scored = list(csv.DictReader(f))
+    payload = [{k: v for k, v in r.items() if v != ''} for r in readings]
+    expected = app.test_client().post('/predict/batch', json=payload).get_json()['results']
+    assert [int(row['row']) for row in scored] == list(range(40))
+    for row, result in zip(scored, expected):
+        if 'error' in result:
+            assert row['error'] == result['error'] and row['top1'] == ''
+            continue
+        top = result['predictions']
+        assert [row['top1'], row['top2'], row['top3']] == [p['disease'] for p in top]
+        for p in top:
+            assert abs(float(row[f"p_{p['disease']}"]) * 100 - p['probability']) < 0.011
+
+def test_metrics_expose_stage_histograms_and_route_counters():
+    """/metrics reports per-stage latency, per-route counts and in-flight gauges in Prometheus format"""
+    metrics.clear()
+    client = app.test_client()
+    reading = load_sample_readings(1)[0]
+    client.post('/predict', json=reading)
+    client.post('/predict', json={'pH': 7})
+    client.post('/predict/stream', data=json.dumps(reading) + '\n')
+    client.get('/alerts')
+    
+    text = client.get('/metrics').get_data(as_text=True)
+    for stage in ('parse', 'features', 'impute', 'predict_proba', 'build_response', 'log', 'serialize'):
+        assert f'prediction_stage_seconds_bucket{{stage="{stage}",le="+Inf"}}' in text
+    assert 'http_requests_total{method="POST",route="/predict",status="200"} 1' in text
+    assert 'http_requests_total{method="POST",route="/predict",status="400"} 1' in text
+    assert 'http_requests_in_flight{route="/predict/stream"} 0' in text
+    assert 'database_call_seconds_count{method="get_alerts_page"} 1' in text
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    
+    stages = {s['stage']: s for s in client.get('/metrics?format=json').get_json()['prediction_stage_seconds']}
+    assert stages['predict_proba']['count'] == 2
+    assert 0 < stages['predict_proba']['p50_ms'] <= stages['predict_proba']['p99_ms']
+    
+    histogram = Histogram((1.0, 2.0, 4.0))
+    for value in (0.5, 1.5, 1.5, 3.0):
+        histogram.observe(value)
+    assert histogram.percentile(0.5) == 1.5 and histogram.percentile(1.0) == 4.0
+
+def test_admin_profiles_requests_on_demand():
+    """Only an admin's X-Profile header or the sampling rate profiles a request, into a bounded buffer"""
+    admin_id = app_module.db.create_user("profiler", "profiler@health.gov", "pw", "admin", "Profiler")
+    user_id = app_module.db.create_user("profiled", "profiled@health.gov", "pw", "volunteer", "Profiled")
+    admin = {"Authorization": f"Bearer {app_module.db.generate_token(admin_id, 'profiler', 'admin')}"}
+    user = {"Authorization": f"Bearer {app_module.db.generate_token(user_id, 'profiled', 'volunteer')}"}
+    client = app.test_client()
+    reading = load_sample_readings(1)[0]
+    
+    assert client.get('/admin/profiles', headers=admin).get_json() == {'enabled': False}
+    assert client.get('/admin/profiles', headers=user).status_code == 403
+    
+    app_module.profiler = RequestProfiler(sample_every=0, capacity=2, top_n=5)
+    try:
+        assert 'X-Profile-Id' not in client.post('/predict', json=reading, headers={**user, 'X-Profile': '1'}).headers
+        assert 'X-Profile-Id' not in client.post('/predict', json=reading).headers
+        
+        response = client.post('/predict', json=reading, headers={**admin, 'X-Profile': '1'})
+        profile = client.get(f"/admin/profiles/{response.headers['X-Profile-Id']}", headers=admin).get_json()
+        assert profile['route'] == '/predict' and profile['status'] == 200 and profile['trigger'] == 'header'
+        assert len(profile['functions']) == 5
+        assert profile['functions'][0]['cumtime_ms'] >= profile['functions'][-1]['cumtime_ms']
+        
+        # Every third request is sampled; the buffer keeps the newest two
+        app_module.profiler.sample_every = 3
+        for _ in range(9):
+            client.get('/hygiene-tips')
+        body = client.get('/admin/profiles', headers=admin).get_json()
+        assert [p['trigger'] for p in body['profiles']] == ['sample', 'sample']
+        assert body['profiles'][0]['id'] > body['profiles'][1]['id'] > profile['id']
+        assert client.get(f"/admin/profiles/{profile['id']}", headers=admin).status_code == 404
+    finally:
+        app_module.profiler = None
+
+def test_profiling_stays_off_for_threaded_workers_when_cprofile_sees_every_thread():
+    """On Python 3.12+ a worker with several threads never enables profiling"""
+    saved = {name: os.environ.get(name) for name in ('REQUEST_PROFILING', 'GUNICORN_THREADS')}
+    os.environ.update(REQUEST_PROFILING='1', GUNICORN_THREADS='4')
+    try:
+        app_module.PROFILES_ONE_THREAD = False
+        app_module.init_profiler()
+        assert app_module.profiler is None
+        
+        app_module.PROFILES_ONE_THREAD = True
+        app_module.init_profiler()
+        assert app_module.profiler is not None
+    finally:
+        app_module.PROFILES_ONE_THREAD = PROFILES_ONE_THREAD
+        app_module.profiler = None
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+if __name__ == "__main__":
+    test_batch_matches_single_predictions()
+    test_batch_reports_invalid_rows_individually()
+    test_batch_rejects_empty_payload()
+    test_micro_batcher_coalesces_concurrent_requests()
+    test_prediction_cache_hits_and_versions()
+    test_prediction_writer_batches_and_counts_drops()
+    test_token_cache_verifies_once_and_revokes_users()
+    test_revocation_reaches_caches_that_missed_the_callback()
+    test_logout_revokes_token()
+    test_registry_swaps_valid_models_and_keeps_serving_on_bad_ones()
+    test_replacing_only_the_pickle_reloads_it_over_a_stale_artifact()
+    test_batcher_never_mixes_model_versions()
+    test_predict_reports_model_version()
+    test_rule_fallback_scores_batches_deterministically()
+    test_ready_reports_phases_after_warm_up()
+    test_warm_up_starts_no_background_threads()
+    test_stream_scores_ndjson_in_chunks()
+    test_ndjson_line_limit_ignores_the_newline()
+    test_batch_score_cli_matches_batch_endpoint()
+    test_metrics_expose_stage_histograms_and_route_counters()
+    test_admin_profiles_requests_on_demand()
+    test_profiling_stays_off_for_threaded_workers_when_cprofile_sees_every_thread()
+    print("✅ API tests passed")
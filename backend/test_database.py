@@ -0,0 +1,130 @@
+"""
+Schema and query-plan tests for DatabaseManager
+"""
+
+import os
+import sqlite3
+import tempfile
+
+from database import DatabaseManager, MIGRATIONS
+
+def make_manager() -> DatabaseManager:
+    """A DatabaseManager on a fresh temporary database"""
+    return DatabaseManager(os.path.join(tempfile.mkdtemp(prefix="db_test_"), "health.db"))
+
+def capture_queries(manager: DatabaseManager, call) -> list:
+    """Run call() and return the SELECT statements it executed, with parameters bound"""
+    statements = []
+    conn = manager.get_connection()
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    return [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]
+
+def query_plan(manager: DatabaseManager, sql: str) -> str:
+    rows = manager.get_connection().execute(f'EXPLAIN QUERY PLAN {sql}').fetchall()
+    return '\n'.join(row[-1] for row in rows)
+
+def test_migrations_upgrade_existing_database():
+    """A database created by the old CREATE TABLE block is upgraded in place"""
+    db_path = os.path.join(tempfile.mkdtemp(prefix="db_test_"), "legacy.db")
+    conn = sqlite3.connect(db_path)
+    for statement in MIGRATIONS[0][2]:
+        conn.execute(statement)
+    conn.commit()
+    conn.close()
+    
+    manager = DatabaseManager(db_path)
+    assert manager.schema_version() == MIGRATIONS[-1][0]
+    
+    # Re-running is a no-op
+    assert manager.migrate() == MIGRATIONS[-1][0]
+
+def test_hot_queries_use_indexes():
+    """Every hot query is answered from an index, without a full scan or temp sort"""
+    manager = make_manager()
+    user_id = manager.create_user("field", "field@health.gov", "pw", "volunteer", "Field Worker")
+    
+    calls = [
+        lambda: manager.get_user_surveys_page(user_id),
+        manager.get_alerts_page,
+        manager.get_system_stats
+    ]
+    for call in calls:
+        for sql in capture_queries(manager, call):
+            plan = query_plan(manager, sql)
+            assert 'USING' in plan and 'INDEX' in plan, f"{sql}\n{plan}"
+            assert 'TEMP B-TREE' not in plan, f"{sql}\n{plan}"
+
+def test_alert_pages_walk_every_row_once():
+    """Keyset pages cover all matching rows in order, even when created_at ties"""
+    manager = make_manager()
+    for i in range(25):
+        manager.create_alert(f"Alert {i}", "", "high" if i % 2 else "low", f"Village {i % 3}", "Cholera")
+    
+    seen, cursor = [], None
+    while True:
+        page, cursor = manager.get_alerts_page(limit=7, cursor=cursor, severity="high")
+        seen.extend(alert['id'] for alert in page)
+        if cursor is None:
+            break
+    
+    assert seen == sorted(seen, reverse=True)
+    assert len(seen) == len(set(seen)) == 12
+    
+    for sql in capture_queries(manager, lambda: manager.get_alerts_page(limit=7, cursor=cursor, status="active")):
+        assert 'TEMP B-TREE' not in query_plan(manager, sql)
+
+def test_survey_pages_filter_by_date_range():
+    """Date bounds accept ISO dates and exclude rows outside the range"""
+    manager = make_manager()
+    user_id = manager.create_user("pager", "pager@health.gov", "pw", "volunteer", "Pager")
+    manager.create_survey(user_id, "Village A", water_quality="good")
+    
+    page, cursor = manager.get_user_surveys_page(user_id, created_after="2000-01-01")
+    assert len(page) == 1 and cursor is None
+    page, _ = manager.get_user_surveys_page(user_id, created_before="2000-01-01")
+    assert page == []
+
+def test_system_stats_track_writes():
+    """Counters follow inserts, status changes and logins without rescanning"""
+    manager = make_manager()
+    user_id = manager.create_user("counter", "counter@health.gov", "pw", "volunteer", "Counter")
+    manager.create_survey(user_id, "Village A", water_quality="good")
+    manager.create_survey(user_id, "Village B", water_quality="poor")
+    manager.authenticate_user("counter", "pw")
+    
+    conn = manager.get_connection()
+    with conn:
+        conn.execute("UPDATE surveys SET status = 'approved' WHERE location = 'Village A'")
+    
+    stats = manager.get_system_stats()
+    assert stats == manager.count_system_stats()
+    # The seeded admin account counts as a user too
+    assert stats == {"total_users": 2, "active_users": 1, "pending_approvals": 1, "total_submissions": 2}
+
+def test_rebuild_stats_corrects_drift():
+    """rebuild-stats recomputes counters that were edited behind the triggers' back"""
+    manager = make_manager()
+    user_id = manager.create_user("drift", "drift@health.gov", "pw", "volunteer", "Drift")
+    manager.create_survey(user_id, "Village A", water_quality="good")
+    
+    conn = manager.get_connection()
+    with conn:
+        conn.execute("UPDATE system_counters SET value = 42 WHERE name = 'total_submissions'")
+    
+    report = manager.rebuild_stats()
+    assert report["drift"] == {"total_submissions": 1 - 42}
+    assert report["consistent"]
+    assert manager.get_system_stats()["total_submissions"] == 1
+
+if __name__ == "__main__":
+    test_migrations_upgrade_existing_database()
+    test_hot_queries_use_indexes()
+    test_alert_pages_walk_every_row_once()
+    test_survey_pages_filter_by_date_range()
+    test_system_stats_track_writes()
+    test_rebuild_stats_corrects_drift()
+    print("✅ Database tests passed")
@@ -0,0 +1,191 @@
+"""
+Parity tests for the compiled inference engine against the shipped sklearn model
+"""
+
+import os
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from features import SENSOR_FIELDS, FeaturePlan
+from inference import compile_model
+from model_artifact import export_artifact, load_artifact
+from model_report import check_budget, load_budget, model_report
+
+MODEL_PATH = 'models/water_disease_model.pkl'
+
+def load_reference_features(model_data) -> np.ndarray:
+    """Build the model's feature matrix from the bundled dataset plus jittered copies"""
+    df = pd.read_csv('WATER_dATA.csv').drop(columns='disease')
+    sensors = df[model_data['sensor_features']].to_numpy(dtype=np.float64)
+    
+    rng = np.random.default_rng(42)
+    jittered = sensors[rng.integers(0, len(sensors), 2000)] * rng.uniform(0.7, 1.3, (2000, sensors.shape[1]))
+    jittered[rng.random(jittered.shape) < 0.05] = np.nan
+    
+    raw = np.vstack([sensors, jittered])
+    indicators = (~np.isnan(raw)).astype(np.float64)
+    return np.hstack([raw, indicators])
+
+def test_compiled_forest_matches_sklearn():
+    """Probabilities and labels must match sklearn within floating-point tolerance"""
+    model_data = compile_model(joblib.load(MODEL_PATH))
+    X = load_reference_features(model_data)
+    
+    imputed = model_data['imputer'].transform(X)
+    np.testing.assert_allclose(model_data['compiled_imputer'].transform(X), imputed)
+    
+    expected = model_data['model'].predict_proba(imputed)
+    actual = model_data['engine'].predict_proba(imputed)
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-12)
+    
+    labels = model_data['engine'].predict(imputed, proba=actual)
+    assert (labels == model_data['model'].predict(imputed)).all()
+
+def test_compiled_forest_routes_missing_values_like_sklearn():
+    """Unimputed NaNs follow each split's missing-value direction"""
+    model_data = compile_model(joblib.load(MODEL_PATH))
+    X = load_reference_features(model_data)
+    
+    expected = model_data['model'].predict_proba(X)
+    np.testing.assert_allclose(model_data['engine'].predict_proba(X), expected, rtol=0, atol=1e-12)
+
+def test_feature_plan_matches_legacy_assembly():
+    """The compiled plan must reproduce the per-request feature loop and its validation"""
+    model_data = joblib.load(MODEL_PATH)
+    plan = FeaturePlan.from_model(model_data)
+    readings = pd.read_csv('WATER_dATA.csv').drop(columns='disease').head(20).to_dict('records')
+    
+    for data in readings:
+        legacy = [
+            float(data[name]) if name in data
+            else float(data.get(name[4:]) is not None) if name.startswith('has_')
+            else 0.0
+            for name in model_data['feature_names']
+        ]
+        features, error_msg = plan.transform(data)
+        assert error_msg == ""
+        # Rows are float32, the precision the forest compares in
+        assert features.dtype == np.float32
+        np.testing.assert_array_equal(features[0], np.asarray(legacy, dtype=np.float32))
+    
+    matrix, valid_indices, errors = plan.transform_many(readings + [{'pH': 7}, dict(readings[0], orp='x')])
+    assert matrix.shape == (len(readings), len(model_data['feature_names']))
+    assert valid_indices == list(range(len(readings)))
+    assert errors == {
+        len(readings): "Missing required field: turbidity",
+        len(readings) + 1: "Invalid value for orp: must be a number"
+    }
+
+def test_artifact_round_trip_is_memory_mapped():
+    """An exported artifact maps read-only arrays and scores exactly like the pickle"""
+    model_data = compile_model(joblib.load(MODEL_PATH))
+    path = os.path.join(tempfile.mkdtemp(prefix="artifact_test_"), "model.forest")
+    export_artifact(model_data, path)
+    # Re-exporting over an existing artifact replaces it in place
+    manifest = export_artifact(model_data, path)
+    
+    mapped = load_artifact(path)
+    assert mapped['version'] == manifest['version']
+    assert not mapped['engine'].value.flags.writeable
+    assert list(mapped['engine'].classes_) == list(model_data['model'].classes_)
+    
+    X = load_reference_features(model_data)
+    expected = model_data['engine'].predict_proba(model_data['compiled_imputer'].transform(X))
+    actual = mapped['engine'].predict_proba(mapped['compiled_imputer'].transform(X))
+    np.testing.assert_array_equal(actual, expected)
+
+def test_float32_artifact_routes_rows_identically():
+    """float32 thresholds reach the same leaves; only leaf probabilities round"""
+    model_data = compile_model(joblib.load(MODEL_PATH))
+    path = os.path.join(tempfile.mkdtemp(prefix="artifact_test_"), "model.forest")
+    manifest = export_artifact(dict(model_data, version='abc'), path, precision='float32')
+    assert manifest['precision'] == 'float32' and manifest['version'] == 'abc-f32'
+    
+    mapped = load_artifact(path)
+    assert mapped['engine'].threshold.dtype == np.float32
+    X = load_reference_features(model_data)
+    X64 = model_data['compiled_imputer'].transform(X)
+    X32 = mapped['compiled_imputer'].transform(X.astype(np.float32))
+    assert X32.dtype == np.float32
+    
+    np.testing.assert_array_equal(mapped['engine']._leaves(X32), model_data['engine']._leaves(X64.astype(np.float32)))
+    expected = model_data['engine'].predict_proba(X64)
+    actual = mapped['engine'].predict_proba(X32)
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-6)
+    assert (mapped['engine'].predict(X32, actual) == model_data['engine'].predict(X64, expected)).all()
+
+def test_model_report_counts_nodes_and_enforces_budgets():
+    """The report adds up per-tree nodes and component bytes, and budgets flag what is over"""
+    model_data = compile_model(joblib.load(MODEL_PATH))
+    forest = model_data['model']
+    report = model_report(MODEL_PATH, batch_rows=200, isolated=False)
+    
+    assert report['format'] == 'pickle' and report['trees']['count'] == len(forest.estimators_)
+    assert report['trees']['node_counts'] == [e.tree_.node_count for e in forest.estimators_]
+    assert report['trees']['leaves'] == sum(e.tree_.n_leaves for e in forest.estimators_)
+    assert report['components']['compiled_forest'] > 0 and report['components']['sklearn_forest'] > 0
+    assert [s['step'] for s in report['load']['steps']] == ['import flask', 'import sklearn', 'unpickle',
+                                                              'compile', 'first batch']
+    assert 0 < report['latency']['single_row_p50_ms'] <= report['latency']['single_row_p99_ms']
+    
+    assert check_budget(report, load_budget('default')) == []
+    violations = check_budget(report, load_budget('{"max_nodes": 10, "max_batch_ms": null}'))
+    assert len(violations) == 1 and violations[0].startswith('nodes is')
+    try:
+        load_budget('{"max_trees": 10}')
+        assert False, "unknown budget keys must be rejected"
+    except ValueError:
+        pass
+
+def test_column_validation_matches_per_reading_validation():
+    """transform_columns accepts, rejects and fills exactly like transform_many, message for message"""
+    df = pd.read_csv('WATER_dATA.csv').drop(columns='disease')
+    base = df.iloc[:3].to_dict('records')
+    readings = base + [
+        dict(base[0], pH=float('nan')),
+        dict(base[1], pH=None),
+        dict(base[2], turbidity='cloudy'),
+        dict(base[0], orp=[1]),
+        dict(base[1], pH='7.25', gps_lat=True),
+        dict(base[2], pH=99.0, conductivity=-1e30, ecoli_cfu='inf'),
+        {k: v for k, v in base[0].items() if k != 'water_temp'},
+        dict(base[1], pH='x', turbidity=None),
+        dict(base[2], extra=None, depth=float('nan')),
+        dict(base[0], depth='deep'),
+        dict(base[1], depth=3.5)
+    ]
+    # Missing keys become NaN cells, as in a CSV chunk; all-numeric columns take the vectorized path
+    def column(name):
+        cells = [r.get(name, float('nan')) for r in readings]
+        if all(isinstance(c, float) for c in cells):
+            return np.asarray(cells)
+        return np.asarray(cells, dtype=object)
+    
+    feature_names = SENSOR_FIELDS + ['depth', 'has_depth', 'has_turbidity']
+    for plan in (FeaturePlan(feature_names), FeaturePlan(feature_names, required_fields=['pH', 'orp'])):
+        expected, expected_valid, expected_errors = plan.transform_many(readings)
+        names = {field for field, _, _, _ in plan._fields}
+        actual, actual_valid, actual_errors = plan.transform_columns({n: column(n) for n in names}, len(readings))
+        assert actual_errors == expected_errors and actual_valid == expected_valid
+        np.testing.assert_array_equal(actual, expected)
+    # Optional fields may be absent or null, but not malformed
+    assert expected_errors[5] == "Invalid value for turbidity: must be a number"
+    assert 9 in expected_valid and 11 in expected_valid and 12 in expected_errors
+    
+    valid, errors = FeaturePlan(feature_names).transform_many(readings)[1:]
+    assert errors[3] == "Missing required field: pH" and errors[9] == "Missing required field: water_temp"
+    assert errors[4] == errors[10] == "Invalid value for pH: must be a number"
+    assert 7 in valid and 8 in valid
+
+if __name__ == "__main__":
+    test_compiled_forest_matches_sklearn()
+    test_compiled_forest_routes_missing_values_like_sklearn()
+    test_feature_plan_matches_legacy_assembly()
+    test_column_validation_matches_per_reading_validation()
+    test_artifact_round_trip_is_memory_mapped()
+    test_float32_artifact_routes_rows_identically()
+    test_model_report_counts_nodes_and_enforces_budgets()
+    print("✅ Compiled engine matches sklearn")
@@ -0,0 +1,106 @@
+"""
+Tests for the cross-validated hyperparameter search in train_model
+"""
+
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from features import SENSOR_FIELDS
+from model_artifact import file_version, load_artifact
+from synthetic_data import SensorProfile, write_dataset
+from train_model import (WaterDiseasePredictor, expand_search_space, load_search_space, run_search,
+                         train_with_your_dataset)
+from train_streaming import tree_allocation, train_streaming
+
+def test_search_ranks_candidates_and_isolates_failures():
+    """Every candidate is cross-validated in the pool; a bad one is reported, not fatal"""
+    predictor = WaterDiseasePredictor()
+    X, y = predictor.search_matrix(predictor.prepare_dataframe(pd.read_csv('WATER_dATA.csv')))
+
+    space = load_search_space('{"n_estimators": 10, "max_depth": [4, 8, -1]}')
+    assert len(expand_search_space(space)) == 3
+
+    report = run_search(X, y, space, folds=3, workers=2)
+    ranked = [c for c in report['candidates'] if 'error' not in c]
+    failed = [c for c in report['candidates'] if 'error' in c]
+
+    assert [c['params']['max_depth'] for c in failed] == [-1]
+    assert len(ranked) == 2 and report['best'] is ranked[0]
+    assert ranked[0]['f1_macro_mean'] >= ranked[1]['f1_macro_mean']
+    assert all(c['wall_seconds'] > 0 and c['cpu_seconds'] > 0 for c in ranked)
+
+def test_streaming_training_merges_chunk_forests():
+    """Chunks that miss a class still merge into one forest over every class"""
+    predictor = WaterDiseasePredictor()
+    df = predictor.prepare_dataframe(pd.read_csv('WATER_dATA.csv'), verbose=False)
+    assert tree_allocation(4, 10) == [2, 3, 2, 3] and sum(tree_allocation(40, 10)) == 10
+
+    path = tempfile.mkdtemp() + '/model.forest'
+    model_data, metrics = train_streaming('WATER_dATA.csv', chunk_rows=100, params={'n_estimators': 8},
+                                          artifact_path=path, holdout_fraction=0.1, n_jobs=1)
+    assert metrics['chunks'] == 4 and metrics['trees'] == 8 and metrics['peak_rss_mb']['fit'] > 0
+    assert sorted(model_data['engine'].classes_) == sorted(df['disease'].unique())
+    assert metrics['trained_rows'] + metrics['holdout_rows'] == metrics['rows']
+
+    # Fewer trees than chunks: chunks without trees are trained on by the next one
+    assert tree_allocation(4, 2) == [0, 1, 0, 1]
+    _, metrics = train_streaming('WATER_dATA.csv', chunk_rows=100, params={'n_estimators': 2},
+                                 artifact_path=None, holdout_fraction=0.1, n_jobs=1)
+    assert metrics['trees'] == 2 and metrics['trained_rows'] + metrics['holdout_rows'] == metrics['rows']
+
+    # Few enough rows that the reservoir medians are exact
+    expected = df[predictor.sensor_features].median().to_numpy()
+    assert np.allclose(model_data['compiled_imputer'].statistics_, expected, rtol=1e-6)
+
+    served = load_artifact(path)
+    X = np.zeros((3, len(served['feature_names'])))
+    assert np.allclose(served['engine'].predict_proba(X), model_data['engine'].predict_proba(X))
+
+def test_unchanged_training_run_is_a_cache_hit():
+    """Same data and parameters restore the cached model; new parameters reuse the prepared matrix"""
+    workdir = tempfile.mkdtemp()
+    run = dict(data_path='WATER_dATA.csv', output=f'{workdir}/m.pkl', artifact_path=f'{workdir}/m.forest',
+               cache_dir=f'{workdir}/cache')
+
+    predictor, first = train_with_your_dataset(params={'n_estimators': 10}, **run)
+    assert predictor is not None
+    version = file_version(f'{workdir}/m.pkl')
+
+    predictor, second = train_with_your_dataset(params={'n_estimators': 10}, **run)
+    assert predictor is None and second['test_accuracy'] == first['test_accuracy']
+    assert file_version(f'{workdir}/m.pkl') == version
+    assert load_artifact(f'{workdir}/m.forest')['engine'].n_estimators == 10
+
+    predictor, _ = train_with_your_dataset(params={'n_estimators': 12}, **run)
+    assert predictor is not None and predictor.model.n_estimators == 12
+
+def test_synthetic_dataset_follows_schema_balance_and_missing_rates():
+    """Generated CSVs have the training schema and honour class weights and per-sensor gaps"""
+    path = f"{tempfile.mkdtemp(prefix='synthetic_test_')}/data.csv"
+    options = dict(profile=SensorProfile.from_dataset(), balance={'Safe': 1, 'Cholera': 3},
+                   missing=0.1, missing_by={'ecoli_cfu': 0.5}, chunk_rows=7000, seed=3)
+    stats = write_dataset(path, 20000, **options)
+    df = pd.read_csv(path)
+
+    assert list(df.columns) == SENSOR_FIELDS + ['disease'] and len(df) == stats['rows'] == 20000
+    assert set(df['disease']) == {'Safe', 'Cholera'}
+    assert abs((df['disease'] == 'Cholera').mean() - 0.75) < 0.02
+    assert abs(df['ecoli_cfu'].isna().mean() - 0.5) < 0.02 and abs(df['pH'].isna().mean() - 0.1) < 0.02
+    assert df['pH'].dropna().between(0, 14).all()
+    assert (df[['turbidity', 'ecoli_cfu']].dropna() >= 0).all().all()
+
+    # Same seed and chunking, same bytes, regardless of worker processes
+    with open(path, 'rb') as f:
+        first = f.read()
+    write_dataset(path, 20000, jobs=2, **options)
+    with open(path, 'rb') as f:
+        assert f.read() == first
+
+if __name__ == "__main__":
+    test_search_ranks_candidates_and_isolates_failures()
+    test_streaming_training_merges_chunk_forests()
+    test_unchanged_training_run_is_a_cache_hit()
+    test_synthetic_dataset_follows_schema_balance_and_missing_rates()
+    print("✅ Training tests passed")
@@ -0,0 +1,146 @@
+"""
+Bounded cache of verified JWT claims.
+
+Dashboard clients send the same bearer token on every request, and each one
+would otherwise pay for a full jwt.decode. Successful verifications are cached
+under the token's SHA-256 digest until the earlier of the token's own `exp` and
+the cache TTL. Failed verifications are never cached. Entries are also indexed
+by user id so logout or deactivation can drop a user's tokens at once.
+
+Revocation listeners only run in the process that handled the logout, so a
+hit is also confirmed with current_fn (a primary-key read of the user's
+revocation timestamp in the app). Every worker then rejects a revoked token
+on its next use, and a hit still skips the signature check.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set
+
+class TokenCache:
+    """LRU cache of verified token claims with per-user revocation"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._by_user: Dict[Any, Set[bytes]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.revocations = 0
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def verify(self, token: str, verify_fn: Callable[[str], Optional[Dict[str, Any]]],
+               current_fn: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Optional[Dict[str, Any]]:
+        """Return cached claims for token, or verify it with verify_fn and cache the result
+
+        current_fn, when given, must confirm cached claims are still valid;
+        entries it rejects are dropped as revoked.
+        """
+        key = self.key(token)
+        claims = self.get(key)
+        if claims is not None and current_fn is not None and not current_fn(claims):
+            with self._lock:
+                if key in self._entries:
+                    self._remove(key)
+                    self.revocations += 1
+            return None
+        if claims is None:
+            claims = verify_fn(token)
+            if claims is None:
+                return None
+            self.put(key, claims)
+        # Handlers may annotate request.user; keep the cached copy pristine
+        return dict(claims)
+
+    def get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        # Wall clock, because `exp` is a Unix timestamp
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, expires_at = entry
+            if expires_at <= now:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def put(self, key: bytes, claims: Dict[str, Any]):
+        expires_at = time.time() + self.ttl_seconds
+        if claims.get('exp') is not None:
+            expires_at = min(expires_at, float(claims['exp']))
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (claims, expires_at)
+            self._by_user.setdefault(claims.get('user_id'), set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: bytes):
+        """Drop one entry and its user index slot; caller holds the lock"""
+        claims, _ = self._entries.pop(key)
+        keys = self._by_user.get(claims.get('user_id'))
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[claims.get('user_id')]
+
+    def revoke_token(self, token: str) -> bool:
+        """Forget one token; returns True if it was cached"""
+        key = self.key(token)
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            self.revocations += 1
+            return True
+
+    def revoke_user(self, user_id: Any) -> int:
+        """Forget every cached token for a user; returns how many were dropped"""
+        with self._lock:
+            keys = list(self._by_user.get(user_id, ()))
+            for key in keys:
+                self._remove(key)
+            self.revocations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "users": len(self._by_user),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "revocations": self.revocations
+            }
@@ -7,25 +7,56 @@ import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.impute import SimpleImputer
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report, accuracy_score
+from sklearn.model_selection import train_test_split, KFold, StratifiedKFold
+from sklearn.metrics import classification_report, accuracy_score, f1_score
+from sklearn.pipeline import Pipeline
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import itertools
+import os
 import pickle
 import joblib
 import json
-from typing import Dict, Optional
+import shutil
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from model_artifact import export_artifact, file_version, is_artifact, replace_directory
+from training_cache import TrainingCache, code_fingerprint
 import warnings
 warnings.filterwarnings('ignore')
 
+# The production forest; search candidates override individual parameters
+DEFAULT_FOREST_PARAMS = {
+    'n_estimators': 300,
+    'class_weight': 'balanced',
+    'random_state': 42,
+    'max_depth': 15,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2
+}
+
+# Grid used by `--search default`
+DEFAULT_SEARCH_SPACE = {
+    'n_estimators': [150, 300],
+    'max_depth': [8, 15, None],
+    'min_samples_leaf': [1, 2, 5],
+    'max_features': ['sqrt', 0.5]
+}
+
 class WaterDiseasePredictor:
     """
     ML Pipeline for water-borne disease prediction
     Trains on your actual dataset
     """
     
-    def __init__(self):
+    def __init__(self, precision: str = 'float32'):
         self.model = None
         self.imputer = None
         self.feature_names = None
+        # Feature matrices and the exported artifact use this float width; the forest
+        # compares in float32 either way, so float32 halves memory without changing splits
+        self.precision = precision
         self.disease_classes = ['Cholera', 'Typhoid', 'Diarrhea', 'HepatitisA', 'Safe']
         
         # Core sensor features as per your training code
@@ -35,12 +66,13 @@ class WaterDiseasePredictor:
             'ambient_humidity', 'gps_lat', 'gps_lon'
         ]
         
-    def prepare_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+    def prepare_dataframe(self, df: pd.DataFrame, verbose: bool = True) -> pd.DataFrame:
         """
         Standardize column names and disease labels for your dataset
         """
-        print(f"📊 Processing your dataset: {df.shape}")
-        print(f"📋 Original columns: {list(df.columns)}")
+        if verbose:
+            print(f"📊 Processing your dataset: {df.shape}")
+            print(f"📋 Original columns: {list(df.columns)}")
         
         # Column name mapping (handles different naming conventions)
         column_mapping = {
@@ -90,9 +122,21 @@ class WaterDiseasePredictor:
                 'safe': 'Safe', 'SAFE': 'Safe', 'normal': 'Safe', 'clean': 'Safe', 'good': 'Safe'
             }
             
-            df['disease'] = df['disease'].astype(str).str.lower().map(
-                lambda x: disease_mapping.get(x, x.title())
-            )
+            normalize = lambda label: disease_mapping.get(str(label).lower(), str(label).lower().title())
+            
+            # Normalize each distinct label once and keep the column categorical (one byte per row)
+            labels = df['disease'].astype('category')
+            normalized = [normalize(label) for label in labels.cat.categories]
+            codes = labels.cat.codes.to_numpy()
+            if (codes < 0).any():
+                # Missing labels read as the string 'nan', as astype(str) would make them
+                normalized.append(normalize(np.nan))
+                codes = np.where(codes < 0, len(normalized) - 1, codes)
+            categories = pd.Index(normalized).unique()
+            df['disease'] = pd.Categorical.from_codes(categories.get_indexer(normalized)[codes], categories)
+        
+        if not verbose:
+            return df
         
         print(f"✅ Processed dataset: {df.shape}")
         if 'disease' in df.columns:
@@ -113,7 +157,7 @@ class WaterDiseasePredictor:
         for feature in self.sensor_features:
             if feature in df_processed.columns:
                 # Create missing indicator (1 if data available, 0 if missing)
-                df_processed[f'has_{feature}'] = (~df_processed[feature].isna()).astype(int)
+                df_processed[f'has_{feature}'] = (~df_processed[feature].isna()).astype(np.int8)
         
         return df_processed
     
@@ -151,34 +195,59 @@ class WaterDiseasePredictor:
         
         return df_processed
     
-    def train_model(self, df: pd.DataFrame) -> Dict:
+    def prepared_matrix(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, List[str]]:
         """
-        Train RandomForest model on your dataset
+        Un-imputed feature matrix (sensors + missing indicators), labels and feature names
         """
-        print("🔬 Training model on your dataset...")
-        
-        # Check if target column exists
         if 'disease' not in df.columns:
             raise ValueError("Dataset must have a 'disease' column with disease labels")
         
-        # Preprocess data
-        X_processed = self.preprocess_data(df, fit_imputer=True)
-        y = df['disease']
+        df_processed = self.create_missing_indicators(df)
+        feature_cols = [col for col in df_processed.columns if col != 'disease']
+        return df_processed[feature_cols].to_numpy(dtype=self.precision), df['disease'].to_numpy(), feature_cols
+    
+    def column_dtypes(self, columns: List[str]) -> Dict[str, str]:
+        """Read dtypes for a file's own column names: sensors at self.precision, the label categorical"""
+        renamed = self.prepare_dataframe(pd.DataFrame(columns=list(columns)), verbose=False).columns
+        return {
+            original: 'category' if name == 'disease' else self.precision
+            for original, name in zip(columns, renamed)
+            if name == 'disease' or name in self.sensor_features
+        }
+    
+    def search_matrix(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Un-imputed feature matrix (sensors + missing indicators) and labels for cross-validation
+        """
+        X, y, _ = self.prepared_matrix(df)
+        return X, y
+    
+    def train_model(self, df: pd.DataFrame, params: Optional[Dict] = None, n_jobs: Optional[int] = None) -> Dict:
+        """
+        Train RandomForest model on your dataset
+        """
+        return self.train_matrix(*self.prepared_matrix(df), params=params, n_jobs=n_jobs)
+    
+    def train_matrix(self, X: np.ndarray, y: np.ndarray, feature_names: List[str],
+                     params: Optional[Dict] = None, n_jobs: Optional[int] = None) -> Dict:
+        """
+        Train RandomForest model on a prepared matrix (see prepared_matrix)
+        """
+        print("🔬 Training model on your dataset...")
+        
+        # Median imputation, same as preprocess_data(fit_imputer=True)
+        self.feature_names = list(feature_names)
+        self.imputer = SimpleImputer(strategy='median')
+        X_processed = pd.DataFrame(self.imputer.fit_transform(pd.DataFrame(X, columns=self.feature_names)),
+                                   columns=self.feature_names)
         
         # Train-test split (without stratification due to imbalanced classes)
         X_train, X_test, y_train, y_test = train_test_split(
             X_processed, y, test_size=0.2, random_state=42
         )
         
-        # Train RandomForest as per specifications
-        self.model = RandomForestClassifier(
-            n_estimators=300,
-            class_weight='balanced',
-            random_state=42,
-            max_depth=15,
-            min_samples_split=5,
-            min_samples_leaf=2
-        )
+        # Train RandomForest as per specifications, or with the parameters a search picked
+        self.model = RandomForestClassifier(**{**DEFAULT_FOREST_PARAMS, **(params or {})}, n_jobs=n_jobs)
         
         self.model.fit(X_train, y_train)
         
@@ -208,8 +277,8 @@ class WaterDiseasePredictor:
             'feature_importance': feature_importance.to_dict('records')
         }
     
-    def save_model(self, filepath: str):
-        """Save trained model with both pickle and joblib"""
+    def save_model(self, filepath: str, artifact_path: Optional[str] = None):
+        """Save trained model with both pickle and joblib, plus an optional memory-mapped artifact"""
         model_data = {
             'model': self.model,
             'imputer': self.imputer,
@@ -223,27 +292,213 @@ class WaterDiseasePredictor:
         # Save with joblib
         joblib.dump(model_data, filepath.replace('.pkl', '.joblib'))
         print(f"💾 Model saved as {filepath.replace('.joblib','')}.pkl and .joblib")
+        
+        if artifact_path:
+            # Same version as the pickle, so caches and prediction logs agree across formats
+            model_data['version'] = file_version(filepath.replace('.joblib', '.pkl'))
+            export_artifact(model_data, artifact_path, precision=self.precision)
+            print(f"💾 Memory-mapped artifact saved as {artifact_path}")
 
-def train_with_your_dataset():
+def load_search_space(spec: str) -> Dict[str, List]:
+    """Search space from 'default', a JSON file path, or an inline JSON object"""
+    if spec == 'default':
+        return DEFAULT_SEARCH_SPACE
+    if os.path.exists(spec):
+        with open(spec) as f:
+            space = json.load(f)
+    else:
+        space = json.loads(spec)
+    # A scalar means "fixed at this value"
+    return {name: values if isinstance(values, list) else [values] for name, values in space.items()}
+
+def expand_search_space(space: Dict[str, List]) -> List[Dict]:
+    """Every combination of the grid, in a stable order"""
+    names = sorted(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+# Set once per pool worker so tasks only carry (candidate, fold) indices, not the data
+_SEARCH_STATE = {}
+
+def _init_search_worker(X: np.ndarray, y: np.ndarray, splits: List, tree_jobs: int):
+    _SEARCH_STATE.update(X=X, y=y, splits=splits, tree_jobs=tree_jobs)
+
+def _fit_fold(candidate: int, params: Dict, fold: int) -> Dict:
+    """Fit and score one candidate on one fold; imputation is fit on the training rows only"""
+    X, y = _SEARCH_STATE['X'], _SEARCH_STATE['y']
+    train_idx, test_idx = _SEARCH_STATE['splits'][fold]
+    started = time.time()
+    cpu_started = time.process_time()
+    
+    pipeline = Pipeline([
+        ('impute', SimpleImputer(strategy='median')),
+        ('forest', RandomForestClassifier(**{**DEFAULT_FOREST_PARAMS, **params}, n_jobs=_SEARCH_STATE['tree_jobs']))
+    ])
+    pipeline.fit(X[train_idx], y[train_idx])
+    fit_seconds = time.time() - started
+    cpu_seconds = time.process_time() - cpu_started
+    y_pred = pipeline.predict(X[test_idx])
+    
+    return {
+        'candidate': candidate,
+        'fold': fold,
+        'accuracy': accuracy_score(y[test_idx], y_pred),
+        'f1_macro': f1_score(y[test_idx], y_pred, average='macro'),
+        'fit_seconds': fit_seconds,
+        'cpu_seconds': cpu_seconds,
+        'started': started,
+        'finished': time.time()
+    }
+
+def run_search(X: np.ndarray, y: np.ndarray, space: Dict[str, List], folds: int = 5,
+               workers: Optional[int] = None, tree_jobs: int = 1, scoring: str = 'f1_macro') -> Dict:
     """
-    Train the model with YOUR dataset
+    Cross-validate every candidate in parallel: (candidate, fold) fits are spread over a
+    process pool, and each fit grows its trees on `tree_jobs` threads
+    """
+    candidates = expand_search_space(space)
+    workers = workers or max(1, (os.cpu_count() or 1) // tree_jobs)
+    
+    # Stratify unless a class is too rare to appear in every fold
+    _, class_counts = np.unique(y, return_counts=True)
+    splitter = StratifiedKFold if class_counts.min() >= folds else KFold
+    splits = list(splitter(n_splits=folds, shuffle=True, random_state=42).split(X, y))
+    
+    print(f"🔎 Searching {len(candidates)} candidates x {folds} folds on {workers} processes x {tree_jobs} tree jobs")
+    started = time.time()
+    fold_results = {i: [] for i in range(len(candidates))}
+    errors = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_search_worker,
+                             initargs=(X, y, splits, tree_jobs)) as pool:
+        futures = {pool.submit(_fit_fold, i, params, fold): i
+                   for i, params in enumerate(candidates) for fold in range(folds)}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+                fold_results[result['candidate']].append(result)
+            except Exception as e:
+                errors[futures[future]] = f"{type(e).__name__}: {e}"
+    wall_seconds = time.time() - started
+    
+    summaries = []
+    for i, params in enumerate(candidates):
+        results = fold_results[i]
+        if i in errors or not results:
+            summaries.append({'params': params, 'error': errors.get(i, 'no folds completed')})
+            continue
+        summaries.append({
+            'params': params,
+            'accuracy_mean': float(np.mean([r['accuracy'] for r in results])),
+            'accuracy_std': float(np.std([r['accuracy'] for r in results])),
+            'f1_macro_mean': float(np.mean([r['f1_macro'] for r in results])),
+            'f1_macro_std': float(np.std([r['f1_macro'] for r in results])),
+            'fit_seconds': float(sum(r['fit_seconds'] for r in results)),
+            'cpu_seconds': float(sum(r['cpu_seconds'] for r in results)),
+            'wall_seconds': float(max(r['finished'] for r in results) - min(r['started'] for r in results))
+        })
+    
+    ranked = sorted((s for s in summaries if 'error' not in s), key=lambda s: -s[f'{scoring}_mean'])
+    return {
+        'scoring': scoring,
+        'folds': folds,
+        'workers': workers,
+        'tree_jobs': tree_jobs,
+        'rows': int(X.shape[0]),
+        'wall_seconds': wall_seconds,
+        'cpu_seconds': float(sum(s.get('cpu_seconds', 0.0) for s in summaries)),
+        'best': ranked[0] if ranked else None,
+        'candidates': ranked + [s for s in summaries if 'error' in s]
+    }
+
+def print_search_report(report: Dict):
+    print(f"\n{'rank':<5} {'f1_macro':>15} {'accuracy':>15} {'fit (s)':>9} {'wall (s)':>9}  params")
+    for rank, candidate in enumerate(report['candidates'], 1):
+        if 'error' in candidate:
+            print(f"{'-':<5} {'failed':>15} {'':>15} {'':>9} {'':>9}  {candidate['params']}: {candidate['error']}")
+            continue
+        print(f"{rank:<5} {candidate['f1_macro_mean']:>8.3f} ±{candidate['f1_macro_std']:.3f}"
+              f" {candidate['accuracy_mean']:>8.3f} ±{candidate['accuracy_std']:.3f}"
+              f" {candidate['fit_seconds']:>9.2f} {candidate['wall_seconds']:>9.2f}  {candidate['params']}")
+    # CPU seconds spent fitting per wall-clock second is the parallelism actually achieved
+    print(f"⏱️  Search wall clock {report['wall_seconds']:.2f}s for {report['cpu_seconds']:.2f} CPU-seconds of fitting "
+          f"({report['cpu_seconds'] / max(report['wall_seconds'], 1e-9):.1f}x parallel)")
+
+def load_dataset(path: str, precision: str = 'float32') -> pd.DataFrame:
+    """Read a CSV or Parquet training dataset, downcasting sensors and categorizing the label as it loads"""
+    predictor = WaterDiseasePredictor(precision)
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+        return df.astype(predictor.column_dtypes(df.columns))
+    return pd.read_csv(path, dtype=predictor.column_dtypes(pd.read_csv(path, nrows=0).columns))
+
+def train_with_your_dataset(data_path: str = 'WATER_dATA.csv', search_space: Optional[Dict] = None,
+                            folds: int = 5, workers: Optional[int] = None, tree_jobs: int = 1,
+                            scoring: str = 'f1_macro', output: str = 'models/water_disease_model.pkl',
+                            artifact_path: Optional[str] = 'models/water_disease_model.forest',
+                            report_path: Optional[str] = None, params: Optional[Dict] = None,
+                            cache_dir: Optional[str] = 'models/.cache', precision: str = 'float32'):
+    """
+    Train the model with YOUR dataset, optionally picking parameters by cross-validated search.
+    Prepared matrices and trained models are cached by content under cache_dir (None disables);
+    on a model cache hit the outputs are restored and the returned predictor is None.
     """
     print("🌊 Smart Health Surveillance - Training Mode")
     print("=" * 50)
     
     # Initialize predictor
-    predictor = WaterDiseasePredictor()
+    predictor = WaterDiseasePredictor(precision)
+    cache = TrainingCache(cache_dir) if cache_dir else None
+    
+    if cache is not None:
+        matrix_key = cache.matrix_key(data_path, code_fingerprint(
+            WaterDiseasePredictor.prepare_dataframe, WaterDiseasePredictor.create_missing_indicators,
+            WaterDiseasePredictor.prepared_matrix, WaterDiseasePredictor.column_dtypes, load_dataset)
+            + str(predictor.sensor_features) + precision)
+        config = {'params': params, 'defaults': DEFAULT_FOREST_PARAMS, 'artifact': bool(artifact_path),
+                  'search': search_space and {'space': search_space, 'folds': folds, 'scoring': scoring}}
+        model_key = cache.model_key(matrix_key, config, code_fingerprint(
+            WaterDiseasePredictor.train_matrix, WaterDiseasePredictor.save_model, run_search, _fit_fold))
+        
+        metrics = cache.restore_model(model_key, output, artifact_path=artifact_path, report_path=report_path)
+        if metrics is not None:
+            print(f"♻️  Unchanged data and configuration: restored cached model {model_key}")
+            print(f"📊 Test accuracy: {metrics['test_accuracy']:.3f}")
+            print(f"💾 Model restored to {output}" + (f" and {artifact_path}" if artifact_path else ""))
+            return None, metrics
+    
+    prepared = cache.load_matrix(matrix_key) if cache is not None else None
+    if prepared is not None:
+        print(f"♻️  Using cached prepared matrix {matrix_key} for {data_path}")
+        X, y, feature_names = prepared
+    else:
+        # Load and prepare your dataset
+        print(f"📁 Loading your dataset from {data_path}...")
+        df = load_dataset(data_path, precision)
+        X, y, feature_names = predictor.prepared_matrix(predictor.prepare_dataframe(df))
+        del df
+        if cache is not None:
+            cache.save_matrix(matrix_key, X, y, feature_names, source=data_path)
     
-    # Load your dataset
-    print("📁 Loading your dataset...")
-    df = pd.read_csv('WATER_dATA.csv')
+    # Search for parameters if asked
+    report = None
+    if search_space:
+        report = run_search(X, y, search_space, folds=folds, workers=workers, tree_jobs=tree_jobs, scoring=scoring)
+        print_search_report(report)
+        if report['best'] is None:
+            raise RuntimeError("Every search candidate failed")
+        params = report['best']['params']
+        print(f"🏆 Best parameters by {scoring}: {params}")
+        if report_path:
+            with open(report_path, 'w') as f:
+                json.dump(report, f, indent=2, default=str)
+            print(f"📝 Search report saved as {report_path}")
     
-    # Prepare and train
-    prepared_df = predictor.prepare_dataframe(df)
-    metrics = predictor.train_model(prepared_df)
+    # Refit the chosen parameters on the full training split using every core
+    metrics = predictor.train_matrix(X, y, feature_names, params=params, n_jobs=-1)
     
     # Save the trained model
-    predictor.save_model('models/water_disease_model.pkl')
+    predictor.save_model(output, artifact_path=artifact_path)
+    if cache is not None:
+        cache.store_model(model_key, output, metrics, artifact_path=artifact_path, report=report)
     
     print("\n" + "=" * 50)
     print("✅ Training Complete!")
@@ -251,6 +506,91 @@ def train_with_your_dataset():
     
     return predictor, metrics
 
+def train_within_budget(budget: Dict, output: str, artifact_path: Optional[str],
+                        train: Callable[[str, Optional[str]], object]):
+    """Train into a staging directory and install the files only if the model meets its budget"""
+    from model_report import BudgetExceeded, check_budget, model_report, print_report
+    parent = os.path.dirname(os.path.abspath(output))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.candidate-', dir=parent)
+    try:
+        staged_output = os.path.join(staging, os.path.basename(output))
+        staged_artifact = os.path.join(staging, os.path.basename(artifact_path)) if artifact_path else None
+        result = train(staged_output, staged_artifact)
+        
+        # Check what serving loads: the artifact when there is one, otherwise the pickle
+        served = staged_artifact if staged_artifact and is_artifact(staged_artifact) else staged_output.replace('.joblib', '.pkl')
+        print(f"\n📏 Checking the model against its budget...")
+        report = model_report(served)
+        print_report(report, budget)
+        violations = check_budget(report, budget)
+        if violations:
+            raise BudgetExceeded(violations)
+        
+        for name in os.listdir(staging):
+            source = os.path.join(staging, name)
+            if source == staged_artifact:
+                replace_directory(source, artifact_path)
+            else:
+                os.replace(source, os.path.join(parent, name))
+        print(f"💾 Installed the model as {output}" + (f" and {artifact_path}" if artifact_path else ""))
+        return result
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
 if __name__ == "__main__":
-    # Train model with your dataset
-    predictor, metrics = train_with_your_dataset()
+    parser = argparse.ArgumentParser(description="Train the water disease model, optionally with a parallel hyperparameter search")
+    parser.add_argument("--data", default="WATER_dATA.csv", help="training CSV or Parquet file")
+    parser.add_argument("--search", help="'default', a JSON file, or inline JSON mapping parameter -> list of values")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, help="search processes (default: cores / tree-jobs)")
+    parser.add_argument("--tree-jobs", type=int, default=1, help="threads per forest fit during the search")
+    parser.add_argument("--scoring", choices=["f1_macro", "accuracy"], default="f1_macro")
+    parser.add_argument("--output", default="models/water_disease_model.pkl")
+    parser.add_argument("--artifact", default="models/water_disease_model.forest", help="'' to skip the mmap artifact")
+    parser.add_argument("--report", help="write the per-candidate search report as JSON")
+    parser.add_argument("--stream", action="store_true", help="train out of core, reading the data in chunks")
+    parser.add_argument("--chunk-rows", type=int, default=500_000, help="rows per chunk in --stream mode")
+    parser.add_argument("--params", help="JSON forest parameter overrides (ignored when --search picks them)")
+    parser.add_argument("--precision", choices=["float32", "float64"], default="float32",
+                        help="feature matrix and artifact precision")
+    parser.add_argument("--cache-dir", default="models/.cache", help="content-addressed training cache; '' disables it")
+    parser.add_argument("--budget", help="'default', a JSON file, or inline JSON of model_report.py limits; "
+                                         "an over-budget model is not installed")
+    args = parser.parse_args()
+    
+    if args.stream:
+        if args.search:
+            parser.error("--search needs the dataset in memory; pick parameters on a sample, then pass --params")
+        if args.budget and not args.artifact:
+            parser.error("--budget checks the artifact that --stream writes; pass --artifact")
+        from train_streaming import train_streaming
+        train = lambda output, artifact_path: train_streaming(
+            args.data, chunk_rows=args.chunk_rows, params=json.loads(args.params) if args.params else None,
+            artifact_path=artifact_path, precision=args.precision)
+    else:
+        # Train model with your dataset
+        train = lambda output, artifact_path: train_with_your_dataset(
+            data_path=args.data,
+            search_space=load_search_space(args.search) if args.search else None,
+            folds=args.folds,
+            workers=args.workers,
+            tree_jobs=args.tree_jobs,
+            scoring=args.scoring,
+            output=output,
+            artifact_path=artifact_path,
+            report_path=args.report,
+            params=json.loads(args.params) if args.params else None,
+            cache_dir=args.cache_dir or None,
+            precision=args.precision
+        )
+    
+    if not args.budget:
+        train(args.output, args.artifact or None)
+        raise SystemExit(0)
+    from model_report import BudgetExceeded, load_budget
+    try:
+        train_within_budget(load_budget(args.budget), args.output, args.artifact or None, train)
+    except BudgetExceeded as e:
+        print(f"❌ Model not installed, over budget: {e}")
+        raise SystemExit(1)
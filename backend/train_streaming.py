@@ -0,0 +1,244 @@
+"""
+Out-of-core training for datasets larger than memory.
+
+The file is read twice in fixed-size chunks and never held whole:
+
+1. sketch: row and class counts, plus a uniform reservoir sample per sensor
+   column whose median is the imputation value (exact while a column has
+   fewer observed values than the reservoir holds);
+2. fit: each chunk is imputed with those medians into a float32 matrix and
+   gets its share of the forest's trees; the per-chunk forests are compiled
+   and concatenated into one CompiledForest (bagging over chunks). With more
+   chunks than trees, a chunk without trees is carried into the next one
+   that gets some, so every row is trained on.
+
+Resident memory is one chunk plus the compiled trees. The result is the
+memory-mapped artifact the API serves; there is no single sklearn estimator
+to pickle. Run it through `python train_model.py --stream`.
+"""
+
+import resource
+import sys
+import time
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score
+
+from inference import CompiledForest, CompiledImputer
+from model_artifact import export_artifact
+from train_model import DEFAULT_FOREST_PARAMS, WaterDiseasePredictor
+
+DEFAULT_CHUNK_ROWS = 500_000
+# Values kept per column for the median; rank error is about 1/sqrt(size)
+DEFAULT_SKETCH_SIZE = 100_000
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+class ReservoirSketch:
+    """Fixed-size uniform sample of a stream's non-missing values (Algorithm R, one chunk at a time)"""
+
+    def __init__(self, size: int = DEFAULT_SKETCH_SIZE, seed: int = 0):
+        self.sample = np.empty(size, dtype=np.float64)
+        self.filled = 0
+        self.seen = 0
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray):
+        values = values[~np.isnan(values)]
+        take = min(len(self.sample) - self.filled, len(values))
+        self.sample[self.filled:self.filled + take] = values[:take]
+        self.filled += take
+
+        rest = values[take:]
+        if len(rest):
+            # The i-th value overall replaces a random slot with probability size / (i + 1)
+            positions = self.seen + take + np.arange(1, len(rest) + 1)
+            slots = (self.rng.random(len(rest)) * positions).astype(np.int64)
+            keep = slots < len(self.sample)
+            self.sample[slots[keep]] = rest[keep]
+        self.seen += len(values)
+
+    def median(self) -> float:
+        if self.filled == 0:
+            return float('nan')
+        return float(np.median(self.sample[:self.filled]))
+
+def read_chunks(path: str, chunk_rows: int, predictor: WaterDiseasePredictor) -> Iterator[pd.DataFrame]:
+    """Prepared chunks holding only the sensor columns (float32) and the categorical disease label"""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path)
+        dtypes = predictor.column_dtypes(parquet.schema_arrow.names)
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=list(dtypes)):
+            yield predictor.prepare_dataframe(batch.to_pandas().astype(dtypes), verbose=False)
+    else:
+        dtypes = predictor.column_dtypes(pd.read_csv(path, nrows=0).columns)
+        for chunk in pd.read_csv(path, usecols=list(dtypes), dtype=dtypes, chunksize=chunk_rows):
+            yield predictor.prepare_dataframe(chunk, verbose=False)
+
+def chunk_matrix(chunk: pd.DataFrame, sensors: List[str], medians: np.ndarray) -> np.ndarray:
+    """Imputed sensors followed by their has_ indicators, built in place as float32"""
+    values = chunk[sensors].to_numpy(dtype=np.float32)
+    X = np.empty((len(values), 2 * len(sensors)), dtype=np.float32)
+    missing = np.isnan(values)
+    np.copyto(X[:, :len(sensors)], np.where(missing, medians.astype(np.float32), values))
+    X[:, len(sensors):] = ~missing
+    return X
+
+def tree_allocation(n_chunks: int, n_estimators: int) -> List[int]:
+    """Spread n_estimators trees over the chunks as evenly as possible; the last chunk always gets some"""
+    if n_chunks <= 0:
+        return []
+    bounds = [i * n_estimators // n_chunks for i in range(n_chunks + 1)]
+    return [bounds[i + 1] - bounds[i] for i in range(n_chunks)]
+
+def sketch_pass(path: str, chunk_rows: int, predictor: WaterDiseasePredictor, sketch_size: int) -> Dict:
+    """First pass: rows, class counts and imputation medians"""
+    sketches = {feature: ReservoirSketch(sketch_size, seed=i) for i, feature in enumerate(predictor.sensor_features)}
+    present = set()
+    class_counts: Dict[str, int] = {}
+    rows = chunks = 0
+
+    for chunk in read_chunks(path, chunk_rows, predictor):
+        if 'disease' not in chunk.columns:
+            raise ValueError("Dataset must have a 'disease' column with disease labels")
+        for feature, sketch in sketches.items():
+            if feature in chunk.columns:
+                present.add(feature)
+                sketch.update(chunk[feature].to_numpy(dtype=np.float64))
+        for label, count in chunk['disease'].value_counts().items():
+            if count == 0:
+                continue
+            class_counts[label] = class_counts.get(label, 0) + int(count)
+        rows += len(chunk)
+        chunks += 1
+
+    sensors = [feature for feature in predictor.sensor_features if feature in present]
+    empty = [feature for feature in sensors if sketches[feature].filled == 0]
+    if empty:
+        raise ValueError(f"Columns with no observed values cannot be imputed: {empty}")
+
+    return {
+        'rows': rows,
+        'chunks': chunks,
+        'class_counts': class_counts,
+        'sensors': sensors,
+        'medians': np.array([sketches[feature].median() for feature in sensors]),
+        'exact_medians': all(sketches[feature].seen <= sketch_size for feature in sensors)
+    }
+
+def train_streaming(data_path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS, params: Optional[Dict] = None,
+                    artifact_path: Optional[str] = 'models/water_disease_model.forest',
+                    sketch_size: int = DEFAULT_SKETCH_SIZE, holdout_fraction: float = 0.01,
+                    holdout_rows: int = 100_000, n_jobs: int = -1, seed: int = 42, precision: str = 'float32'):
+    """
+    Train on a CSV or Parquet file chunk by chunk; returns (model_data, metrics)
+    """
+    print("🌊 Smart Health Surveillance - Streaming Training Mode")
+    print("=" * 50)
+    # Chunks are float32 regardless; precision picks the artifact's width
+    predictor = WaterDiseasePredictor('float32')
+    params = {**DEFAULT_FOREST_PARAMS, **(params or {})}
+    started = time.perf_counter()
+
+    print(f"📁 Sketching {data_path} in chunks of {chunk_rows:,} rows...")
+    sketch = sketch_pass(data_path, chunk_rows, predictor, sketch_size)
+    sensors, medians = sketch['sensors'], sketch['medians']
+    feature_names = sensors + [f'has_{feature}' for feature in sensors]
+    print(f"✅ {sketch['rows']:,} rows in {sketch['chunks']} chunks, classes {sketch['class_counts']}")
+    print(f"📊 Medians {'(exact)' if sketch['exact_medians'] else f'(from {sketch_size:,}-value reservoirs)'}: "
+          f"{ {feature: round(float(m), 3) for feature, m in zip(sensors, medians)} }")
+    sketch_peak = peak_rss_mb()
+
+    allocation = tree_allocation(sketch['chunks'], params['n_estimators'])
+    print(f"🔬 Fitting {params['n_estimators']} trees over {sum(1 for t in allocation if t)} chunks...")
+    rng = np.random.default_rng(seed)
+    parts, holdout_X, holdout_y = [], [], []
+    carried_X, carried_y = [], []
+    held = trained = 0
+    importances = np.zeros(len(feature_names))
+
+    for index, (chunk, trees) in enumerate(zip(read_chunks(data_path, chunk_rows, predictor), allocation)):
+        X = chunk_matrix(chunk, sensors, medians)
+        y = chunk['disease'].to_numpy()
+
+        # A small uniform hold-out, capped so it stays a constant memory cost
+        test = rng.random(len(X)) < holdout_fraction
+        if held + int(test.sum()) > holdout_rows:
+            test[np.flatnonzero(test)[holdout_rows - held:]] = False
+        if test.any():
+            holdout_X.append(X[test])
+            holdout_y.append(y[test])
+            held += int(test.sum())
+
+        X, y = X[~test], y[~test]
+        if trees == 0:
+            # More chunks than trees: these rows join the next chunk that gets trees
+            carried_X.append(X)
+            carried_y.append(y)
+            continue
+        if carried_X:
+            X, y = np.concatenate(carried_X + [X]), np.concatenate(carried_y + [y])
+            carried_X, carried_y = [], []
+        forest = RandomForestClassifier(**{**params, 'n_estimators': trees, 'n_jobs': n_jobs,
+                                           'random_state': params.get('random_state', seed) + index})
+        forest.fit(X, y)
+        trained += len(X)
+        importances += forest.feature_importances_ * trees
+        compiled = CompiledForest.from_sklearn(forest)
+        # Compacting each part right away halves the trees held until the merge
+        parts.append(compiled.to_float32() if precision == 'float32' else compiled)
+        del forest, X, y
+
+    engine = CompiledForest.merge(parts)
+    del parts
+    fit_peak = peak_rss_mb()
+
+    metrics = {
+        'rows': sketch['rows'],
+        'chunks': sketch['chunks'],
+        'trained_rows': trained,
+        'trees': engine.n_estimators,
+        'nodes': len(engine.feature),
+        'seconds': round(time.perf_counter() - started, 2),
+        'peak_rss_mb': {'sketch': round(sketch_peak, 1), 'fit': round(fit_peak, 1)}
+    }
+    if held:
+        X_test, y_test = np.concatenate(holdout_X), np.concatenate(holdout_y)
+        y_pred = engine.predict(X_test)
+        metrics['holdout_rows'] = held
+        metrics['holdout_accuracy'] = accuracy_score(y_test, y_pred)
+        metrics['holdout_f1_macro'] = f1_score(y_test, y_pred, average='macro')
+
+    model_data = {
+        'engine': engine,
+        'compiled_imputer': CompiledImputer(medians.astype(np.float64)),
+        'imputer': None,
+        'feature_names': feature_names,
+        'disease_classes': predictor.disease_classes,
+        'sensor_features': predictor.sensor_features
+    }
+
+    print(f"✅ Model trained: {metrics['trees']} trees, {metrics['nodes']:,} nodes in {metrics['seconds']}s")
+    if held:
+        print(f"📊 Hold-out accuracy: {metrics['holdout_accuracy']:.3f}, macro F1: {metrics['holdout_f1_macro']:.3f} "
+              f"({held:,} rows)")
+    print(f"🔍 Top 5 important features:")
+    for rank, i in enumerate(np.argsort(importances)[::-1][:5]):
+        print(f"   {rank+1}. {feature_names[i]}: {importances[i] / max(metrics['trees'], 1):.3f}")
+    print(f"🧠 Peak memory: {metrics['peak_rss_mb']['sketch']:.0f} MB after sketching, "
+          f"{metrics['peak_rss_mb']['fit']:.0f} MB after fitting")
+
+    if artifact_path:
+        manifest = export_artifact(model_data, artifact_path, precision=precision)
+        model_data['version'] = manifest['version']
+        print(f"💾 Memory-mapped artifact saved as {artifact_path} (version {manifest['version']})")
+
+    return model_data, metrics
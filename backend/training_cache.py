@@ -0,0 +1,185 @@
+"""
+Content-addressed cache for training runs.
+
+Two kinds of entries live under one directory (default models/.cache):
+
+    matrices/<matrix key>/   X.npy (un-imputed features + has_ indicators), y.npy, meta.json
+    models/<model key>/      model.pkl, model.joblib, model.forest/, metrics.json [, search.json]
+
+The matrix key hashes the dataset's bytes together with the source of the
+preprocessing code, so editing a column mapping invalidates it like editing the
+data does. The model key hashes the matrix key with the training configuration
+(parameters, search space, folds, scoring), the forest defaults, the training
+code and the sklearn version. An unchanged run finds its model entry and only
+copies files into place.
+
+File hashes are memoized by (size, mtime) in file_hashes.json, so a hit does not
+re-read a large dataset. Entries are immutable; delete the directory to reclaim space.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import sklearn
+
+from model_artifact import copy_artifact, is_artifact
+
+KEY_LENGTH = 16
+
+def _digest(*parts) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(json.dumps(part, sort_keys=True, default=str).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()[:KEY_LENGTH]
+
+def code_fingerprint(*functions) -> str:
+    """Hash of the functions' source, so behaviour changes invalidate their cached output"""
+    sources = []
+    for function in functions:
+        try:
+            sources.append(inspect.getsource(function))
+        except (OSError, TypeError):
+            sources.append(getattr(function, '__qualname__', repr(function)))
+    return _digest(*sources)
+
+class TrainingCache:
+    """Prepared matrices and trained models addressed by what produced them"""
+
+    def __init__(self, root: str = 'models/.cache'):
+        self.root = root
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self.root, kind, key)
+
+    def file_hash(self, path: str) -> str:
+        """sha256 of a file's contents, memoized by path, size and mtime"""
+        st = os.stat(path)
+        memo_path = os.path.join(self.root, 'file_hashes.json')
+        try:
+            with open(memo_path) as f:
+                memo = json.load(f)
+        except (OSError, ValueError):
+            memo = {}
+
+        stamp = [st.st_size, st.st_mtime_ns]
+        entry = memo.get(os.path.abspath(path))
+        if entry and entry['stamp'] == stamp:
+            return entry['sha256']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        memo[os.path.abspath(path)] = {'stamp': stamp, 'sha256': digest.hexdigest()}
+        self._write_json(memo_path, memo)
+        return digest.hexdigest()
+
+    def matrix_key(self, data_path: str, preprocessing: str) -> str:
+        return _digest('matrix', self.file_hash(data_path), preprocessing)
+
+    def model_key(self, matrix_key: str, config: Dict, training: str) -> str:
+        return _digest('model', matrix_key, config, training, sklearn.__version__)
+
+    def _write_json(self, path: str, payload):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(payload, f, indent=2, default=str)
+        os.replace(tmp, path)
+
+    def _commit(self, staging: str, target: str):
+        # Entries are immutable: if another run got there first, keep its copy
+        try:
+            os.rename(staging, target)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _staging(self, kind: str) -> str:
+        parent = os.path.join(self.root, kind)
+        os.makedirs(parent, exist_ok=True)
+        return tempfile.mkdtemp(prefix='.staging-', dir=parent)
+
+    def load_matrix(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray, List[str]]]:
+        """(X memory-mapped read-only, y, feature_names), or None on a miss"""
+        path = self._path('matrices', key)
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+            X = np.load(os.path.join(path, 'X.npy'), mmap_mode='r')
+            y = np.load(os.path.join(path, 'y.npy')).astype(object)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return X, y, meta['feature_names']
+
+    def save_matrix(self, key: str, X: np.ndarray, y: np.ndarray, feature_names: List[str], source: str = ''):
+        staging = self._staging('matrices')
+        try:
+            np.save(os.path.join(staging, 'X.npy'), np.ascontiguousarray(X), allow_pickle=False)
+            np.save(os.path.join(staging, 'y.npy'), np.asarray(y, dtype=str), allow_pickle=False)
+            self._write_json(os.path.join(staging, 'meta.json'), {
+                'feature_names': list(feature_names), 'rows': int(len(X)), 'source': source, 'created': time.time()
+            })
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self._commit(staging, self._path('matrices', key))
+
+    def restore_model(self, key: str, output: str, artifact_path: Optional[str] = None,
+                      report_path: Optional[str] = None) -> Optional[Dict]:
+        """Copy a cached model to its output paths and return its metrics, or None on a miss"""
+        path = self._path('models', key)
+        try:
+            with open(os.path.join(path, 'metrics.json')) as f:
+                metrics = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        if artifact_path and not is_artifact(os.path.join(path, 'model.forest')):
+            # Cached without an artifact; retrain rather than serve a stale one
+            self.misses += 1
+            return None
+
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        for name, target in (('model.pkl', output.replace('.joblib', '.pkl')),
+                             ('model.joblib', output.replace('.pkl', '.joblib'))):
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(target)), suffix='.tmp')
+            os.close(fd)
+            shutil.copyfile(os.path.join(path, name), tmp)
+            # mkstemp creates 0600; workers may run as another user
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, target)
+        if artifact_path:
+            copy_artifact(os.path.join(path, 'model.forest'), artifact_path)
+        if report_path and os.path.exists(os.path.join(path, 'search.json')):
+            shutil.copyfile(os.path.join(path, 'search.json'), report_path)
+
+        self.hits += 1
+        return metrics
+
+    def store_model(self, key: str, output: str, metrics: Dict, artifact_path: Optional[str] = None,
+                    report: Optional[Dict] = None):
+        staging = self._staging('models')
+        try:
+            shutil.copyfile(output.replace('.joblib', '.pkl'), os.path.join(staging, 'model.pkl'))
+            shutil.copyfile(output.replace('.pkl', '.joblib'), os.path.join(staging, 'model.joblib'))
+            if artifact_path:
+                shutil.copytree(artifact_path, os.path.join(staging, 'model.forest'))
+            if report is not None:
+                self._write_json(os.path.join(staging, 'search.json'), report)
+            self._write_json(os.path.join(staging, 'metrics.json'), metrics)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self._commit(staging, self._path('models', key))